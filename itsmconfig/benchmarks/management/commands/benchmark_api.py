@@ -0,0 +1,100 @@
+import json
+import platform
+import sys
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from benchmarks.runner import Benchmark, BenchmarkError, compare
+from benchmarks.seed import seed
+
+
+class Command(BaseCommand):
+    help = "Seed a throwaway test database and benchmark the REST API (latency percentiles, queries, peak memory)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--admins', type=int, default=2)
+        parser.add_argument('--agents', type=int, default=20)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--tickets', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--iterations', type=int, default=50, help="Timed requests per scenario")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per scenario")
+        parser.add_argument('--scenario', action='append', default=[], help="Only run scenarios starting with this name (repeatable)")
+        parser.add_argument('--save-baseline', metavar='PATH', help="Write the results to PATH")
+        parser.add_argument('--compare', metavar='PATH', help="Compare with the baseline at PATH; exit 1 on regressions")
+        parser.add_argument('--threshold', type=float, default=20, help="Allowed p95 increase in percent (default 20)")
+        parser.add_argument('--keepdb', action='store_true', help="Keep the test database between runs")
+        parser.add_argument('--explain', action='store_true', help="Print the query plans of each selected scenario")
+
+    def handle(self, *args, **options):
+        if options['admins'] < 1:
+            raise CommandError("At least one admin is required.")
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'], aliases={'default'})
+        try:
+            volumes = {key: options[key] for key in ('admins', 'agents', 'users', 'tickets', 'comments')}
+            self.stdout.write(f"Seeding {volumes} ...")
+            people = seed(**volumes)
+            benchmark = Benchmark(people, iterations=options['iterations'], warmup=options['warmup'])
+            results = benchmark.run(options['scenario'])
+            if options['explain']:
+                self.write_plans(benchmark, options['scenario'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'volumes': volumes,
+                'iterations': options['iterations'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'results': results,
+        }
+        self.write_table(compare(results, baseline['results'] if baseline else {}, options['threshold']), baseline is not None)
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {options['save_baseline']}"))
+
+        if baseline is not None:
+            if baseline['meta'].get('volumes') != volumes:
+                self.stdout.write(self.style.WARNING("Baseline was recorded with different volumes; comparison is indicative only"))
+            regressions = [row[0] for row in compare(results, baseline['results'], options['threshold']) if row[4]]
+            if regressions:
+                self.stderr.write(self.style.ERROR(f"Regressions: {', '.join(regressions)}"))
+                sys.exit(1)
+            self.stdout.write(self.style.SUCCESS("No regressions"))
+
+    def write_table(self, rows, with_baseline):
+        header = f"{'scenario':<34}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'peak KB':>10}"
+        if with_baseline:
+            header += f"{'p95 vs base':>13}{'base q':>8}"
+        self.stdout.write(header)
+        for name, current, before, change, regressed in rows:
+            line = (f"{name:<34}{current['p50_ms']:>9.2f}{current['p95_ms']:>9.2f}{current['p99_ms']:>9.2f}"
+                    f"{current['queries']:>9}{current['peak_kb']:>10.1f}")
+            if with_baseline:
+                line += f"{'new':>13}{'':>8}" if before is None else f"{change:>+12.1f}%{before['queries']:>8}"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+    def write_plans(self, benchmark, names):
+        for scenario in benchmark.selected(names):
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{scenario.name}: {scenario.method} {scenario.path}"))
+            for sql, plan in benchmark.explain(scenario):
+                self.stdout.write(f"  {sql}")
+                self.stdout.write('\n'.join(f"    {line}" for line in plan.splitlines()))
@@ -0,0 +1,197 @@
+import json
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.db import connection, connections
+from django.test import Client
+
+from tickets.models import Category, Priority, Status, Ticket
+
+from .seed import PASSWORD
+
+Scenario = namedtuple('Scenario', 'name role method path data', defaults=(None,))
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class CapturedQueries:
+    """`(sql, params)` of the queries run on any connection inside the block, e.g. reads sent to a replica."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for wrapper in connections.all():
+            self._stack.enter_context(wrapper.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, None if many else params))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+
+def percentile(cuts, value):
+    return round(cuts[value - 1], 2)
+
+
+class Benchmark:
+    """
+    Drives the API in-process through Django's test client, authenticated
+    with real JWTs, and records latency, queries and peak Python memory
+    per scenario.
+    """
+
+    def __init__(self, people, iterations=50, warmup=5, memory_iterations=5):
+        self.people = people
+        self.iterations = max(iterations, 2)
+        self.warmup = warmup
+        self.memory_iterations = memory_iterations
+        self.client = Client()
+        self.tokens = {role: self.obtain_token(accounts[0]) for role, accounts in people.items() if accounts}
+
+    def obtain_token(self, user):
+        response = self.client.post('/api/token/', {'username': user.username, 'password': PASSWORD})
+        if response.status_code != 200:
+            raise BenchmarkError(f"Could not obtain a token for {user.username}: {response.status_code}")
+        return response.json()
+
+    def request(self, scenario):
+        headers = {}
+        if scenario.role:
+            headers['HTTP_AUTHORIZATION'] = 'Bearer ' + self.tokens[scenario.role]['access']
+        data = json.dumps(scenario.data) if scenario.data is not None else None
+        if scenario.method == 'GET':
+            return self.client.get(scenario.path, **headers)
+        return self.client.generic(scenario.method, scenario.path, data or '', content_type='application/json', **headers)
+
+    def scenarios(self):
+        """The default scenario set, pointed at rows visible to each role."""
+        sample = {
+            role: Ticket.objects.filter(**filters).order_by('-updated_at').values_list('pk', flat=True).first()
+            for role, filters in (
+                ('admin', {}),
+                ('agent', {'assigned_to': self.people['agent'][0]} if self.people.get('agent') else {}),
+                ('user', {'created_by': self.people['user'][0]} if self.people.get('user') else {}),
+            )
+        }
+        first_page = self.request(Scenario('', 'admin', 'GET', '/api/tickets/')).json()
+        user = self.people['user'][0] if self.people.get('user') else self.people['admin'][0]
+        new_ticket = {'title': 'Benchmark ticket', 'description': 'Created by the benchmark'}
+        for field, model in (('status', Status), ('priority', Priority), ('category', Category)):
+            new_ticket[field] = model.objects.values_list('pk', flat=True).first()
+
+        scenarios = [
+            Scenario('token.obtain', None, 'POST', '/api/token/', {'username': user.username, 'password': PASSWORD}),
+            Scenario('token.refresh', None, 'POST', '/api/token/refresh/', {'refresh': self.tokens['admin']['refresh']}),
+            Scenario('lookups.statuses', 'agent', 'GET', '/api/statuses/'),
+            Scenario('tickets.create', 'agent', 'POST', '/api/tickets/', new_ticket),
+            Scenario('tickets.search', 'agent', 'GET', '/api/tickets/search/?q=printer'),
+            Scenario('tickets.changes', 'agent', 'GET', '/api/tickets/changes/?limit=200'),
+            Scenario('dashboard.overview', 'admin', 'GET', '/api/dashboard/overview/'),
+            Scenario('dashboard.metrics', 'admin', 'GET', '/api/dashboard/metrics/'),
+            Scenario('dashboard.timeseries', 'admin', 'GET', '/api/dashboard/timeseries/?interval=day'),
+            Scenario('dashboard.sla', 'admin', 'GET', '/api/dashboard/sla/'),
+            Scenario('users.directory', 'agent', 'GET', '/api/users/list/'),
+            Scenario('users.picker', 'agent', 'GET', '/api/users/list/?role=agent&search=agent&fields=id,username'),
+        ]
+        for role in ('admin', 'agent', 'user'):
+            if role not in self.tokens:
+                continue
+            scenarios.append(Scenario(f'tickets.list.{role}', role, 'GET', '/api/tickets/'))
+            scenarios.append(Scenario(f'tickets.list.open.{role}', role, 'GET', '/api/tickets/?is_closed=false&ordering=-created_at'))
+            if sample[role]:
+                scenarios.append(Scenario(f'tickets.detail.{role}', role, 'GET', f'/api/tickets/{sample[role]}/'))
+                scenarios.append(Scenario(f'tickets.detail.expanded.{role}', role, 'GET', f'/api/tickets/{sample[role]}/?expand=status,priority,category,comments'))
+                scenarios.append(Scenario(f'comments.list.{role}', role, 'GET', f'/api/tickets/{sample[role]}/comments/?expand=user'))
+        scenarios.append(Scenario('tickets.list.wide.admin', 'admin', 'GET', '/api/tickets/?page_size=200'))
+        scenarios.append(Scenario(
+            'tickets.list.wide.expanded.admin', 'admin', 'GET',
+            '/api/tickets/?page_size=200&expand=status,priority,category,created_by,assigned_to',
+        ))
+        if first_page.get('next'):
+            scenarios.append(Scenario('tickets.list.page2.admin', 'admin', 'GET', first_page['next']))
+        return sorted(scenarios, key=lambda scenario: scenario.name)
+
+    def measure(self, scenario):
+        for _ in range(self.warmup):
+            self.request(scenario)
+
+        timings, queries = [], []
+        for _ in range(self.iterations):
+            with CapturedQueries() as captured:
+                start = time.perf_counter()
+                response = self.request(scenario)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise BenchmarkError(f"{scenario.name}: {scenario.method} {scenario.path} returned {response.status_code}")
+            queries.append(len(captured))
+
+        tracemalloc.start()
+        try:
+            for _ in range(self.memory_iterations):
+                self.request(scenario)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        cuts = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'p50_ms': percentile(cuts, 50),
+            'p95_ms': percentile(cuts, 95),
+            'p99_ms': percentile(cuts, 99),
+            'queries': max(queries),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def explain(self, scenario):
+        """The database's plan for each SELECT that one request of `scenario` runs."""
+        with CapturedQueries() as captured:
+            self.request(scenario)
+        plans = []
+        for sql, params in captured.queries:
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+            plans.append((f"{sql}  {list(params)}" if params else sql, plan))
+        return plans
+
+    def selected(self, names=()):
+        return [
+            scenario for scenario in self.scenarios()
+            if not names or any(scenario.name.startswith(name) for name in names)
+        ]
+
+    def run(self, names=()):
+        return {scenario.name: self.measure(scenario) for scenario in self.selected(names)}
+
+
+def compare(results, baseline, threshold=20):
+    """
+    Rows comparing `results` with a saved `baseline`. A scenario regresses
+    when its p95 grows by more than `threshold` percent or it issues more
+    queries than before.
+    """
+    rows = []
+    for name, current in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            rows.append((name, current, None, None, False))
+            continue
+        change = (current['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        regressed = change > threshold or current['queries'] > before['queries']
+        rows.append((name, current, before, round(change, 1), regressed))
+    return rows
@@ -0,0 +1,152 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.counters import rebuild_counters
+from dashboard.rollups import backfill_rollups
+from tickets.conditional import bump_model_version
+from tickets import sla
+from tickets.assignment import load_index
+from tickets.models import AgentSkill, Category, ChangeSequence, Priority, Status, Ticket, TicketComment
+from tickets.search import rebuild_index
+from users.models import UserModel
+
+PASSWORD = 'benchmark'
+BATCH_SIZE = 2000
+STATUSES = [('Open', False), ('In Progress', False), ('Waiting', False), ('Resolved', True), ('Closed', True)]
+# Name, response and resolution SLA targets in minutes.
+PRIORITIES = [('Low', 480, 7200), ('Medium', 240, 2880), ('High', 60, 480), ('Critical', 15, 240)]
+CATEGORIES = ['Hardware', 'Software', 'Network', 'Access', 'Email', 'Printing']
+WORDS = (
+    'printer laptop vpn password reset email outlook network wifi monitor keyboard license '
+    'install update crash slow error access account disk backup server phone calendar'
+).split()
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values set on the instances."""
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def with_sla(tickets, now, closed):
+    """Set SLA deadlines and the breaches recorded by `now`, as if the scheduler had kept up."""
+    for ticket in tickets:
+        sla.schedule(ticket)
+        sla.settle(ticket, now, closed)
+        sla.settle(ticket, now, closed)
+    return tickets
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def with_change_seqs(objects):
+    last = ChangeSequence.allocate(len(objects))
+    for change_seq, obj in enumerate(objects, last - len(objects) + 1):
+        obj.change_seq = change_seq
+    return objects
+
+
+def seed(admins=2, agents=20, users=200, tickets=5000, comments=20000, days=90, random_seed=1):
+    """
+    Fill an empty database with `tickets` tickets and `comments` comments
+    spread over the last `days` days, using bulk inserts throughout. Every
+    user's password is `PASSWORD`. Returns the users by role.
+    """
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    password = make_password(PASSWORD)
+
+    with transaction.atomic():
+        statuses = Status.objects.bulk_create(
+            Status(name=name, description=name, color='grey', order=order, is_closed=closed)
+            for order, (name, closed) in enumerate(STATUSES)
+        )
+        priorities = Priority.objects.bulk_create(
+            Priority(name=name, description=name, color='grey', order=order, response_minutes=response, resolution_minutes=resolution)
+            for order, (name, response, resolution) in enumerate(PRIORITIES)
+        )
+        categories = Category.objects.bulk_create(
+            Category(name=name, description=name, order=order) for order, name in enumerate(CATEGORIES)
+        )
+        # bulk_create skips the signals that bump these; SLA deadlines below read them.
+        for model in (Status, Priority, Category):
+            bump_model_version(model)
+        closed = {status.pk for status in statuses if status.is_closed}
+
+        people = {}
+        for role, count in (('admin', admins), ('agent', agents), ('user', users)):
+            accounts = User.objects.bulk_create(
+                User(username=f'{role}{index}', email=f'{role}{index}@example.com', password=password)
+                for index in range(count)
+            )
+            UserModel.objects.bulk_create(
+                UserModel(user=account, role=role, department=rng.choice(CATEGORIES), employee_id=f'{role[0].upper()}{index:06d}')
+                for index, account in enumerate(accounts)
+            )
+            people[role] = accounts
+        # Two neighbouring categories per agent, so every category has several.
+        AgentSkill.objects.bulk_create(
+            AgentSkill(agent=agent, category=categories[(index + offset) % len(categories)])
+            for index, agent in enumerate(people['agent']) for offset in (0, 1)
+        )
+
+        with explicit_timestamps(Ticket, TicketComment):
+            ticket_spans = []
+            for start in range(0, tickets, BATCH_SIZE):
+                batch = []
+                for _ in range(min(BATCH_SIZE, tickets - start)):
+                    created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+                    updated_at = min(now, created_at + timedelta(seconds=rng.randrange(7 * 86400)))
+                    batch.append(Ticket(
+                        title=sentence(rng, 5).capitalize(),
+                        description=sentence(rng, 40),
+                        status=rng.choice(statuses),
+                        priority=rng.choice(priorities),
+                        category=rng.choice(categories),
+                        created_by=rng.choice(people['user']),
+                        # About a quarter of tickets sit in the unassigned queue.
+                        assigned_to=rng.choice(people['agent']) if people['agent'] and rng.random() < 0.75 else None,
+                        created_at=created_at,
+                        updated_at=updated_at,
+                    ))
+                Ticket.objects.bulk_create(with_change_seqs(with_sla(batch, now, closed)))
+                ticket_spans.extend((ticket.pk, ticket.created_at, ticket.updated_at) for ticket in batch)
+
+            authors = people['agent'] + people['user']
+            for start in range(0, comments if ticket_spans else 0, BATCH_SIZE):
+                batch = []
+                for _ in range(min(BATCH_SIZE, comments - start)):
+                    ticket_id, created_at, updated_at = rng.choice(ticket_spans)
+                    span = max(int((updated_at - created_at).total_seconds()), 1)
+                    batch.append(TicketComment(
+                        ticket_id=ticket_id,
+                        user=rng.choice(authors) if authors else None,
+                        content=sentence(rng, 20),
+                        created_at=created_at + timedelta(seconds=rng.randrange(span)),
+                        is_public=rng.random() < 0.6,
+                    ))
+                TicketComment.objects.bulk_create(with_change_seqs(batch))
+
+        # bulk_create skips the signals that maintain these.
+        rebuild_counters()
+        backfill_rollups()
+        rebuild_index()
+        load_index.invalidate()
+    return people
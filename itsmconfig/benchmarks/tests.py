@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from dashboard.models import TicketCounter
+from tickets.models import Ticket, TicketComment
+
+from .runner import Benchmark, compare
+from .seed import seed
+
+
+class BenchmarkHarnessTests(TestCase):
+    """Keep the harness runnable: a tiny seed and a few timed requests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.people = seed(admins=1, agents=2, users=3, tickets=30, comments=60)
+
+    def test_seed(self):
+        self.assertEqual(Ticket.objects.count(), 30)
+        self.assertEqual(TicketComment.objects.count(), 60)
+        self.assertEqual(sum(TicketCounter.objects.filter(status__isnull=False).values_list('ticket_count', flat=True)), 30)
+        self.assertEqual(Ticket.objects.filter(change_seq=0).count(), 0)
+
+    def test_run(self):
+        benchmark = Benchmark(self.people, iterations=3, warmup=1, memory_iterations=1)
+        results = benchmark.run(['tickets.list', 'comments.list.user', 'dashboard.overview'])
+        self.assertIn('tickets.list.agent', results)
+        self.assertIn('comments.list.user', results)
+        for metrics in results.values():
+            self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+            self.assertGreater(metrics['queries'], 0)
+
+    def test_compare(self):
+        baseline = {'a': {'p95_ms': 10.0, 'queries': 2}, 'b': {'p95_ms': 10.0, 'queries': 2}}
+        results = {
+            'a': {'p95_ms': 11.0, 'queries': 2},
+            'b': {'p95_ms': 10.0, 'queries': 3},
+            'c': {'p95_ms': 50.0, 'queries': 9},
+        }
+        regressed = {row[0]: row[4] for row in compare(results, baseline, threshold=20)}
+        self.assertEqual(regressed, {'a': False, 'b': True, 'c': False})
@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import TicketCounter, TicketRollup
 
 # Register your models here.
+
+
+admin.site.register(TicketCounter)
+admin.site.register(TicketRollup)
@@ -0,0 +1,39 @@
+from asgiref.sync import sync_to_async
+from rest_framework.response import Response
+
+from tickets.async_views import AsyncAPIView, schema_from
+
+from .counters import COUNTER_FIELDS, acounter_values, overview_counts
+from .views import DashboardMetricsAPIView, DashboardOverviewAPIView, DashboardSlaAPIView, DashboardTimeseriesAPIView
+
+
+class AsyncDashboardOverviewAPIView(AsyncAPIView, DashboardOverviewAPIView):
+
+    @schema_from(DashboardOverviewAPIView.get)
+    async def get(self, request):
+        counts = await acounter_values('status')
+        # Shaping reads the status registry, which may reload from the database.
+        return Response(await sync_to_async(overview_counts)(counts))
+
+
+class AsyncDashboardMetricsAPIView(AsyncAPIView, DashboardMetricsAPIView):
+
+    @schema_from(DashboardMetricsAPIView.get)
+    async def get(self, request):
+        # The async ORM runs each query on the request's one database thread, so these run in turn.
+        counts = [await acounter_values(field) for field in COUNTER_FIELDS]
+        return Response(await sync_to_async(self.metrics)(dict(zip(COUNTER_FIELDS, counts))))
+
+
+class AsyncDashboardTimeseriesAPIView(AsyncAPIView, DashboardTimeseriesAPIView):
+
+    @schema_from(DashboardTimeseriesAPIView.get)
+    async def get(self, request):
+        return await sync_to_async(super().get)(request)
+
+
+class AsyncDashboardSlaAPIView(AsyncAPIView, DashboardSlaAPIView):
+
+    @schema_from(DashboardSlaAPIView.get)
+    async def get(self, request):
+        return await sync_to_async(super().get)(request)
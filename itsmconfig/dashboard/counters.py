@@ -0,0 +1,193 @@
+"""
+Dashboard counters.
+
+`TicketCounter` and `SlaCounter` rows are moved by the `Ticket` signals in
+`dashboard.signals`, from the buckets a ticket was loaded with to the ones
+it is saved with. That keeps reads at one row per bucket. Writers that
+change existing tickets load them with `select_for_update()` inside their
+transaction, so the loaded state is the committed one and two requests
+cannot both move a ticket out of the same bucket. Changes made without the
+signals, through `QuerySet.update()` or raw SQL, are not counted;
+`rebuild_ticket_counters` recomputes the counters after such a change,
+while ticket writes are paused, since it does not lock out in-flight ones.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from tickets.models import Category, Priority, Status, Ticket
+from tickets.reference import reference
+
+from .models import SlaCounter, TicketCounter
+
+COUNTER_FIELDS = ('status', 'priority', 'category')
+COUNTER_MODELS = {'status': Status, 'priority': Priority, 'category': Category}
+
+
+def ticket_buckets(ticket):
+    """The counter buckets a ticket currently occupies, without loading relations."""
+    return tuple(ticket.__dict__.get(field + '_id') for field in COUNTER_FIELDS)
+
+
+def sla_bucket(ticket):
+    """The `(status, priority, breach)` SLA counter a ticket occupies, or None while it is on time."""
+    breach = ticket.__dict__.get('sla_breach')
+    return (ticket.__dict__.get('status_id'), ticket.__dict__.get('priority_id'), breach) if breach else None
+
+
+def bump(field, bucket, delta):
+    if bucket is None or not delta:
+        return
+    bump_row(TicketCounter, {field + '_id': bucket}, delta)
+
+
+def bump_row(model, bucket, delta):
+    counters = model.objects.filter(**bucket)
+    if counters.update(ticket_count=F('ticket_count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**bucket, ticket_count=delta)
+    except IntegrityError:
+        counters.update(ticket_count=F('ticket_count') + delta)
+
+
+def apply_change(old_buckets, new_buckets):
+    """Move one ticket from `old_buckets` to `new_buckets`; either may be None."""
+    apply_changes([(old_buckets, new_buckets)])
+
+
+def apply_changes(changes):
+    """Apply many `(old_buckets, new_buckets)` moves with one update per touched bucket."""
+    deltas = Counter()
+    for old_buckets, new_buckets in changes:
+        for index, field in enumerate(COUNTER_FIELDS):
+            old = old_buckets[index] if old_buckets else None
+            new = new_buckets[index] if new_buckets else None
+            if old != new:
+                deltas[field, old] -= 1
+                deltas[field, new] += 1
+    with transaction.atomic():
+        for (field, bucket), delta in deltas.items():
+            bump(field, bucket, delta)
+
+
+def apply_sla_changes(changes):
+    """Apply many `(old sla_bucket, new sla_bucket)` moves with one update per touched counter."""
+    deltas = Counter()
+    for old, new in changes:
+        if old != new:
+            deltas[old] -= 1
+            deltas[new] += 1
+    deltas.pop(None, None)
+    if not any(deltas.values()):
+        return
+    with transaction.atomic():
+        for (status_id, priority_id, breach), delta in deltas.items():
+            if delta:
+                bump_row(SlaCounter, {'status_id': status_id, 'priority_id': priority_id, 'breach': breach}, delta)
+
+
+def rebuild_counters():
+    with transaction.atomic():
+        TicketCounter.objects.all().delete()
+        counters = []
+        for field in COUNTER_FIELDS:
+            rows = Ticket.objects.order_by().values(field).annotate(total=Count('id'))
+            counters.extend(
+                TicketCounter(**{field + '_id': row[field], 'ticket_count': row['total']})
+                for row in rows
+            )
+        TicketCounter.objects.bulk_create(counters)
+
+        SlaCounter.objects.all().delete()
+        rows = Ticket.objects.exclude(sla_breach='').order_by().values_list('status', 'priority', 'sla_breach').annotate(Count('id'))
+        SlaCounter.objects.bulk_create(
+            SlaCounter(status_id=status_id, priority_id=priority_id, breach=breach, ticket_count=count)
+            for status_id, priority_id, breach, count in rows
+        )
+    return len(counters) + len(rows)
+
+
+def counter_values(field):
+    """`{bucket id: count}` for one dimension, without joining the lookup table."""
+    return dict(
+        TicketCounter.objects.filter(**{field + '__isnull': False, 'ticket_count__gt': 0})
+        .values_list(field + '_id', 'ticket_count')
+    )
+
+
+async def acounter_values(field):
+    """Async `counter_values`, for the async dashboard views."""
+    rows = (
+        TicketCounter.objects.filter(**{field + '__isnull': False, 'ticket_count__gt': 0})
+        .values_list(field + '_id', 'ticket_count')
+    )
+    return {bucket: count async for bucket, count in rows}
+
+
+def overview_counts(counts=None):
+    """Total/open/closed tickets from the per-status `counts` (read if not given)."""
+    if counts is None:
+        counts = counter_values('status')
+    closed = set(reference(Status).ids(is_closed=True))
+    closed_tickets = sum(count for pk, count in counts.items() if pk in closed)
+    return {
+        'total_tickets': sum(counts.values()),
+        'open_tickets': sum(counts.values()) - closed_tickets,
+        'closed_tickets': closed_tickets,
+    }
+
+
+def bucket_counts(field, counts=None):
+    """Per-bucket counts shaped like `Ticket.objects.values('<field>__name').annotate(count=...)`."""
+    if counts is None:
+        counts = counter_values(field)
+    registry = reference(COUNTER_MODELS[field])
+    totals = {}
+    for pk, count in counts.items():
+        row = registry.get(pk)
+        if row is not None:
+            key = (row.order, row.name)
+            totals[key] = totals.get(key, 0) + count
+    return [{field + '__name': name, 'count': count} for (order, name), count in sorted(totals.items(), key=lambda item: item[0][0])]
+
+
+def sla_summary(now, window):
+    """
+    Open tickets past an SLA deadline, from the counters, and the deadlines
+    due within `window`, from the `due_at` index; in total and per priority.
+    """
+    open_statuses = reference(Status).ids(is_closed=False)
+    counts = {}
+    for priority_id, breach, count in (
+        SlaCounter.objects.filter(status__in=open_statuses, ticket_count__gt=0).values_list('priority', 'breach', 'ticket_count')
+    ):
+        counts.setdefault(priority_id, Counter())[breach + '_breached'] += count
+    at_risk = (
+        Ticket.objects.filter(due_at__gt=now, due_at__lte=now + window)
+        .order_by().values_list('priority').annotate(Count('id'))
+    )
+    for priority_id, count in at_risk:
+        counts.setdefault(priority_id, Counter())['at_risk'] += count
+    next_due_at = Ticket.objects.filter(due_at__gt=now).order_by('due_at').values_list('due_at', flat=True).first()
+
+    registry = reference(Priority)
+    rows = []
+    for priority_id, row in counts.items():
+        priority = registry.get(priority_id)
+        if priority is not None:
+            rows.append((priority.order, priority_id, {
+                'priority': priority_id,
+                'priority__name': priority.name,
+                **{key: row[key] for key in ('response_breached', 'resolution_breached', 'at_risk')},
+            }))
+    rows = [row for order, pk, row in sorted(rows, key=lambda item: item[:2])]
+    return {
+        'response_breached': sum(row['response_breached'] for row in rows),
+        'resolution_breached': sum(row['resolution_breached'] for row in rows),
+        'at_risk': sum(row['at_risk'] for row in rows),
+        'next_due_at': next_due_at,
+        'by_priority': rows,
+    }
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly ticket rollups behind /api/dashboard/timeseries/"
+
+    def handle(self, *args, **options):
+        rows = backfill_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {rows} ticket rollup rows"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard ticket counters from the ticket table, e.g. after tickets were changed with raw SQL"
+
+    def handle(self, *args, **options):
+        buckets = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} ticket counter buckets"))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_counters(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketCounter = apps.get_model('dashboard', 'TicketCounter')
+    counters = []
+    for field in ('status', 'priority', 'category'):
+        rows = Ticket.objects.order_by().values(field).annotate(total=models.Count('id'))
+        counters.extend(TicketCounter(**{field + '_id': row[field], 'ticket_count': row['total']}) for row in rows)
+    TicketCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tickets', '0005_ticket_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_count', models.IntegerField(default=0)),
+                ('category', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ticket_counter', to='tickets.category')),
+                ('priority', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ticket_counter', to='tickets.priority')),
+                ('status', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ticket_counter', to='tickets.status')),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0012_sla_deadlines'),
+        ('dashboard', '0002_ticketrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlaCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('breach', models.CharField(choices=[('', 'None'), ('response', 'Response'), ('resolution', 'Resolution')], max_length=16)),
+                ('ticket_count', models.IntegerField(default=0)),
+                ('priority', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tickets.priority')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tickets.status')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='slacounter',
+            constraint=models.UniqueConstraint(fields=('status', 'priority', 'breach'), name='slacounter_unique'),
+        ),
+    ]
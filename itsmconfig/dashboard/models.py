@@ -1,3 +1,76 @@
 from django.db import models
+from django.contrib.auth.models import User
+from tickets.models import Status, Priority, Category, Ticket
 
 # Create your models here.
+
+
+class TicketCounter(models.Model):
+    """
+    Number of tickets in one status, priority or category bucket.
+
+    Exactly one of the foreign keys is set per row. Rows are kept current by
+    the `Ticket` signals in `dashboard.signals`; the `rebuild_ticket_counters`
+    command recomputes them from scratch after writes that bypass the signals
+    (see `dashboard.counters`).
+    """
+    status = models.OneToOneField(Status, on_delete=models.CASCADE, null=True, related_name='ticket_counter')
+    priority = models.OneToOneField(Priority, on_delete=models.CASCADE, null=True, related_name='ticket_counter')
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, null=True, related_name='ticket_counter')
+    ticket_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        bucket = self.status or self.priority or self.category
+        return f"{bucket}: {self.ticket_count}"
+
+
+class TicketRollup(models.Model):
+    """
+    Hourly count of tickets created and closed, split by the ticket's current
+    status, priority, category and assignee. A ticket counts as created in
+    the hour of `created_at` and, while in a closed status, as closed in the
+    hour of its last update.
+
+    The `Ticket` signals in `dashboard.signals` move a ticket's counts as it
+    changes or is deleted, so the rows add up to what the
+    `backfill_ticket_rollups` command computes from the ticket table. Rows
+    may be duplicated under concurrent writes; readers always sum them.
+    """
+    bucket = models.DateTimeField()
+    status = models.ForeignKey(Status, on_delete=models.CASCADE, related_name='+')
+    priority = models.ForeignKey(Priority, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_count = models.IntegerField(default=0)
+    closed_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket'], name='rollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H:00}: +{self.created_count} / -{self.closed_count}"
+
+
+class SlaCounter(models.Model):
+    """
+    Number of tickets in one status and priority that have missed an SLA
+    deadline of one kind; see `tickets.sla`.
+
+    Kept current by the same signals as `TicketCounter` and rebuilt with it
+    by `rebuild_ticket_counters`. Readers pick the open statuses themselves,
+    so closing a status needs no rebuild.
+    """
+    status = models.ForeignKey(Status, on_delete=models.CASCADE, related_name='+')
+    priority = models.ForeignKey(Priority, on_delete=models.CASCADE, related_name='+')
+    breach = models.CharField(max_length=16, choices=Ticket.SLA_BREACHES)
+    ticket_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'priority', 'breach'], name='slacounter_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.status} / {self.priority} / {self.breach}: {self.ticket_count}"
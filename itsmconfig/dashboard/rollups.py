@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from tickets.models import Status, Ticket
+from tickets.reference import reference
+
+from .models import TicketRollup
+
+INTERVALS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+ROLLUP_DIMENSIONS = ('status', 'priority', 'category', 'assigned_to')
+
+
+def floor_to_interval(value, interval):
+    value = timezone.localtime(value).replace(minute=0, second=0, microsecond=0)
+    if interval in ('day', 'week'):
+        value = value.replace(hour=0)
+    if interval == 'week':
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def rollup_state(ticket):
+    """What a ticket's rollup counts depend on, without loading relations."""
+    return tuple(ticket.__dict__.get(name) for name in ('created_at', 'updated_at', *(f + '_id' for f in ROLLUP_DIMENSIONS)))
+
+
+def rollup_counts(state, closed_ids):
+    """
+    `{key: (created, closed)}` for one ticket, as `backfill_rollups` counts
+    it: created in the hour of `created_at` and, while in a closed status,
+    closed in the hour of its last update, under its current dimensions.
+    """
+    created_at, updated_at, *dimensions = state
+    counts = {(floor_to_interval(created_at, 'hour'), *dimensions): (1, 0)}
+    if dimensions[0] in closed_ids:
+        key = (floor_to_interval(updated_at, 'hour'), *dimensions)
+        counts[key] = (counts.get(key, (0, 0))[0], 1)
+    return counts
+
+
+def record_events(events):
+    """Add `{key: (created, closed)}` deltas to the rollups, one write per key."""
+    dimensions = [field + '_id' for field in ROLLUP_DIMENSIONS]
+    with transaction.atomic():
+        for key, (created, closed) in events.items():
+            values = dict(zip(dimensions, key[1:]), bucket=key[0])
+            rows = TicketRollup.objects.filter(**values)
+            if rows.update(created_count=F('created_count') + created, closed_count=F('closed_count') + closed):
+                continue
+            if created > 0 or closed > 0:
+                TicketRollup.objects.create(created_count=max(created, 0), closed_count=max(closed, 0), **values)
+
+
+def move_rollups(moves):
+    """
+    Move tickets from the rollups of their old `rollup_state` to those of the
+    new one, for `(old, new)` pairs where either may be None. A ticket loaded
+    without its timestamps has an unknown old state and is left alone.
+    """
+    closed_ids = set(reference(Status).ids(is_closed=True))
+    deltas = {}
+    for old, new in moves:
+        if old is not None and old[0] is None:
+            continue
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            for key, (created, closed) in rollup_counts(state, closed_ids).items():
+                total = deltas.get(key, (0, 0))
+                deltas[key] = (total[0] + sign * created, total[1] + sign * closed)
+    events = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+    if events:
+        record_events(events)
+
+
+def backfill_rollups():
+    """
+    Recompute every rollup from the ticket table. Tickets currently in a
+    closed status count as closed at their last update.
+    """
+    dimensions = [field + '_id' for field in ROLLUP_DIMENSIONS]
+    totals = {}
+    created = (
+        Ticket.objects.order_by()
+        .annotate(hour=Trunc('created_at', 'hour'))
+        .values('hour', *dimensions)
+        .annotate(total=Count('id'))
+    )
+    closed = (
+        Ticket.objects.order_by()
+        .filter(status__is_closed=True)
+        .annotate(hour=Trunc('updated_at', 'hour'))
+        .values('hour', *dimensions)
+        .annotate(total=Count('id'))
+    )
+    for rows, index in ((created, 0), (closed, 1)):
+        for row in rows:
+            key = (row['hour'],) + tuple(row[field] for field in dimensions)
+            totals.setdefault(key, [0, 0])[index] += row['total']
+
+    with transaction.atomic():
+        TicketRollup.objects.all().delete()
+        TicketRollup.objects.bulk_create(
+            [
+                TicketRollup(bucket=key[0], created_count=counts[0], closed_count=counts[1],
+                             **dict(zip(dimensions, key[1:])))
+                for key, counts in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def timeseries(interval, start, end, filters=None):
+    """Created/closed counts per `interval` in [start, end), zero-filled."""
+    start = floor_to_interval(start, interval)
+    rows = (
+        TicketRollup.objects.filter(bucket__gte=start, bucket__lt=end, **(filters or {}))
+        .annotate(period=Trunc('bucket', interval))
+        .values('period')
+        .annotate(created=Sum('created_count'), closed=Sum('closed_count'))
+        .order_by('period')
+    )
+    counts = {row['period']: row for row in rows}
+    series = []
+    period = start
+    while period < end:
+        row = counts.get(period, {})
+        series.append({
+            'bucket': period,
+            'created': row.get('created') or 0,
+            'closed': row.get('closed') or 0,
+        })
+        period = floor_to_interval(period + INTERVALS[interval], interval)
+    return series
@@ -1,5 +1,8 @@
+from django.utils import timezone
 from rest_framework import serializers  
 
+from .rollups import INTERVALS
+
 class DashboardOverviewSerializer(serializers.Serializer):
     total_tickets = serializers.IntegerField()
     open_tickets = serializers.IntegerField()
@@ -9,4 +12,50 @@ class DashboardMetricsSerializer(serializers.Serializer):
     tickets_by_status = serializers.ListField(child=serializers.DictField())
     tickets_by_priority = serializers.ListField(child=serializers.DictField())
     tickets_by_category = serializers.ListField(child=serializers.DictField())
-    
\ No newline at end of file
+    
+class DashboardTimeseriesQuerySerializer(serializers.Serializer):
+    interval = serializers.ChoiceField(choices=['hour', 'day', 'week'], default='day')
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    status = serializers.IntegerField(required=False)
+    priority = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    assigned_to = serializers.IntegerField(required=False)
+
+    max_buckets = 1000
+
+    def validate(self, attrs):
+        step = INTERVALS[attrs['interval']]
+        attrs.setdefault('end', timezone.now())
+        attrs.setdefault('start', attrs['end'] - step * 30)
+        if attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError("'start' must be before 'end'.")
+        if (attrs['end'] - attrs['start']) / step > self.max_buckets:
+            raise serializers.ValidationError(f"Range spans more than {self.max_buckets} buckets; use a coarser interval.")
+        return attrs
+
+class DashboardTimeseriesPointSerializer(serializers.Serializer):
+    bucket = serializers.DateTimeField()
+    created = serializers.IntegerField()
+    closed = serializers.IntegerField()
+
+class DashboardTimeseriesSerializer(serializers.Serializer):
+    interval = serializers.CharField()
+    results = DashboardTimeseriesPointSerializer(many=True)
+
+class DashboardSlaQuerySerializer(serializers.Serializer):
+    window = serializers.IntegerField(default=60, min_value=1, max_value=7 * 24 * 60, help_text="Minutes ahead counted as at risk")
+
+class DashboardSlaPrioritySerializer(serializers.Serializer):
+    priority = serializers.IntegerField()
+    priority__name = serializers.CharField()
+    response_breached = serializers.IntegerField()
+    resolution_breached = serializers.IntegerField()
+    at_risk = serializers.IntegerField()
+
+class DashboardSlaSerializer(serializers.Serializer):
+    response_breached = serializers.IntegerField()
+    resolution_breached = serializers.IntegerField()
+    at_risk = serializers.IntegerField()
+    next_due_at = serializers.DateTimeField(allow_null=True)
+    by_priority = DashboardSlaPrioritySerializer(many=True)
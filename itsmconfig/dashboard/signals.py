@@ -0,0 +1,55 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from tickets.models import Ticket
+from tickets.signals import tickets_bulk_created, tickets_bulk_updated
+
+from .counters import apply_change, apply_changes, apply_sla_changes, sla_bucket, ticket_buckets
+from .rollups import move_rollups, rollup_state
+
+
+@receiver(post_init, sender=Ticket)
+def remember_ticket_buckets(sender, instance, **kwargs):
+    instance._counter_buckets = ticket_buckets(instance) if instance.pk else None
+    instance._sla_bucket = sla_bucket(instance) if instance.pk else None
+    instance._rollup_state = rollup_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Ticket)
+def update_ticket_aggregates(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_buckets = None if created else instance._counter_buckets
+    new_buckets = ticket_buckets(instance)
+    apply_change(old_buckets, new_buckets)
+    apply_sla_changes([(None if created else instance._sla_bucket, sla_bucket(instance))])
+    move_rollups([(None if created else instance._rollup_state, rollup_state(instance))])
+    instance._counter_buckets = new_buckets
+    instance._sla_bucket = sla_bucket(instance)
+    instance._rollup_state = rollup_state(instance)
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_counters(sender, instance, **kwargs):
+    apply_change(instance._counter_buckets, None)
+    apply_sla_changes([(instance._sla_bucket, None)])
+    move_rollups([(instance._rollup_state, None)])
+
+
+@receiver(tickets_bulk_created)
+@receiver(tickets_bulk_updated)
+def update_bulk_ticket_aggregates(sender, tickets, signal, **kwargs):
+    created = signal is tickets_bulk_created
+    changes, sla_changes, rollup_moves = [], [], []
+    for ticket in tickets:
+        old_buckets = None if created else ticket._counter_buckets
+        new_buckets = ticket_buckets(ticket)
+        changes.append((old_buckets, new_buckets))
+        sla_changes.append((None if created else ticket._sla_bucket, sla_bucket(ticket)))
+        rollup_moves.append((None if created else ticket._rollup_state, rollup_state(ticket)))
+        ticket._counter_buckets = new_buckets
+        ticket._sla_bucket = sla_bucket(ticket)
+        ticket._rollup_state = rollup_state(ticket)
+    apply_changes(changes)
+    apply_sla_changes(sla_changes)
+    move_rollups(rollup_moves)
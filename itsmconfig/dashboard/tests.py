@@ -1,3 +1,255 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models import Count, QuerySet
+from django.db.models.functions import Trunc
+from asgiref.sync import sync_to_async
 from django.test import TestCase
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from metrics.testing import QueryScalingTestMixin
+from tickets.management.commands.sla_scheduler import Command as SlaScheduler
+from tickets.models import Category, Priority, Status, Ticket
+from tickets.testing import TicketFixturesMixin, async_api_views, auth_headers
+
+from .async_views import AsyncDashboardMetricsAPIView
+from .counters import rebuild_counters
+from .rollups import INTERVALS, floor_to_interval, timeseries
+from .models import SlaCounter, TicketCounter, TicketRollup
 
 # Create your tests here.
+
+
+class DashboardQueryScalingTests(TicketFixturesMixin, QueryScalingTestMixin, TestCase):
+    """Dashboard totals must not run a query per ticket or per bucket."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', 'admin')
+        cls.add_tickets(1)
+
+    @classmethod
+    def add_tickets(cls, count):
+        # Each ticket gets its own status, priority, category and assignee, so every breakdown grows.
+        for _ in range(count):
+            number = Ticket.objects.count()
+            agent = cls.create_user(f'agent{number}', 'agent')
+            Ticket.objects.create(
+                title=f'Printer {number}', description='Printer jammed',
+                status=Status.objects.create(name=f'Status {number}', description='', color='green'),
+                priority=Priority.objects.create(name=f'P{number}', description='', color='red'),
+                category=Category.objects.create(name=f'Category {number}', description=''),
+                created_by=cls.admin, assigned_to=agent,
+            )
+
+    def test_dashboard(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        start = (timezone.now() - timedelta(days=2)).isoformat()
+        for url, params in (
+            ('/api/dashboard/overview/', {}),
+            ('/api/dashboard/metrics/', {}),
+            ('/api/dashboard/timeseries/', {'interval': 'hour', 'start': start}),
+            ('/api/dashboard/sla/', {}),
+        ):
+            with self.subTest(url=url):
+                self.assertQueriesDoNotScale(
+                    lambda: client.get(url, params), lambda: self.add_tickets(4), label=f'GET {url}',
+                )
+
+
+class DashboardSlaTests(TicketFixturesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', 'admin')
+        cls.create_lookups(order=1, response_minutes=30, resolution_minutes=120)
+        cls.high = cls.priority
+        cls.low = Priority.objects.create(name='Low', description='', color='grey', order=2, response_minutes=240, resolution_minutes=480)
+        cls.start = timezone.now()
+        for priority in (cls.high, cls.high, cls.low):
+            Ticket.objects.create(title='Down', description='', status=cls.status, priority=priority, category=cls.category, created_by=cls.admin)
+
+    def test_breaches_and_deadlines_at_risk(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        now = self.start + timedelta(minutes=60)
+        SlaScheduler().settle_due(now, batch_size=100)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            data = client.get('/api/dashboard/sla/', {'window': 90}).json()
+        self.assertEqual((data['response_breached'], data['resolution_breached'], data['at_risk']), (2, 0, 2))
+        self.assertEqual(data['by_priority'], [
+            {'priority': self.high.pk, 'priority__name': 'P1', 'response_breached': 2, 'resolution_breached': 0, 'at_risk': 2},
+        ])
+
+        SlaScheduler().settle_due(now + timedelta(minutes=90), batch_size=100)
+        closed = Ticket.objects.filter(priority=self.high).first()
+        closed.status = self.closed
+        closed.save()
+        with mock.patch('django.utils.timezone.now', return_value=now + timedelta(minutes=90)):
+            data = client.get('/api/dashboard/sla/').json()
+        self.assertEqual((data['response_breached'], data['resolution_breached'], data['at_risk']), (0, 1, 0))
+        self.assertEqual([row['priority__name'] for row in data['by_priority']], ['P1'])
+
+        counters = set(SlaCounter.objects.filter(ticket_count__gt=0).values_list('status', 'priority', 'breach', 'ticket_count'))
+        rebuild_counters()
+        self.assertEqual(set(SlaCounter.objects.values_list('status', 'priority', 'breach', 'ticket_count')), counters)
+
+
+class DashboardCounterTests(TicketFixturesMixin, TestCase):
+    """Ticket writes move the counters to what a rebuild from the ticket table computes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', 'admin')
+        cls.create_lookups(response_minutes=30)
+        cls.low = Priority.objects.create(name='P2', description='', color='grey')
+        cls.tickets = [
+            Ticket.objects.create(
+                title='Down', description='', status=cls.status, priority=cls.priority,
+                category=cls.category, created_by=cls.admin,
+            )
+            for _ in range(3)
+        ]
+
+    def counters(self):
+        return (
+            set(TicketCounter.objects.filter(ticket_count__gt=0).values_list('status', 'priority', 'category', 'ticket_count')),
+            set(SlaCounter.objects.filter(ticket_count__gt=0).values_list('status', 'priority', 'breach', 'ticket_count')),
+        )
+
+    def assertCountersMatchRebuild(self):
+        counters = self.counters()
+        rebuild_counters()
+        self.assertEqual(self.counters(), counters)
+
+    def test_update_and_delete(self):
+        moved, deleted, bulk = self.tickets
+        SlaScheduler().settle_due(timezone.now() + timedelta(minutes=60), batch_size=100)
+        moved = Ticket.objects.get(pk=moved.pk)
+        moved.status, moved.priority = self.closed, self.low
+        moved.save()
+        Ticket.objects.get(pk=deleted.pk).delete()
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        client.post('/api/tickets/bulk/', [{'op': 'transition', 'id': bulk.pk, 'status': self.closed.pk}], format='json')
+        self.assertCountersMatchRebuild()
+
+    def test_writes_lock_the_ticket_before_loading_it(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        ticket = self.tickets[0]
+        data = {'title': 'Down', 'description': 'Still down', 'status': self.closed.pk,
+                'priority': self.priority.pk, 'category': self.category.pk}
+        for method, args in ((client.put, (data,)), (client.delete, ())):
+            with self.subTest(method=method.__name__), mock.patch.object(
+                QuerySet, 'select_for_update', autospec=True, side_effect=QuerySet.select_for_update,
+            ) as lock:
+                response = method(f'/api/tickets/{ticket.pk}/', *args, format='json')
+                self.assertLess(response.status_code, 300, response.content)
+                self.assertTrue(lock.called)
+        self.assertCountersMatchRebuild()
+
+    def test_rebuild_repairs_drift(self):
+        # A queryset update skips the signals.
+        Ticket.objects.filter(pk=self.tickets[1].pk).update(status=self.closed)
+        drifted = self.counters()
+        call_command('rebuild_ticket_counters', stdout=io.StringIO())
+        self.assertNotEqual(self.counters(), drifted)
+        self.assertCountersMatchRebuild()
+
+
+class DashboardRollupTests(TicketFixturesMixin, TestCase):
+    """The rollups behind the timeseries always add up to an aggregate over the ticket table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', 'admin')
+        cls.create_lookups()
+        cls.start = timezone.now().replace(hour=9, minute=30) - timedelta(days=10)
+
+    def at(self, days, hours=0):
+        return mock.patch('django.utils.timezone.now', return_value=self.start + timedelta(days=days, hours=hours))
+
+    def aggregate(self, interval):
+        """`{period: (created, closed)}` straight from Ticket, counting closed tickets at their last update."""
+        totals = {}
+        for field, tickets, index in (
+            ('created_at', Ticket.objects.all(), 0),
+            ('updated_at', Ticket.objects.filter(status__is_closed=True), 1),
+        ):
+            rows = tickets.annotate(period=Trunc(field, interval)).order_by().values_list('period').annotate(Count('id'))
+            for period, count in rows:
+                totals.setdefault(period, [0, 0])[index] += count
+        return {period: tuple(counts) for period, counts in totals.items()}
+
+    def assertMatchesTickets(self):
+        end = self.start + timedelta(days=14)
+        for interval in INTERVALS:
+            with self.subTest(interval=interval):
+                series = timeseries(interval, self.start - timedelta(days=7), end)
+                buckets = [row['bucket'] for row in series]
+                self.assertEqual(buckets[0], floor_to_interval(self.start - timedelta(days=7), interval))
+                self.assertTrue(all(later - earlier == INTERVALS[interval] for earlier, later in zip(buckets, buckets[1:])))
+                self.assertGreater(buckets[-1] + INTERVALS[interval], end - timedelta(microseconds=1))
+                counts = {row['bucket']: (row['created'], row['closed']) for row in series if row['created'] or row['closed']}
+                self.assertEqual(counts, self.aggregate(interval))
+        rows = set(TicketRollup.objects.values_list('bucket', 'status', 'priority', 'category', 'assigned_to', 'created_count', 'closed_count'))
+        call_command('backfill_ticket_rollups', stdout=io.StringIO())
+        rebuilt = set(TicketRollup.objects.values_list('bucket', 'status', 'priority', 'category', 'assigned_to', 'created_count', 'closed_count'))
+        self.assertEqual({row for row in rows if row[-2:] != (0, 0)}, rebuilt)
+
+    def test_creates_closes_reopens_and_bulk_writes(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        common = {'description': 'Down', 'status': self.status.pk, 'priority': self.priority.pk, 'category': self.category.pk}
+        with self.at(0):
+            first = Ticket.objects.create(title='First', description='', status=self.status, priority=self.priority,
+                                          category=self.category, created_by=self.admin)
+        with self.at(1, 3):
+            results = client.post('/api/tickets/bulk/', [
+                {'op': 'create', 'title': 'Second', **common}, {'op': 'create', 'title': 'Third', **common},
+            ], format='json').json()['results']
+        second, third = (result['id'] for result in results)
+        with self.at(2):
+            self.assertEqual(client.put(f'/api/tickets/{first.pk}/', {'title': 'First', **common, 'status': self.closed.pk}, format='json').status_code, 200)
+        with self.at(3, 5):
+            client.post('/api/tickets/bulk/', [
+                {'op': 'transition', 'id': second, 'status': self.closed.pk},
+                {'op': 'transition', 'id': third, 'status': self.closed.pk},
+            ], format='json')
+        self.assertMatchesTickets()
+
+        with self.at(9):
+            # Reopened, edited while closed, and deleted.
+            client.post('/api/tickets/bulk/', [{'op': 'transition', 'id': second, 'status': self.status.pk}], format='json')
+            self.assertEqual(client.put(f'/api/tickets/{first.pk}/', {'title': 'Renamed', **common, 'status': self.closed.pk}, format='json').status_code, 200)
+            self.assertEqual(client.delete(f'/api/tickets/{third}/').status_code, 204)
+        self.assertMatchesTickets()
+
+
+class AsyncDashboardViewTests(TicketFixturesMixin, TestCase):
+    """The async dashboard views return what the sync ones do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', 'admin')
+        cls.create_lookups(response_minutes=30)
+        cls.headers = auth_headers(cls.admin)
+        for status in (cls.status, cls.status, cls.closed):
+            Ticket.objects.create(title='Down', description='', status=status, priority=cls.priority, category=cls.category, created_by=cls.admin)
+
+    async def test_same_payloads(self):
+        urls = ['/api/dashboard/overview/', '/api/dashboard/metrics/', '/api/dashboard/sla/', '/api/dashboard/timeseries/?interval=day']
+        sync = {url: await sync_to_async(self.client.get)(url, headers=self.headers) for url in urls}
+        with async_api_views():
+            self.assertIs(resolve('/api/dashboard/metrics/').func.view_class, AsyncDashboardMetricsAPIView)
+            for url in urls:
+                with self.subTest(url=url):
+                    response = await self.async_client.get(url, headers=self.headers)
+                    self.assertEqual(response.status_code, 200, response.content)
+                    self.assertEqual(response.json(), sync[url].json())
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
-from .views import DashboardOverviewAPIView, DashboardMetricsAPIView
+from .views import DashboardOverviewAPIView, DashboardMetricsAPIView, DashboardSlaAPIView, DashboardTimeseriesAPIView
+
+if settings.ASYNC_API_VIEWS:
+    from .async_views import AsyncDashboardMetricsAPIView as DashboardMetricsAPIView
+    from .async_views import AsyncDashboardOverviewAPIView as DashboardOverviewAPIView
+    from .async_views import AsyncDashboardSlaAPIView as DashboardSlaAPIView
+    from .async_views import AsyncDashboardTimeseriesAPIView as DashboardTimeseriesAPIView
 
 urlpatterns = [
     path('overview/', DashboardOverviewAPIView.as_view(), name='dashboard-overview'),
     path('metrics/', DashboardMetricsAPIView.as_view(), name='dashboard-metrics'),
+    path('timeseries/', DashboardTimeseriesAPIView.as_view(), name='dashboard-timeseries'),
+    path('sla/', DashboardSlaAPIView.as_view(), name='dashboard-sla'),
     
 ]  
\ No newline at end of file
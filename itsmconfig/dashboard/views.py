@@ -1,18 +1,32 @@
+from datetime import timedelta
+
 from django.shortcuts import render
 
+from metrics.instrumentation import serialize
 from tickets.models import Ticket
+from users.principal import get_principal
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
 from rest_framework.permissions import BasePermission
 from django.db.models import Count
+from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
-from .serializers import DashboardOverviewSerializer, DashboardMetricsSerializer    
+from .counters import COUNTER_FIELDS, bucket_counts, counter_values, overview_counts, sla_summary
+from .rollups import ROLLUP_DIMENSIONS, timeseries
+from .serializers import (
+    DashboardOverviewSerializer,
+    DashboardMetricsSerializer,
+    DashboardTimeseriesQuerySerializer,
+    DashboardTimeseriesSerializer,
+    DashboardSlaQuerySerializer,
+    DashboardSlaSerializer,
+)
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.usermodel.role in ['admin', 'agent']
+        return get_principal(request.user).role in ['admin', 'agent']
 
 class DashboardOverviewAPIView(APIView):
       permission_classes = [IsAuthenticated, IsAdmin]
@@ -22,17 +36,7 @@ class DashboardOverviewAPIView(APIView):
         responses={200: DashboardOverviewSerializer(many=True)}
       )
       def get(self, request):
-          tickets = Ticket.objects.all()
-
-          total_tickets = tickets.count()
-          open_tickets = tickets.filter(status__is_closed=False).count()
-          closed_tickets = tickets.filter(status__is_closed=True).count()
-
-          return Response(  {
-              'total_tickets': total_tickets,
-              'open_tickets': open_tickets,
-              'closed_tickets': closed_tickets
-          })
+          return Response(overview_counts())
       
 class DashboardMetricsAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
@@ -42,22 +46,41 @@ class DashboardMetricsAPIView(APIView):
         responses={200: DashboardMetricsSerializer}
     )
     def get(self, request):
-        tickets = Ticket.objects.all()
+        return Response(self.metrics({field: counter_values(field) for field in COUNTER_FIELDS}))
+
+    def metrics(self, counts):
+        return {'tickets_by_' + field: bucket_counts(field, counts[field]) for field in COUNTER_FIELDS}
+
+
+class DashboardTimeseriesAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
 
-        status_counts = tickets.values('status__name').annotate(
-            count=Count('id')
-        ).order_by('status__order')
+    @swagger_auto_schema(
+        operation_description="Get created/closed ticket counts per hour, day or week",
+        query_serializer=DashboardTimeseriesQuerySerializer,
+        responses={200: DashboardTimeseriesSerializer}
+    )
+    def get(self, request):
+        query = DashboardTimeseriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        filters = {field: params[field] for field in ROLLUP_DIMENSIONS if field in params}
+        series = timeseries(params['interval'], params['start'], params['end'], filters)
+        serializer = DashboardTimeseriesSerializer({'interval': params['interval'], 'results': series})
+        return Response(serialize(serializer))
 
-        priority_counts = tickets.values('priority__name').annotate(
-            count=Count('id')
-        ).order_by('priority__order')
 
-        category_counts = tickets.values('category__name').annotate(
-            count=Count('id')
-        ).order_by('category__order')
+class DashboardSlaAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
 
-        return Response({
-            'tickets_by_status': list(status_counts),
-            'tickets_by_priority': list(priority_counts),
-            'tickets_by_category': list(category_counts)
-        })
+    @swagger_auto_schema(
+        operation_description="Get open tickets past an SLA deadline and deadlines due within `window` minutes, per priority. "
+                              "Breaches are recorded by the sla_scheduler command.",
+        query_serializer=DashboardSlaQuerySerializer,
+        responses={200: DashboardSlaSerializer}
+    )
+    def get(self, request):
+        query = DashboardSlaQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        summary = sla_summary(timezone.now(), timedelta(minutes=query.validated_data['window']))
+        return Response(serialize(DashboardSlaSerializer(summary)))
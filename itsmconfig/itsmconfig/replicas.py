@@ -0,0 +1,140 @@
+"""
+Read replica routing.
+
+Safe-method requests to the views of the `DATABASE_REPLICAS['APPS']` read
+from one of `DATABASE_REPLICAS['ALIASES']`, picked per request. Writes,
+and reads outside such requests (commands, tasks, migrations), go to
+`default`.
+
+Replicas lag behind the primary, so reads go to `default` for the rest
+of a request once it writes or while it is in a transaction, and a user
+who wrote reads from `default` for the next `STICKY_SECONDS`. That pin is
+kept in the cache so every worker honors it. Code that fills a cache
+other requests trust, such as reference rows or principals, reads inside
+`primary_reads()`.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject, empty
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+current_reads = ContextVar('replicas_current_reads', default=None)
+primary_only = ContextVar('replicas_primary_only', default=False)
+
+
+@contextmanager
+def primary_reads():
+    token = primary_only.set(True)
+    try:
+        yield
+    finally:
+        primary_only.reset(token)
+
+
+def pin_key(user_id):
+    return f'replicas:pinned:{user_id}'
+
+
+def request_user_id(request):
+    """The authenticated user's id once authentication has run, else None. Never authenticates."""
+    user = request.__dict__.get('user')
+    if isinstance(user, LazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return user.pk if getattr(user, 'is_authenticated', False) else None
+
+
+class RequestReads:
+    """Where the reads of one request go."""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica = None
+        self.wrote = False
+        self.pinned = None
+
+    def alias(self):
+        if self.replica is None or self.wrote or primary_only.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if self.pinned is None:
+            # Known once DRF has authenticated the request; reads before that
+            # (the authentication itself) may use the replica.
+            user_id = request_user_id(self.request)
+            if user_id is not None:
+                self.pinned = bool(cache.get(pin_key(user_id)))
+        return None if self.pinned else self.replica
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        reads = current_reads.get()
+        return reads.alias() if reads is not None else None
+
+    def db_for_write(self, model, **hints):
+        reads = current_reads.get()
+        if reads is not None:
+            reads.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        return False if db in settings.DATABASE_REPLICAS['ALIASES'] else None
+
+
+class ReplicaMiddleware:
+    """Track each request's reads and writes for `ReplicaRouter`, and pin users who wrote to the primary."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.aliases = list(settings.DATABASE_REPLICAS['ALIASES'])
+        self.apps = set(settings.DATABASE_REPLICAS['APPS'])
+        self.sticky_seconds = settings.DATABASE_REPLICAS['STICKY_SECONDS']
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        reads = RequestReads(request)
+        token = current_reads.set(reads)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_reads.reset(token)
+        self.finish(reads)
+        return response
+
+    async def __acall__(self, request):
+        reads = RequestReads(request)
+        token = current_reads.set(reads)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_reads.reset(token)
+        self.finish(reads)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        reads = current_reads.get()
+        if (reads is not None and self.aliases and request.method in SAFE_METHODS
+                and view_func.__module__.partition('.')[0] in self.apps):
+            reads.replica = random.choice(self.aliases)
+
+    def finish(self, reads):
+        user_id = request_user_id(reads.request) if reads.wrote else None
+        if user_id is not None:
+            cache.set(pin_key(user_id), True, self.sticky_seconds)
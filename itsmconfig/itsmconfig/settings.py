@@ -44,9 +44,13 @@ INSTALLED_APPS = [
     'drf_yasg',
     'rest_framework_simplejwt',
     'dashboard',
+    'benchmarks',
+    'metrics',
+    'tasks',
 ]
 
 MIDDLEWARE = [
+    'metrics.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'itsmconfig.replicas.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'itsmconfig.urls'
@@ -84,9 +89,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # A second connection to the same file so replica routing runs locally;
+    # point it at a streaming replica of the primary in production. Tests
+    # use the default test database for it.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['itsmconfig.replicas.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -131,7 +146,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
       'DEFAULT_AUTHENTICATION_CLASSES': (
-          'rest_framework_simplejwt.authentication.JWTAuthentication',
+          'users.authentication.PrincipalJWTAuthentication',
       )
 }
 
@@ -157,3 +172,97 @@ SWAGGER_SETTINGS = {
     },
 }
 
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Reference data and ETag versions are shared through this cache, so every
+# worker must use the same backend in production (e.g. RedisCache).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+# Serve the ticket list/detail and dashboard views with async handlers.
+# Only worth enabling under an ASGI server (e.g. uvicorn itsmconfig.asgi:application);
+# under WSGI Django would run each async view in its own event loop.
+
+ASYNC_API_VIEWS = False
+
+# Build ticket and comment list responses from `.values()` rows instead of
+# model instances and DRF fields (see tickets/rows.py). The output is the same.
+
+FAST_READ_SERIALIZERS = True
+
+
+# Automatic assignment of new tickets (tickets/assignment.py). Agent loads are
+# kept per process and reloaded every REBUILD_SECONDS (None: only when agents,
+# skills or statuses change), which bounds their drift with several workers.
+
+TICKET_ASSIGNMENT = {
+    'ENABLED': True,
+    'REBUILD_SECONDS': 300,
+}
+
+
+# Read replicas (itsmconfig/replicas.py). Safe-method requests to the APPS'
+# views read from a random alias in ALIASES ([] reads everything from
+# default). A user who writes reads from default for STICKY_SECONDS, which
+# should exceed the replicas' usual lag.
+
+DATABASE_REPLICAS = {
+    'ALIASES': ['replica'],
+    'APPS': ['tickets', 'users', 'dashboard'],
+    'STICKY_SECONDS': 10,
+}
+
+
+# Background tasks (tasks/queue.py), run by `manage.py run_tasks` workers.
+# Search indexing waits for a worker unless EAGER runs tasks in-process as
+# soon as the transaction commits. EAGER follows DEBUG, so a development
+# server needs no worker and a deployment with DEBUG = False must run one.
+# Eager tasks are not retried; failures are logged to `tasks`. A worker that
+# holds a task for longer than LEASE_SECONDS is presumed dead and the task
+# runs again elsewhere.
+
+TASKS = {
+    'EAGER': DEBUG,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF_SECONDS': 10,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 300,
+}
+
+
+# Ticket change feed (/api/tickets/stream/)
+# LocalEventBackend only reaches clients connected to the same process; use
+# tickets.events.RedisEventBackend (OPTIONS: url, stream, maxlen) with several workers.
+# Under ASGI a client's stream stays open for up to 5 minutes. Under WSGI that
+# would hold a worker thread (and a blocking backend read) as long, so clients
+# get the events already waiting and reconnect after 3 seconds instead; set
+# HOLD_WSGI_STREAMS only when /api/tickets/stream/ goes to a dedicated worker pool.
+
+TICKET_EVENTS = {
+    'BACKEND': 'tickets.events.LocalEventBackend',
+    'OPTIONS': {'size': 1000},
+    'HOLD_WSGI_STREAMS': False,
+}
+
+
+# Request metrics (/metrics)
+# Counters are per process; scrape every worker. /metrics is refused unless
+# REMOTE_ADDR is in ALLOWED_IPS (behind a proxy, that is the proxy) or the
+# request sends `Authorization: Bearer <TOKEN>`. Set
+# SLOW_REQUEST_SECONDS (e.g. 0.5) to log slower requests with their SQL to
+# `metrics.slow_requests`. In development, NPLUSONE_THRESHOLD (e.g. 10) logs
+# requests that repeat one statement that many times to `metrics.nplusone`.
+
+METRICS = {
+    'SLOW_REQUEST_SECONDS': None,
+    'TOKEN': None,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+    'NPLUSONE_THRESHOLD': None,
+}
@@ -20,6 +20,8 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from metrics.views import metrics
+
 schema_view = get_schema_view(
     openapi.Info(
         title="ITSMC Config API",
@@ -34,6 +36,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from users.serializers import PrincipalTokenObtainPairSerializer, PrincipalTokenRefreshSerializer
 
 
 
@@ -42,8 +45,9 @@ urlpatterns = [
     path('api/', include('tickets.urls')),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/', TokenObtainPairView.as_view(serializer_class=PrincipalTokenObtainPairSerializer), name='token_obtain_pair'),
+    path('api/token/refresh/', TokenRefreshView.as_view(serializer_class=PrincipalTokenRefreshSerializer), name='token_refresh'),
     path('api/users/', include('users.urls')),
     path('api/dashboard/', include('dashboard.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
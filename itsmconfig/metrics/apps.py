@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class MetricsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'metrics'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .instrumentation import install_query_timer
+
+        connection_created.connect(install_query_timer, dispatch_uid='metrics.install_query_timer')
@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .nplusone import call_site, normalize
+
+MAX_STATEMENTS = 200
+
+
+class RequestStats:
+    """Work done on behalf of one request, across every thread it runs in."""
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'statements', 'repeat_threshold', 'repeats',
+                 'repeat_sites')
+
+    def __init__(self, capture_sql=False, repeat_threshold=None):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statements = [] if capture_sql else None
+        self.repeat_threshold = repeat_threshold
+        self.repeats = {} if repeat_threshold else None
+        self.repeat_sites = {}
+
+    def count_repeat(self, sql):
+        # The stack is only walked once a statement reaches the threshold.
+        key = normalize(sql)
+        count = self.repeats[key] = self.repeats.get(key, 0) + 1
+        if count == self.repeat_threshold:
+            self.repeat_sites[key] = call_site()
+
+    def repeated(self):
+        """`(count, normalized sql, call site)` for statements that reached the repeat threshold."""
+        return sorted(((self.repeats[key], key, site) for key, site in self.repeat_sites.items()), reverse=True)
+
+
+current_request = ContextVar('metrics_current_request', default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < MAX_STATEMENTS:
+            stats.statements.append((elapsed, context['connection'].alias, sql))
+        if stats.repeats is not None:
+            stats.count_repeat(sql)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    `connection_created` receiver adding `time_query` to the connection's
+    execute wrappers. Installing it per connection rather than per request
+    also covers queries that async views run in worker threads.
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@contextmanager
+def serializer_timer():
+    """Count the time spent in the block as serializer time of the current request."""
+    stats = current_request.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_seconds += time.perf_counter() - start
+
+
+def serialize(serializer):
+    """`serializer.data`, timed with `serializer_timer`. Views call this for their response data."""
+    with serializer_timer():
+        return serializer.data
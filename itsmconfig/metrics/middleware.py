@@ -0,0 +1,102 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import RequestStats, current_request
+from .registry import REGISTRY
+
+logger = logging.getLogger('metrics.slow_requests')
+nplusone_logger = logging.getLogger('metrics.nplusone')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+requests_total = REGISTRY.counter('http_requests_total', "Requests handled", ('method', 'route', 'status'))
+request_duration = REGISTRY.histogram('http_request_duration_seconds', "Time to produce the response", ('method', 'route'), LATENCY_BUCKETS)
+request_queries = REGISTRY.histogram('http_request_db_queries', "Database queries per request", ('method', 'route'), QUERY_BUCKETS)
+request_db_duration = REGISTRY.histogram('http_request_db_duration_seconds', "Time spent in database queries per request", ('method', 'route'), LATENCY_BUCKETS)
+request_serializer_duration = REGISTRY.histogram('http_request_serializer_duration_seconds', "Time spent building serializer data per request", ('method', 'route'), LATENCY_BUCKETS)
+response_size = REGISTRY.histogram('http_response_size_bytes', "Size of non-streaming response bodies", ('method', 'route'), SIZE_BUCKETS)
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return '/' + match.route if match is not None and match.route else 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    Record per-route request counts, latency, query count, database and
+    serializer time and response size in the process's metrics registry.
+
+    With `METRICS['SLOW_REQUEST_SECONDS']` set, requests slower than that are
+    logged to `metrics.slow_requests` along with the SQL they ran. With
+    `METRICS['NPLUSONE_THRESHOLD']` set, requests that run one statement
+    (ignoring parameters) that many times are logged to `metrics.nplusone`
+    with the code that issued it; meant for development, not production.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_seconds = settings.METRICS.get('SLOW_REQUEST_SECONDS')
+        self.nplusone_threshold = settings.METRICS.get('NPLUSONE_THRESHOLD')
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token, start = self.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, stats, start)
+        return response
+
+    def begin(self):
+        stats = RequestStats(
+            capture_sql=self.slow_request_seconds is not None, repeat_threshold=self.nplusone_threshold,
+        )
+        return stats, current_request.set(stats), time.perf_counter()
+
+    def record(self, request, response, stats, start):
+        elapsed = time.perf_counter() - start
+        labels = {'method': request.method, 'route': route_of(request)}
+        requests_total.inc(status=response.status_code, **labels)
+        request_duration.observe(elapsed, **labels)
+        request_queries.observe(stats.queries, **labels)
+        request_db_duration.observe(stats.db_seconds, **labels)
+        request_serializer_duration.observe(stats.serializer_seconds, **labels)
+        if not response.streaming:
+            response_size.observe(len(response.content), **labels)
+
+        if self.slow_request_seconds is not None and elapsed >= self.slow_request_seconds:
+            statements = '\n'.join(f'  [{alias}] {seconds * 1000:.1f} ms  {sql}' for seconds, alias, sql in stats.statements)
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, serializers %.0f ms\n%s",
+                request.method, request.get_full_path(), labels['route'], elapsed * 1000,
+                stats.queries, stats.db_seconds * 1000, stats.serializer_seconds * 1000, statements,
+            )
+
+        if stats.repeats is not None:
+            for count, sql, site in stats.repeated():
+                nplusone_logger.warning(
+                    "Possible N+1 in %s %s (%s): %d queries like\n  %s\n  first repeated at %s",
+                    request.method, request.get_full_path(), labels['route'], count, sql, site,
+                )
@@ -0,0 +1,69 @@
+import os
+import re
+import traceback
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+Query = namedtuple('Query', 'normalized sql call_site')
+
+_in_list = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_number = re.compile(r'\b\d+\b')
+_own_files = (os.path.dirname(__file__) + os.sep,)
+
+
+def normalize(sql):
+    """SQL with parameter lists and literal numbers collapsed, so repeats of one query compare equal."""
+    return _number.sub('N', _in_list.sub('(...)', sql))
+
+
+def call_site():
+    """The innermost project frame (outside this package) that led to the current query."""
+    base = str(settings.BASE_DIR) + os.sep
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(base) and not frame.filename.startswith(_own_files):
+            return f'{os.path.relpath(frame.filename, base)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryRecorder:
+    """Record every query run on any connection inside the block, with its call site."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(Query(normalize(sql), sql, call_site()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, min_count=2):
+        """`(count, normalized sql, call sites)` for statements run at least `min_count` times, most frequent first."""
+        groups = {}
+        for query in self.queries:
+            groups.setdefault(query.normalized, []).append(query.call_site)
+        return sorted(
+            ((len(sites), sql, sorted(set(sites))) for sql, sites in groups.items() if len(sites) >= min_count),
+            reverse=True,
+        )
+
+
+def describe(repeats):
+    lines = []
+    for count, sql, sites in repeats:
+        lines.append(f'  {count}x {sql}')
+        lines.extend(f'      at {site}' for site in sites)
+    return '\n'.join(lines)
@@ -0,0 +1,37 @@
+from .nplusone import QueryRecorder, describe
+
+
+class QueryScalingTestMixin:
+    """
+    N+1 guard for TestCase subclasses: an endpoint must issue the same
+    number of queries whatever the number of rows it returns.
+    """
+
+    def assertQueriesDoNotScale(self, fetch, grow, label=None):
+        """
+        Call `fetch()` (which returns a response), then `grow()` to add rows,
+        then `fetch()` again. Each measured call is preceded by an unmeasured
+        one so per-process caches are warm. Fails if the second measurement
+        runs more queries, listing the repeated SQL and where it came from.
+        """
+        small, small_response = self._record(fetch)
+        grow()
+        large, large_response = self._record(fetch)
+        label = label or 'endpoint'
+        for response in (small_response, large_response):
+            self.assertLess(response.status_code, 400, f"{label} returned {response.status_code}")
+        if len(large) > len(small):
+            self.fail(
+                f"{label} ran {len(small)} queries before adding rows and {len(large)} after.\n"
+                f"Repeated queries:\n{describe(large.repeated()) or '  (none)'}"
+            )
+
+    def _record(self, fetch):
+        fetch()
+        with QueryRecorder() as recorder:
+            response = fetch()
+        if getattr(response, 'streaming', False):
+            with QueryRecorder() as streamed:
+                b''.join(response.streaming_content)
+            recorder.queries.extend(streamed.queries)
+        return recorder, response
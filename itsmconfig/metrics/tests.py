@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import serializers
+
+from .instrumentation import RequestStats, current_request, serialize
+
+# Create your tests here.
+
+METRICS = {'SLOW_REQUEST_SECONDS': None, 'TOKEN': None, 'ALLOWED_IPS': ['127.0.0.1', '::1'], 'NPLUSONE_THRESHOLD': None}
+
+
+class MetricsEndpointTests(TestCase):
+    """/metrics is only served to allowed addresses and to the configured token."""
+
+    def scrape(self, remote_addr, **headers):
+        return self.client.get('/metrics', REMOTE_ADDR=remote_addr, **headers).status_code
+
+    def test_loopback_only_by_default(self):
+        self.assertEqual(self.scrape('127.0.0.1'), 200)
+        self.assertEqual(self.scrape('10.0.0.5'), 403)
+        self.assertEqual(self.scrape('10.0.0.5', HTTP_AUTHORIZATION='Bearer '), 403)
+
+    @override_settings(METRICS={**METRICS, 'TOKEN': 's3cret', 'ALLOWED_IPS': []})
+    def test_token(self):
+        self.assertEqual(self.scrape('10.0.0.5', HTTP_AUTHORIZATION='Bearer s3cret'), 200)
+        self.assertEqual(self.scrape('10.0.0.5', HTTP_AUTHORIZATION='Bearer wrong'), 403)
+        self.assertEqual(self.scrape('127.0.0.1'), 403)
+
+
+class SerializerTimingTests(SimpleTestCase):
+
+    class NameSerializer(serializers.Serializer):
+        name = serializers.CharField()
+
+    def test_serialize_counts_time_for_the_current_request(self):
+        self.assertEqual(serialize(self.NameSerializer({'name': 'outside'})), {'name': 'outside'})
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            self.assertEqual(serialize(self.NameSerializer([{'name': 'a'}], many=True)), [{'name': 'a'}])
+        finally:
+            current_request.reset(token)
+        self.assertGreater(stats.serializer_seconds, 0)
@@ -0,0 +1,23 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .registry import REGISTRY
+
+
+def scrape_allowed(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS.get('ALLOWED_IPS', ()):
+        return True
+    token = settings.METRICS.get('TOKEN')
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint. Only served to `METRICS['ALLOWED_IPS']` and
+    to requests bearing `METRICS['TOKEN']`.
+    """
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
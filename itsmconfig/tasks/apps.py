@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tasks'
+
+    def ready(self):
+        from metrics.registry import REGISTRY
+
+        from .queue import queue_depth, queue_lag
+
+        REGISTRY.gauge('task_queue_depth', "Tasks in the database queue by state, counted at scrape time", ('state',), queue_depth)
+        REGISTRY.gauge('task_queue_lag_seconds', "How long the oldest due task has waited for a worker", (), queue_lag)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from tasks.worker import serve
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks until interrupted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Number of workers")
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread', help="Run workers as threads or processes")
+        parser.add_argument('--batch-size', type=int, default=20, help="Tasks a worker claims at a time")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds an idle worker waits before checking again")
+        parser.add_argument('--once', action='store_true', help="Exit once no task is due")
+
+    def handle(self, *args, **options):
+        count = serve(
+            options['concurrency'], options['pool'],
+            batch_size=options['batch_size'], poll=options['poll'], once=options['once'],
+        )
+        self.stdout.write(f"Ran {count} tasks")
@@ -0,0 +1,33 @@
+from django.db import models
+
+# Create your models here.
+
+
+class Task(models.Model):
+    """
+    A queued call of a `@task` function; see `tasks.queue`.
+
+    `run_at` is when a worker may next claim the task: when it is due while
+    queued, and when its lease runs out while running, so a task whose
+    worker died is picked up again. Tasks are deleted once they succeed and
+    kept with a null `run_at` once they run out of attempts.
+    """
+    QUEUED, RUNNING, FAILED = 'queued', 'running', 'failed'
+    STATES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    state = models.CharField(max_length=16, choices=STATES, default=QUEUED)
+    run_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    claimed_by = models.CharField(max_length=255, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_at'], name='task_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.state})"
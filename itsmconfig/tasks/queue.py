@@ -0,0 +1,126 @@
+"""
+A background task queue kept in the database.
+
+Decorating a function with `@task` gives it a `delay(*args)` that queues
+a call once the current transaction commits, so nothing runs for changes
+that roll back and the request only pays for an INSERT. Workers
+(`manage.py run_tasks`) claim due tasks in batches, run each in its own
+transaction and delete it there, and reschedule failures with
+exponential backoff until `TASKS['MAX_ATTEMPTS']`.
+
+Arguments must be JSON-serializable. A task whose worker dies is claimed
+again once its lease expires, and one whose transaction fails is retried,
+so tasks should be idempotent, e.g. take ids and read current rows.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger('tasks')
+
+
+def task(func):
+    """Make `func` runnable in the background with `func.delay(*args)`."""
+    func.task_name = f'{func.__module__}.{func.__qualname__}'
+    func.delay = lambda *args: enqueue(func, *args)
+    return func
+
+
+def run_eager(func, *args):
+    # The caller's transaction has committed, so a failure must not surface as its error.
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Eager task %s failed", func.task_name)
+
+
+def enqueue(func, *args):
+    if settings.TASKS['EAGER']:
+        transaction.on_commit(lambda: run_eager(func, *args))
+    else:
+        transaction.on_commit(lambda: Task.objects.create(name=func.task_name, args=list(args), run_at=timezone.now()))
+
+
+def claim(worker_id, batch_size, now=None):
+    """Lease up to `batch_size` due tasks, oldest first, to `worker_id`."""
+    now = now or timezone.now()
+    due = Task.objects.filter(run_at__lte=now).order_by('run_at')
+    if connection.features.has_select_for_update_skip_locked:
+        due = due.select_for_update(skip_locked=True)
+    with transaction.atomic():
+        # One UPDATE ... WHERE id IN (SELECT ... LIMIT n): without SKIP LOCKED
+        # concurrent claims are serialized by the write lock, and a task
+        # leased by the first no longer matches `run_at <= now` for the next.
+        claimed = Task.objects.filter(id__in=due.values('id')[:batch_size], run_at__lte=now).update(
+            state=Task.RUNNING, claimed_by=worker_id, attempts=F('attempts') + 1,
+            run_at=now + timedelta(seconds=settings.TASKS['LEASE_SECONDS']),
+        )
+        if not claimed:
+            return []
+        return list(Task.objects.filter(state=Task.RUNNING, claimed_by=worker_id).order_by('id'))
+
+
+def backoff(attempts):
+    delay = min(settings.TASKS['RETRY_BACKOFF_SECONDS'] * 2 ** (attempts - 1), settings.TASKS['MAX_BACKOFF_SECONDS'])
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def run(task, worker_id):
+    """Run a claimed task and delete it, or reschedule it if it fails. Returns whether it succeeded."""
+    try:
+        func = import_string(task.name)
+        if getattr(func, 'task_name', None) != task.name:
+            raise ImportError(f"{task.name} is not a task")
+        with transaction.atomic():
+            # Write first: SQLite fails a transaction that reads and then
+            # writes under contention instead of waiting for the lock.
+            Task.objects.filter(pk=task.pk, claimed_by=worker_id).delete()
+            func(*task.args)
+        return True
+    except Exception:
+        retry = task.attempts < settings.TASKS['MAX_ATTEMPTS']
+        Task.objects.filter(pk=task.pk, claimed_by=worker_id).update(
+            state=Task.QUEUED if retry else Task.FAILED, claimed_by='', last_error=traceback.format_exc(),
+            run_at=timezone.now() + backoff(task.attempts) if retry else None,
+        )
+        return False
+
+
+def work(worker_id, stop, batch_size=20, poll=1.0, once=False):
+    """
+    Claim and run tasks until `stop` is set, or with `once` until none is
+    due. A claimed batch is finished before stopping. Returns the number
+    of tasks run.
+    """
+    count = 0
+    while not stop.is_set():
+        tasks = claim(worker_id, batch_size)
+        for task in tasks:
+            run(task, worker_id)
+        count += len(tasks)
+        if not tasks:
+            if once:
+                break
+            stop.wait(poll)
+    return count
+
+
+def queue_depth():
+    depth = dict.fromkeys(((state,) for state, _ in Task.STATES), 0)
+    depth.update(((state,), count) for state, count in Task.objects.order_by().values_list('state').annotate(Count('id')))
+    return depth
+
+
+def queue_lag():
+    now = timezone.now()
+    oldest = Task.objects.filter(run_at__lte=now).aggregate(oldest=Min('run_at'))['oldest']
+    return {(): (now - oldest).total_seconds() if oldest else 0}
@@ -0,0 +1,111 @@
+import io
+import re
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from metrics.registry import REGISTRY
+
+from .models import Task
+from .queue import claim, task
+
+# Create your tests here.
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task
+def explode():
+    raise RuntimeError("boom")
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def run_tasks(self):
+        out = io.StringIO()
+        call_command('run_tasks', '--once', '--concurrency', '1', stdout=out)
+        return out.getvalue().strip()
+
+    @override_settings(TASKS={**settings.TASKS, 'EAGER': False})
+    def test_delay_queues_on_commit_only(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(ValueError), transaction.atomic():
+                record.delay('rolled back')
+                raise ValueError
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('kept')
+        self.assertEqual(list(Task.objects.values_list('name', 'args', 'state')), [('tasks.tests.record', ['kept'], 'queued')])
+        self.assertEqual(calls, [])
+
+        self.assertEqual(self.run_tasks(), "Ran 1 tasks")
+        self.assertEqual(calls, ['kept'])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS={'EAGER': True})
+    def test_eager_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('now')
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS={'EAGER': True})
+    def test_eager_failures_are_logged(self):
+        with self.assertLogs('tasks', 'ERROR') as logs, self.captureOnCommitCallbacks(execute=True):
+            explode.delay()
+            record.delay('after')
+        self.assertIn("Eager task tasks.tests.explode failed", logs.output[0])
+        self.assertIn("RuntimeError: boom", logs.output[0])
+        self.assertEqual(calls, ['after'])
+
+    @override_settings(TASKS={'EAGER': False, 'MAX_ATTEMPTS': 2, 'RETRY_BACKOFF_SECONDS': 60, 'MAX_BACKOFF_SECONDS': 60, 'LEASE_SECONDS': 300})
+    def test_failures_back_off_then_stop(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            explode.delay()
+        self.run_tasks()
+        failed = Task.objects.get()
+        self.assertEqual((failed.state, failed.attempts, failed.claimed_by), ('queued', 1, ''))
+        self.assertGreater(failed.run_at, timezone.now() + timedelta(seconds=29))
+        self.assertIn("RuntimeError: boom", failed.last_error)
+        self.assertEqual(self.run_tasks(), "Ran 0 tasks")
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=2)):
+            self.assertEqual(self.run_tasks(), "Ran 1 tasks")
+        failed.refresh_from_db()
+        self.assertEqual((failed.state, failed.attempts, failed.run_at), ('failed', 2, None))
+
+    def test_claims_are_exclusive_until_the_lease_expires(self):
+        now = timezone.now()
+        Task.objects.bulk_create(Task(name='tasks.tests.record', args=[n], run_at=now) for n in range(3))
+        first, second = claim('a', 2, now), claim('b', 2, now)
+        self.assertEqual([len(first), len(second)], [2, 1])
+        self.assertFalse({t.pk for t in first} & {t.pk for t in second})
+        self.assertEqual(claim('c', 5, now), [])
+
+        reclaimed = claim('c', 5, now + timedelta(minutes=10))
+        self.assertEqual([(t.claimed_by, t.attempts) for t in reclaimed], [('c', 2)] * 3)
+
+    def test_depth_metrics(self):
+        Task.objects.create(name='tasks.tests.record', run_at=timezone.now() - timedelta(seconds=30))
+        Task.objects.create(name='tasks.tests.explode', state='failed')
+        metrics = REGISTRY.render()
+        self.assertIn('task_queue_depth{state="queued"} 1\n', metrics)
+        self.assertIn('task_queue_depth{state="running"} 0\n', metrics)
+        self.assertIn('task_queue_depth{state="failed"} 1\n', metrics)
+        lag = float(re.search(r'^task_queue_lag_seconds (\S+)$', metrics, re.M).group(1))
+        self.assertGreaterEqual(lag, 30)
@@ -0,0 +1,79 @@
+"""
+Pools of `work` loops for the `run_tasks` command.
+
+Threads suit tasks that mostly wait on the database; processes sidestep
+the GIL for CPU-bound ones. SIGINT and SIGTERM stop the workers once
+their current batch is done.
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.db import connection, connections
+
+from .queue import work
+
+STOP = threading.Event()
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def thread_main(options):
+    try:
+        return work(worker_id(), STOP, **options)
+    finally:
+        connection.close()
+
+
+def process_main(total, options):
+    django.setup()  # Already done when forked; needed with the spawn start method.
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: STOP.set())
+    count = thread_main(options)
+    with total.get_lock():
+        total.value += count
+
+
+def serve_processes(concurrency, options):
+    context = multiprocessing.get_context()
+    total = context.Value('i', 0)
+    connections.close_all()  # Children must not share the parent's connections.
+    processes = [context.Process(target=process_main, args=(total, options)) for _ in range(concurrency)]
+    for process in processes:
+        process.start()
+    forwarded = False
+    for process in processes:
+        while process.is_alive():
+            process.join(0.5)
+            if STOP.is_set() and not forwarded:
+                # SIGTERM lets each child finish its batch; a terminal's SIGINT already reached them.
+                for child in processes:
+                    child.terminate()
+                forwarded = True
+    return total.value
+
+
+def serve(concurrency=1, pool='thread', **options):
+    """
+    Run `concurrency` workers as threads or processes until a stop signal,
+    or with `once` until no task is due. Returns the number of tasks run.
+    """
+    STOP.clear()
+    previous = {signum: signal.signal(signum, lambda *args: STOP.set()) for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        if pool == 'process':
+            return serve_processes(concurrency, options)
+        if concurrency == 1:
+            return work(worker_id(), STOP, **options)
+        with ThreadPoolExecutor(concurrency) as executor:
+            futures = [executor.submit(thread_main, options) for _ in range(concurrency)]
+        return sum(future.result() for future in futures)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
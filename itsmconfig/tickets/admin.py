@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Status, Priority, Category, Ticket, TicketComment
+from .models import AgentSkill, Status, Priority, Category, Ticket, TicketComment
 
 # Register your models here.
 
@@ -9,3 +9,4 @@ admin.site.register(Priority)
 admin.site.register(Category)
 admin.site.register(Ticket)
 admin.site.register(TicketComment)
+admin.site.register(AgentSkill)
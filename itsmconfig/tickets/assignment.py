@@ -0,0 +1,154 @@
+"""
+Automatic assignment of new tickets.
+
+A ticket goes to the agent with the fewest open tickets among those who
+have its category as a skill, or among all agents when nobody does. Each
+process keeps these loads in a `LoadIndex`, built with a few queries on
+first use and then moved by the ticket signals as changes commit, so a
+choice is a heap lookup instead of a COUNT per agent.
+
+Writes made by other processes only reach the index when it is rebuilt,
+every `TICKET_ASSIGNMENT['REBUILD_SECONDS']`, so with several workers the
+loads can lag a little; assignment only needs them roughly balanced.
+"""
+import heapq
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from users.models import UserModel
+
+from .models import AgentSkill, Status, Ticket
+from .reference import reference
+
+ALL_AGENTS = None
+
+
+class LoadIndex:
+    """
+    Open tickets per agent, with a min-heap of `(load, agent id)` for each
+    category and one for all agents.
+
+    Heap entries are never updated in place: a load change pushes a new
+    entry and outdated ones are dropped when they reach the top, so a
+    choice costs O(log agents) amortized.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._loads = {}
+        self._skills = {}
+        self._members = {}
+        self._heaps = {}
+
+    def invalidate(self):
+        """Rebuild from the database on next use, e.g. after agents or skills change."""
+        with self._lock:
+            self._built_at = None
+
+    def choose(self, category_ids):
+        """One agent id per category in `category_ids`, or None when there are no agents."""
+        with self._lock:
+            rebuild_seconds = settings.TICKET_ASSIGNMENT['REBUILD_SECONDS']
+            if self._built_at is None or rebuild_seconds is not None and time.monotonic() - self._built_at > rebuild_seconds:
+                self._build()
+            chosen = [self._take(category_id) for category_id in category_ids]
+            # Loads move once the tickets commit (see record_moves); within the
+            # batch each choice counted provisionally so the batch spreads out.
+            for agent_id, count in Counter(chosen).items():
+                if agent_id is not None:
+                    self._set(agent_id, self._loads[agent_id] - count)
+            return chosen
+
+    def adjust(self, deltas):
+        """Apply committed `{agent id: change in open tickets}`."""
+        with self._lock:
+            if self._built_at is None:
+                return
+            for agent_id, delta in deltas.items():
+                if delta and agent_id in self._loads:
+                    self._set(agent_id, self._loads[agent_id] + delta)
+
+    def loads(self):
+        with self._lock:
+            return dict(self._loads)
+
+    def _build(self):
+        agents = set(UserModel.objects.filter(role='agent').values_list('user_id', flat=True))
+        rows = (
+            Ticket.objects.filter(assigned_to__isnull=False, status__in=reference(Status).ids(is_closed=False))
+            .order_by().values_list('assigned_to').annotate(Count('id'))
+        )
+        self._loads = dict.fromkeys(agents, 0)
+        self._loads.update((agent_id, count) for agent_id, count in rows if agent_id in agents)
+        self._skills = {agent_id: set() for agent_id in agents}
+        self._members = {ALL_AGENTS: sorted(agents)}
+        for agent_id, category_id in AgentSkill.objects.order_by('agent', 'category').values_list('agent', 'category'):
+            if agent_id in agents:
+                self._skills[agent_id].add(category_id)
+                self._members.setdefault(category_id, []).append(agent_id)
+        self._heaps = {key: self._fresh_heap(key) for key in self._members}
+        self._built_at = time.monotonic()
+
+    def _fresh_heap(self, key):
+        heap = [(self._loads[agent_id], agent_id) for agent_id in self._members[key]]
+        heapq.heapify(heap)
+        return heap
+
+    def _take(self, category_id):
+        heap = self._heaps.get(category_id if category_id in self._heaps else ALL_AGENTS)
+        while heap:
+            load, agent_id = heap[0]
+            if self._loads[agent_id] == load:
+                self._set(agent_id, load + 1)
+                return agent_id
+            heapq.heappop(heap)
+        return None
+
+    def _set(self, agent_id, load):
+        self._loads[agent_id] = load
+        for key in (ALL_AGENTS, *self._skills[agent_id]):
+            heap = self._heaps[key]
+            if len(heap) > 2 * len(self._members[key]) + 16:
+                heap[:] = self._fresh_heap(key)
+            else:
+                heapq.heappush(heap, (load, agent_id))
+
+
+load_index = LoadIndex()
+
+
+def assign(tickets):
+    """
+    Agents for new tickets given as `(category id, status id)` pairs, in
+    order. None for closed tickets, when there are no agents, or when
+    automatic assignment is disabled.
+    """
+    if not settings.TICKET_ASSIGNMENT['ENABLED']:
+        return [None] * len(tickets)
+    closed = set(reference(Status).ids(is_closed=True))
+    wanted = [category_id for category_id, status_id in tickets if status_id not in closed]
+    chosen = iter(load_index.choose(wanted) if wanted else ())
+    return [None if status_id in closed else next(chosen) for category_id, status_id in tickets]
+
+
+def ticket_owner(ticket):
+    """The `(assigned_to id, status id)` that decide which agent's load a ticket counts for."""
+    return ticket.__dict__.get('assigned_to_id'), ticket.__dict__.get('status_id')
+
+
+def record_moves(moves):
+    """Move agent loads for `(old owner, new owner)` pairs, either of which may be None, on commit."""
+    closed = set(reference(Status).ids(is_closed=True))
+    deltas = Counter()
+    for old, new in moves:
+        for owner, delta in ((old, -1), (new, 1)):
+            if owner is not None and owner[0] is not None and owner[1] not in closed:
+                deltas[owner[0]] += delta
+    if any(deltas.values()):
+        transaction.on_commit(lambda: load_index.adjust(deltas))
@@ -0,0 +1,106 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+from metrics.instrumentation import serialize
+from users.principal import get_principal
+
+from .models import Ticket
+from .querysets import TICKET_EXPANDABLE_FIELDS, get_expand, ticket_queryset
+from .rows import row_plan
+from .serializers import TicketSerializer
+from .visibility import ticket_scopes, visible_tickets
+from .views import TicketDetailAPIView, TicketListAPIView
+
+
+def schema_from(sync_method):
+    """Reuse the swagger_auto_schema of the sync handler an async handler replaces."""
+    def decorator(method):
+        if hasattr(sync_method, '_swagger_auto_schema'):
+            method._swagger_auto_schema = sync_method._swagger_auto_schema
+        return method
+    return decorator
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines, so Django serves it as an async
+    view under ASGI without tying up a thread for the whole request.
+
+    Authentication, permission checks and throttling stay synchronous and
+    run in a worker thread; the principal is resolved there too, so async
+    handlers can read it without touching the database.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            get_principal(request.user)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncTicketListAPIView(AsyncAPIView, TicketListAPIView):
+
+    @schema_from(TicketListAPIView.get)
+    async def get(self, request):
+        expand = get_expand(request, TICKET_EXPANDABLE_FIELDS)
+        # Filtering may reload the status registry, so it runs in a thread.
+        tickets, ordering = await sync_to_async(self.filter_tickets)(request, expand)
+        paginator = self.pagination_class()
+        paginator.ordering = ordering
+        paginator.scopes = ticket_scopes(request.user)
+        plan = row_plan(TicketSerializer, request, expand)
+        if plan is not None:
+            page = await paginator.apaginate_queryset(plan.values(tickets, ordering), request, view=self)
+            return paginator.get_paginated_response(plan.represent(page))
+        page = await paginator.apaginate_queryset(tickets, request, view=self)
+        serializer = TicketSerializer(page, many=True, context={'request': request, 'expand': expand})
+        return paginator.get_paginated_response(serialize(serializer))
+
+    @schema_from(TicketListAPIView.post)
+    async def post(self, request):
+        return await sync_to_async(super().post)(request)
+
+
+class AsyncTicketDetailAPIView(AsyncAPIView, TicketDetailAPIView):
+
+    async def aget_object(self, pk, user, expand=()):
+        try:
+            return await ticket_queryset(visible_tickets(user), expand, user).aget(pk=pk)
+        except Ticket.DoesNotExist:
+            return None
+
+    @schema_from(TicketDetailAPIView.get)
+    async def get(self, request, pk):
+        expand = get_expand(request, TICKET_EXPANDABLE_FIELDS)
+        return self.ticket_response(request, await self.aget_object(pk, request.user, expand), expand)
+
+    @schema_from(TicketDetailAPIView.put)
+    async def put(self, request, pk):
+        return await sync_to_async(super().put)(request, pk)
+
+    @schema_from(TicketDetailAPIView.delete)
+    async def delete(self, request, pk):
+        return await sync_to_async(super().delete)(request, pk)
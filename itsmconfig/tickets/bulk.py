@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .assignment import assign
+from .models import Category, ChangeSequence, Priority, Status, Ticket
+from .visibility import visible_tickets
+from .reference import REGISTRIES, reference
+from .sla import SLA_FIELDS, refresh
+from .signals import tickets_bulk_created, tickets_bulk_updated
+
+MAX_BATCH_SIZE = 1000
+REFERENCE_MODELS = {
+    'status': Status,
+    'priority': Priority,
+    'category': Category,
+    'assigned_to': User,
+}
+
+
+def check_references(items, user):
+    """
+    Resolve every id referenced by the batch, from the reference registries
+    where possible and otherwise with one query per model.
+
+    Returns the per-item errors (empty dicts for valid items) and the
+    visible tickets targeted by updates and transitions, keyed by id. Call
+    it in the transaction that applies the batch: the tickets are locked
+    until it ends, so their values stay current.
+    """
+    errors = [{} for _ in items]
+    for field, model in REFERENCE_MODELS.items():
+        wanted = {item[field] for item in items if item.get(field) is not None}
+        if model in REGISTRIES:
+            found = set(REGISTRIES[model].ids())
+        elif wanted:
+            found = set(model.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+        else:
+            found = set()
+        for index, item in enumerate(items):
+            if item.get(field) is not None and item[field] not in found:
+                errors[index][field] = [f'Invalid pk "{item[field]}" - object does not exist.']
+
+    wanted = {item['id'] for item in items if item['op'] != 'create'}
+    tickets = visible_tickets(user).select_for_update().order_by('pk').in_bulk(wanted) if wanted else {}
+    for index, item in enumerate(items):
+        if item['op'] != 'create' and item['id'] not in tickets:
+            errors[index]['id'] = ['Ticket not found.']
+    return errors, tickets
+
+
+def apply_operations(items, tickets, user):
+    """Write a validated batch in one transaction and return one result per item."""
+    now = timezone.now()
+    created, results = [], []
+    changed, changed_fields = {}, {}
+
+    unassigned = []
+    for item in items:
+        values = {
+            field + '_id' if field in REFERENCE_MODELS else field: value
+            for field, value in item.items() if field not in ('op', 'id')
+        }
+        if item['op'] == 'create':
+            ticket = Ticket(created_by=user, created_at=now, updated_at=now, **values)
+            created.append(ticket)
+            if 'assigned_to' not in item:
+                unassigned.append(ticket)
+        else:
+            ticket = tickets[item['id']]
+            for attname, value in values.items():
+                setattr(ticket, attname, value)
+            ticket.updated_at = now
+            changed[ticket.pk] = ticket
+            changed_fields.setdefault(ticket.pk, {'updated_at', 'change_seq', *SLA_FIELDS}).update(values)
+        results.append((item['op'], ticket))
+
+    for ticket, agent_id in zip(unassigned, assign([(ticket.category_id, ticket.status_id) for ticket in unassigned])):
+        ticket.assigned_to_id = agent_id
+    closed = set(reference(Status).ids(is_closed=True))
+    for ticket in [*created, *changed.values()]:
+        refresh(ticket, now, closed)
+    # Write each ticket's own fields only, so an item never writes back values it did not set.
+    groups = {}
+    for ticket in changed.values():
+        groups.setdefault(frozenset(changed_fields[ticket.pk]), []).append(ticket)
+
+    with transaction.atomic():
+        last = ChangeSequence.allocate(len(created) + len(changed))
+        for change_seq, ticket in enumerate([*created, *changed.values()], last - len(created) - len(changed) + 1):
+            ticket.change_seq = change_seq
+        if created:
+            Ticket.objects.bulk_create(created)
+            tickets_bulk_created.send(sender=Ticket, tickets=created)
+        for fields, group in groups.items():
+            Ticket.objects.bulk_update(group, sorted(fields))
+        if changed:
+            tickets_bulk_updated.send(sender=Ticket, tickets=list(changed.values()))
+
+    return [{'op': op, 'id': ticket.pk} for op, ticket in results]
@@ -0,0 +1,64 @@
+import base64
+import heapq
+import json
+
+from .models import ChangeSequence
+from .visibility import visible_comments, visible_tickets, visible_tombstones
+
+MAX_CHANGES = 1000
+
+
+class WatermarkExpired(Exception):
+    """The watermark predates pruned tombstones (or this database); the client must resync."""
+
+
+def encode_watermark(change_seq):
+    return base64.urlsafe_b64encode(json.dumps({'s': change_seq}).encode('utf-8')).decode('ascii')
+
+
+def decode_watermark(token):
+    """The change sequence number in `token`; raises ValueError if it is malformed."""
+    if not token:
+        return 0
+    try:
+        change_seq = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))['s']
+    except (TypeError, KeyError, UnicodeError, ValueError):
+        raise ValueError(token)
+    if not isinstance(change_seq, int) or change_seq < 0:
+        raise ValueError(token)
+    return change_seq
+
+
+def changes_since(user, since, limit=MAX_CHANGES):
+    """
+    Tickets, comments and tombstones visible to `user` that changed after
+    sequence number `since`, oldest first, plus the watermark to resume
+    from and whether more changes are waiting.
+
+    The current sequence value is read before the rows: every number up to
+    it belongs to a committed change, so nothing below the new watermark can
+    appear later.
+    """
+    current, pruned_through = ChangeSequence.current()
+    # A full sync (`since` 0) has no copies left to delete, so pruning cannot expire it.
+    if 0 < since < pruned_through or since > current:
+        raise WatermarkExpired(since)
+
+    window = {'change_seq__gt': since, 'change_seq__lte': current}
+    sources = (
+        ('ticket', visible_tickets(user)),
+        ('comment', visible_comments(user)),
+        # Scope exits (see `signals.record_scope_exits`) only reach users who can no longer see the row.
+        ('tombstone', visible_tombstones(user)
+            .exclude(kind='ticket', object_id__in=visible_tickets(user).values('pk'))
+            .exclude(kind='comment', object_id__in=visible_comments(user).values('pk'))),
+    )
+    streams = [
+        [(row.change_seq, kind, row) for row in queryset.filter(**window).order_by('change_seq')[:limit + 1]]
+        for kind, queryset in sources
+    ]
+    merged = list(heapq.merge(*streams, key=lambda change: change[0]))
+    has_more = len(merged) > limit
+    changes = merged[:limit]
+    watermark = changes[-1][0] if has_more else current
+    return changes, watermark, has_more
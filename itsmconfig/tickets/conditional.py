@@ -0,0 +1,46 @@
+import uuid
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+VERSION_KEY = 'tickets:model-version:{}'
+
+
+def model_version(model):
+    """
+    The (token, last modified) pair identifying the current contents of
+    `model`'s table. It lives in the cache so conditional requests can be
+    answered without a query; a cold cache starts a new version.
+    """
+    key = VERSION_KEY.format(model._meta.label_lower)
+    version = cache.get(key)
+    if version is None:
+        version = (uuid.uuid4().hex, timezone.now().replace(microsecond=0))
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_model_version(model):
+    key = VERSION_KEY.format(model._meta.label_lower)
+    cache.set(key, (uuid.uuid4().hex, timezone.now().replace(microsecond=0)), None)
+
+
+def weak_etag(*parts):
+    return 'W/"%s"' % '-'.join(str(part) for part in parts)
+
+
+def not_modified(request, etag, last_modified):
+    """Return a 304 response if the request's validators match, else None."""
+    response = get_conditional_response(request._request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    return response
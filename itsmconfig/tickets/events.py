@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from users.principal import get_principal
+
+from .visibility import ticket_visible_to
+
+
+class EventGap(Exception):
+    """The requested position is no longer (or was never) in the backend's buffer."""
+
+
+class LocalEventBackend:
+    """
+    Ring buffer of recent events in this process.
+
+    Ids are `<epoch>.<n>`; the epoch changes on restart, so a client resuming
+    from an id issued by another process gets a gap instead of silently
+    missing events.
+    """
+
+    def __init__(self, size=1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=size)
+        self._next = 1
+        self._changed = threading.Condition()
+
+    def publish(self, event):
+        with self._changed:
+            self._events.append(dict(event, id=f'{self.epoch}.{self._next}'))
+            self._next += 1
+            self._changed.notify_all()
+
+    def latest_id(self):
+        with self._changed:
+            return f'{self.epoch}.{self._next - 1}'
+
+    def read(self, last_id, timeout=0):
+        """Events after `last_id`, waiting up to `timeout` seconds for the first one."""
+        epoch, _, position = last_id.partition('.')
+        if epoch != self.epoch or not position.isdigit():
+            raise EventGap(last_id)
+        position = int(position)
+        with self._changed:
+            if position >= self._next:
+                raise EventGap(last_id)
+            if timeout:
+                self._changed.wait_for(lambda: self._next - 1 > position, timeout)
+            first = self._next - len(self._events)
+            if position + 1 < first:
+                raise EventGap(last_id)
+            return list(self._events)[position + 1 - first:]
+
+
+class RedisEventBackend:
+    """Events in a capped Redis stream, shared by every worker. Requires the `redis` package."""
+
+    def __init__(self, url='redis://localhost:6379/0', stream='tickets:events', maxlen=10000):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisEventBackend requires the 'redis' package.")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.missing_stream = redis.ResponseError
+        self.stream = stream
+        self.maxlen = maxlen
+
+    @staticmethod
+    def _position(stream_id):
+        milliseconds, _, sequence = stream_id.partition('-')
+        return int(milliseconds), int(sequence or 0)
+
+    def publish(self, event):
+        self.client.xadd(self.stream, {'event': json.dumps(event, cls=JSONEncoder)}, maxlen=self.maxlen, approximate=True)
+
+    def latest_id(self):
+        entries = self.client.xrevrange(self.stream, count=1)
+        return entries[0][0] if entries else '0-0'
+
+    def read(self, last_id, timeout=0):
+        try:
+            position = self._position(last_id)
+        except ValueError:
+            raise EventGap(last_id)
+        try:
+            trimmed = self.client.xinfo_stream(self.stream).get('max-deleted-entry-id', '0-0')
+        except self.missing_stream:
+            trimmed = '0-0'
+        if position < self._position(trimmed):
+            raise EventGap(last_id)
+        response = self.client.xread({self.stream: last_id}, count=500, block=int(timeout * 1000) or None)
+        return [
+            dict(json.loads(fields['event']), id=stream_id)
+            for _, entries in response or () for stream_id, fields in entries
+        ]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = settings.TICKET_EVENTS
+                _backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _backend
+
+
+def publish(event_type, data, created_by_id, assigned_to_id):
+    """Queue an event for stream clients that can see the ticket with these owners."""
+    get_backend().publish({
+        'event': event_type,
+        'data': data,
+        'created_by': created_by_id,
+        'assigned_to': assigned_to_id,
+    })
+
+
+class TicketEventStream:
+    """
+    Server-Sent Events for one client, filtered with the same rules as the
+    ticket list. Streams end after `max_duration` seconds, or at once with
+    `poll()`; EventSource then reconnects with `Last-Event-ID` and resumes
+    where it stopped.
+    """
+    heartbeat = 15
+    poll_interval = 1
+    max_duration = 300
+    retry = 3000
+
+    def __init__(self, user, last_id=None, backend=None):
+        self.user = user
+        self.role = get_principal(user).role
+        self.backend = backend or get_backend()
+        self.last_id = last_id
+
+    def frames(self, events):
+        for event in events:
+            self.last_id = event['id']
+            if not ticket_visible_to(self.user, event['created_by'], event['assigned_to']):
+                continue
+            data = event['data']
+            if self.role == 'user' and event['event'].startswith('comment.') and not data.get('is_public'):
+                continue
+            if self.role == 'user' and event['event'].startswith('ticket.'):
+                data = {key: value for key, value in data.items() if key != 'assigned_to'}
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n"
+
+    def read(self, timeout):
+        try:
+            return list(self.frames(self.backend.read(self.last_id, timeout)))
+        except EventGap:
+            # Too far behind to replay: the client should refetch and continue from now.
+            self.last_id = self.backend.latest_id()
+            return [f"id: {self.last_id}\nevent: reset\ndata: {{}}\n\n"]
+
+    def start(self):
+        # Send the position even when no event follows, so a reconnect resumes from it.
+        if self.last_id is None:
+            self.last_id = self.backend.latest_id()
+        return f"retry: {self.retry}\nid: {self.last_id}\n\n"
+
+    def __iter__(self):
+        yield self.start()
+        deadline = time.monotonic() + self.max_duration
+        while time.monotonic() < deadline:
+            yield from self.read(self.heartbeat) or [': keepalive\n\n']
+
+    def poll(self):
+        """The events already waiting, without blocking, for WSGI workers that must not be held."""
+        yield self.start()
+        yield from self.read(0)
+
+    async def stream_async(self):
+        """Polling variant for ASGI; backend reads run in a thread so they never block the event loop."""
+        yield await sync_to_async(self.start)()
+        deadline = time.monotonic() + self.max_duration
+        idle = 0
+        while time.monotonic() < deadline:
+            frames = await sync_to_async(self.read)(0)
+            for frame in frames:
+                yield frame
+            idle = 0 if frames else idle + self.poll_interval
+            if idle >= self.heartbeat:
+                idle = 0
+                yield ': keepalive\n\n'
+            await asyncio.sleep(self.poll_interval)
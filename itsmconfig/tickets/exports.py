@@ -0,0 +1,44 @@
+import csv
+
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000
+# Spreadsheets evaluate a cell starting with one of these as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """File-like object whose `write` returns the value, for streaming `csv.writer` rows."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Iterate over `fields` of `queryset` as dicts using a server-side cursor."""
+    return queryset.order_by('id').values(*fields).iterator(chunk_size=chunk_size)
+
+
+def ndjson_lines(rows):
+    encoder = JSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def csv_value(value, encoder):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        # Titles and comments are user input: quote them so they stay text.
+        return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+    if isinstance(value, (int, float)):
+        return value
+    return encoder.default(value)
+
+
+def csv_lines(rows, fields):
+    encoder = JSONEncoder()
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([csv_value(row[field], encoder) for field in fields])
@@ -0,0 +1,55 @@
+from rest_framework import serializers
+
+from .models import Status
+from .reference import reference
+
+TICKET_ORDERINGS = {
+    'updated_at': ('updated_at', 'id'),
+    '-updated_at': ('-updated_at', '-id'),
+    'created_at': ('created_at', 'id'),
+    '-created_at': ('-created_at', '-id'),
+    'id': ('id',),
+    '-id': ('-id',),
+}
+
+
+class TicketFilterSerializer(serializers.Serializer):
+    """
+    Query parameters accepted by the ticket list. Every filter and ordering
+    is backed by an index declared on `Ticket.Meta`.
+    """
+    status = serializers.IntegerField(required=False)
+    priority = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    assigned_to = serializers.IntegerField(required=False)
+    unassigned = serializers.BooleanField(required=False, allow_null=True, default=None)
+    created_by = serializers.IntegerField(required=False)
+    is_closed = serializers.BooleanField(required=False, allow_null=True, default=None)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    updated_after = serializers.DateTimeField(required=False)
+    updated_before = serializers.DateTimeField(required=False)
+    ordering = serializers.ChoiceField(choices=list(TICKET_ORDERINGS), default='-updated_at')
+
+    def filter_queryset(self, queryset):
+        params = self.validated_data
+        for field in ('status', 'priority', 'category', 'assigned_to', 'created_by'):
+            if field in params:
+                queryset = queryset.filter(**{field: params[field]})
+        if params['unassigned'] is not None:
+            queryset = queryset.filter(assigned_to__isnull=params['unassigned'])
+        if params['is_closed'] is not None:
+            # Filter on the status foreign key so the status index is usable.
+            queryset = queryset.filter(status__in=reference(Status).ids(is_closed=params['is_closed']))
+        if 'created_after' in params:
+            queryset = queryset.filter(created_at__gte=params['created_after'])
+        if 'created_before' in params:
+            queryset = queryset.filter(created_at__lt=params['created_before'])
+        if 'updated_after' in params:
+            queryset = queryset.filter(updated_at__gte=params['updated_after'])
+        if 'updated_before' in params:
+            queryset = queryset.filter(updated_at__lt=params['updated_before'])
+        return queryset
+
+    def get_ordering(self):
+        return TICKET_ORDERINGS[self.validated_data['ordering']]
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from tickets.models import ChangeSequence, TicketTombstone
+
+
+class Command(BaseCommand):
+    help = "Delete old deletion tombstones; sync clients with an older watermark must then resync"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Keep tombstones newer than this many days")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        with transaction.atomic():
+            old = TicketTombstone.objects.filter(deleted_at__lt=cutoff)
+            last = old.aggregate(last=Max('change_seq'))['last']
+            if last is None:
+                self.stdout.write("No tombstones to prune")
+                return
+            deleted, _ = TicketTombstone.objects.filter(change_seq__lte=last).delete()
+            ChangeSequence.objects.filter(pk=1, pruned_through__lt=last).update(pruned_through=last)
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} tombstones through change {last}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tickets.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Drop and repopulate the ticket and comment full-text search index"
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index with {type(get_backend()).__name__}"))
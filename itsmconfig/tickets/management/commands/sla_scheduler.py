@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from tickets.models import ChangeSequence, Status, Ticket
+from tickets.reference import reference
+from tickets.signals import tickets_bulk_updated
+from tickets.sla import settle
+
+
+class Command(BaseCommand):
+    help = "Record missed SLA deadlines as they pass, sleeping until the next one is due"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Record the deadlines missed so far and exit")
+        parser.add_argument('--batch-size', type=int, default=500, help="Tickets updated per transaction")
+        parser.add_argument(
+            '--max-sleep', type=float, default=60,
+            help="Longest wait between checks, which bounds how late a deadline of a new ticket is noticed",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            marked = self.settle_due(timezone.now(), options['batch_size'])
+            if marked or options['once']:
+                self.stdout.write(f"Settled {marked} tickets past an SLA deadline")
+            if options['once']:
+                return
+            time.sleep(self.seconds_until_due(options['max_sleep']))
+
+    def settle_due(self, now, batch_size):
+        """Settle every ticket with `due_at` up to `now`, in batches. `settle` moves each past `now`."""
+        closed = set(reference(Status).ids(is_closed=True))
+        total = 0
+        while True:
+            with transaction.atomic():
+                tickets = list(Ticket.objects.filter(due_at__lte=now).order_by('due_at')[:batch_size])
+                if not tickets:
+                    return total
+                read_due = {ticket.pk: ticket.due_at for ticket in tickets}
+                updated_at = timezone.now()
+                for ticket in tickets:
+                    settle(ticket, now, closed)
+                    ticket.updated_at = updated_at
+                last = ChangeSequence.allocate(len(tickets))
+                for change_seq, ticket in enumerate(tickets, last - len(tickets) + 1):
+                    ticket.change_seq = change_seq
+                tickets = self.save_settled(tickets, read_due)
+                tickets_bulk_updated.send(sender=Ticket, tickets=tickets)
+            total += len(tickets)
+
+    def save_settled(self, tickets, read_due):
+        """
+        Write the settled fields of the tickets whose `due_at` is still the
+        one read, and return those. A ticket saved since the read has had its
+        deadlines settled by that save, which the stale values must not undo.
+        """
+        # due_at goes last: some databases assign columns left to right.
+        Ticket.objects.filter(pk__in=read_due).update(**{
+            name: Case(
+                *(When(pk=ticket.pk, due_at=read_due[ticket.pk], then=Value(getattr(ticket, name), output_field=field))
+                  for ticket in tickets),
+                default=F(name), output_field=field,
+            )
+            for name, field in ((name, Ticket._meta.get_field(name)) for name in ('sla_breach', 'updated_at', 'change_seq', 'due_at'))
+        })
+        written = set(Ticket.objects.filter(
+            pk__in=read_due, change_seq__in=[ticket.change_seq for ticket in tickets],
+        ).values_list('pk', flat=True))
+        return [ticket for ticket in tickets if ticket.pk in written]
+
+    def seconds_until_due(self, max_sleep):
+        due_at = Ticket.objects.filter(due_at__isnull=False).order_by('due_at').values_list('due_at', flat=True).first()
+        if due_at is None:
+            return max_sleep
+        return min(max((due_at - timezone.now()).total_seconds(), 0), max_sleep)
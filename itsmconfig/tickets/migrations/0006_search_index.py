@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# The SQL is frozen here rather than taken from tickets.search, so later
+# changes to the backends do not rewrite what this migration did.
+CREATE_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tickets_search USING fts5("
+        "title, body, kind UNINDEXED, object_id UNINDEXED, ticket_id UNINDEXED, "
+        "tokenize='porter unicode61')",
+        "INSERT INTO tickets_search (rowid, title, body, kind, object_id, ticket_id) "
+        "SELECT id * 2, title, description, 'ticket', id, id FROM tickets_ticket",
+        "INSERT INTO tickets_search (rowid, title, body, kind, object_id, ticket_id) "
+        "SELECT id * 2 + 1, '', content, 'comment', id, ticket_id FROM tickets_ticketcomment",
+    ],
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS tickets_search ("
+        "kind varchar(10) NOT NULL, object_id bigint NOT NULL, ticket_id bigint NOT NULL, "
+        "title text NOT NULL, body text NOT NULL, document tsvector NOT NULL, "
+        "PRIMARY KEY (kind, object_id))",
+        "CREATE INDEX IF NOT EXISTS tickets_search_document_idx ON tickets_search USING gin (document)",
+        "INSERT INTO tickets_search (kind, object_id, ticket_id, title, body, document) "
+        "SELECT 'ticket', id, id, title, description, "
+        "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', description), 'B') "
+        "FROM tickets_ticket",
+        "INSERT INTO tickets_search (kind, object_id, ticket_id, title, body, document) "
+        "SELECT 'comment', id, ticket_id, '', content, "
+        "setweight(to_tsvector('english', ''), 'A') || setweight(to_tsvector('english', content), 'B') "
+        "FROM tickets_ticketcomment",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in CREATE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql, params=None)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        schema_editor.execute("DROP TABLE IF EXISTS tickets_search", params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticket_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:24
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_rows(apps, schema_editor):
+    # Existing tickets get their id and comments follow on, which keeps every number unique.
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketComment = apps.get_model('tickets', 'TicketComment')
+    ChangeSequence = apps.get_model('tickets', 'ChangeSequence')
+    offset = Ticket.objects.aggregate(last=Max('id'))['last'] or 0
+    Ticket.objects.update(change_seq=F('id'))
+    TicketComment.objects.update(change_seq=F('id') + offset)
+    last = TicketComment.objects.aggregate(last=Max('change_seq'))['last'] or offset
+    ChangeSequence.objects.create(pk=1, value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('pruned_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TicketTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('change_seq', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('ticket', 'Ticket'), ('comment', 'Comment')], max_length=16)),
+                ('object_id', models.IntegerField()),
+                ('ticket_id', models.IntegerField()),
+                ('created_by_id', models.IntegerField(null=True)),
+                ('assigned_to_id', models.IntegerField(null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticketcomment',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['change_seq'], name='ticket_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['assigned_to', 'change_seq'], name='ticket_assignee_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_by', 'change_seq'], name='ticket_creator_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketcomment',
+            index=models.Index(fields=['change_seq'], name='comment_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickettombstone',
+            index=models.Index(fields=['change_seq'], name='tombstone_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickettombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ),
+        migrations.RunPython(number_existing_rows, migrations.RunPython.noop),
+    ]
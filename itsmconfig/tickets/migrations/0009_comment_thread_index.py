@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_change_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticketcomment',
+            index=models.Index(fields=['ticket', 'created_at', 'id'], name='comment_ticket_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_comment_thread_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['assigned_to', 'created_at', 'id'], name='ticket_assignee_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tickets', '0010_agent_scope_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skills', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skills', to='tickets.category')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='agentskill',
+            constraint=models.UniqueConstraint(fields=('agent', 'category'), name='agentskill_unique'),
+        ),
+    ]
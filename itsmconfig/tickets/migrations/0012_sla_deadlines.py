@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0011_agent_skills'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='resolution_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='SLA target for closing the ticket', null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='response_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='SLA target for the first response', null=True),
+        ),
+        migrations.AddField(
+            model_name='priority',
+            name='resolution_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='SLA target for closing the ticket', null=True),
+        ),
+        migrations.AddField(
+            model_name='priority',
+            name='response_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='SLA target for the first response', null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='resolution_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='responded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='response_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='sla_breach',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('response', 'Response'), ('resolution', 'Resolution')], default='', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['due_at', 'priority'], name='ticket_due_idx'),
+        ),
+    ]
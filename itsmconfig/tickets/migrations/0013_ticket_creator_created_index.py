@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0012_sla_deadlines'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='ticket_creator_created_idx'),
+        ),
+    ]
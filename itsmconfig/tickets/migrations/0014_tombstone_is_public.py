@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0013_ticket_creator_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettombstone',
+            name='is_public',
+            field=models.BooleanField(default=False),
+        ),
+    ]
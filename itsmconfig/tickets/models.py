@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 
 # Create your models here.
@@ -22,6 +23,8 @@ class Priority(models.Model):
     is_active = models.BooleanField(default=True)
     order = models.IntegerField(default=0)
     color = models.CharField(max_length=255)
+    response_minutes = models.PositiveIntegerField(null=True, blank=True, help_text="SLA target for the first response")
+    resolution_minutes = models.PositiveIntegerField(null=True, blank=True, help_text="SLA target for closing the ticket")
 
     def __str__(self):
         return self.name
@@ -31,12 +34,70 @@ class Category(models.Model):
     description = models.TextField()
     is_active = models.BooleanField(default=True)
     order = models.IntegerField(default=0)
+    # Optional stricter SLA targets than the priority's; see sla.py.
+    response_minutes = models.PositiveIntegerField(null=True, blank=True, help_text="SLA target for the first response")
+    resolution_minutes = models.PositiveIntegerField(null=True, blank=True, help_text="SLA target for closing the ticket")
 
 
     def __str__(self):
         return self.name
-    
-class Ticket(models.Model):
+
+
+class AgentSkill(models.Model):
+    """A category an agent handles. New tickets are assigned by skill; see assignment.py."""
+    agent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='skills')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='skills')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['agent', 'category'], name='agentskill_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.agent} - {self.category}"
+
+
+class ChangeSequence(models.Model):
+    """
+    Single-row counter behind the `change_seq` of tickets, comments and
+    tombstones. Allocating locks the row until the writing transaction
+    commits, so sequence numbers become visible in increasing order and a
+    sync client can never skip past an uncommitted change.
+    """
+    value = models.BigIntegerField(default=0)
+    pruned_through = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, count=1):
+        """Reserve `count` numbers and return the highest. Call inside a transaction."""
+        with transaction.atomic():
+            if not cls.objects.filter(pk=1).update(value=F('value') + count):
+                cls.objects.get_or_create(pk=1)
+                cls.objects.filter(pk=1).update(value=F('value') + count)
+            return cls.objects.values_list('value', flat=True).get(pk=1)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('value', 'pruned_through').first() or (0, 0)
+
+
+class ChangeTrackedModel(models.Model):
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            self.change_seq = ChangeSequence.allocate()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+            super().save(*args, **kwargs)
+
+
+class Ticket(ChangeTrackedModel):
+    SLA_BREACHES = [('', 'None'), ('response', 'Response'), ('resolution', 'Resolution')]
+
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_tickets')
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='assigned_tickets')
     title = models.CharField(max_length=255)
@@ -46,20 +107,77 @@ class Ticket(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # SLA state, maintained by sla.py and the sla_scheduler command.
+    responded_at = models.DateTimeField(null=True, blank=True)
+    response_due_at = models.DateTimeField(null=True, blank=True)
+    resolution_due_at = models.DateTimeField(null=True, blank=True)
+    due_at = models.DateTimeField(null=True, blank=True)
+    sla_breach = models.CharField(max_length=16, choices=SLA_BREACHES, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='ticket_updated_idx'),
+            models.Index(fields=['assigned_to', 'updated_at', 'id'], name='ticket_assignee_updated_idx'),
+            models.Index(fields=['created_by', 'updated_at', 'id'], name='ticket_creator_updated_idx'),
+            models.Index(fields=['status', 'updated_at', 'id'], name='ticket_status_updated_idx'),
+            models.Index(fields=['priority', 'updated_at', 'id'], name='ticket_priority_updated_idx'),
+            models.Index(fields=['category', 'updated_at', 'id'], name='ticket_category_updated_idx'),
+            models.Index(fields=['created_at', 'id'], name='ticket_created_idx'),
+            models.Index(fields=['change_seq'], name='ticket_change_idx'),
+            models.Index(fields=['assigned_to', 'change_seq'], name='ticket_assignee_change_idx'),
+            models.Index(fields=['created_by', 'change_seq'], name='ticket_creator_change_idx'),
+            # With ticket_assignee_updated_idx, serves the agent's own tickets and the
+            # unassigned queue (assigned_to IS NULL) as separate ranges; see visibility.py.
+            models.Index(fields=['assigned_to', 'created_at', 'id'], name='ticket_assignee_created_idx'),
+            models.Index(fields=['created_by', 'created_at', 'id'], name='ticket_creator_created_idx'),
+            models.Index(fields=['due_at', 'priority'], name='ticket_due_idx'),
+        ]
 
     def __str__(self):
         return self.title
     
 
-class TicketComment(models.Model):
+class TicketComment(ChangeTrackedModel):
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='comments')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_public = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['ticket', 'created_at', 'id'], name='comment_ticket_created_idx'),
+            models.Index(fields=['change_seq'], name='comment_change_idx'),
+        ]
+
     def __str__(self):
         return self.content[:50]
+
+
+class TicketTombstone(models.Model):
+    """
+    Record of a deleted ticket or comment for incremental sync, or of one
+    that left the view of some users (its previous owners, or a comment made
+    private). The owners are kept as plain ids so visibility can still be
+    checked after the ticket is gone.
+    """
+    KINDS = [('ticket', 'Ticket'), ('comment', 'Comment')]
+
+    change_seq = models.BigIntegerField()
+    kind = models.CharField(max_length=16, choices=KINDS)
+    object_id = models.IntegerField()
+    ticket_id = models.IntegerField()
+    created_by_id = models.IntegerField(null=True)
+    assigned_to_id = models.IntegerField(null=True)
+    # Whether a deleted comment was public; end users only see those.
+    is_public = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['change_seq'], name='tombstone_change_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
     
 
 
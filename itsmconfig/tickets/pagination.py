@@ -0,0 +1,162 @@
+import base64
+import heapq
+import json
+from collections import OrderedDict
+from itertools import islice
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite key.
+
+    The cursor stores the ordering values of the boundary row, so every page
+    is a single indexed range scan no matter how deep the client scrolls.
+    The last field in `ordering` must be unique to break ties.
+
+    With several `scopes` (see `ticket_scopes`), a page is read from each
+    scope separately, so each can use its own index, and the pages are
+    merged. All `ordering` fields must then sort in the same direction.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+    ordering = ('-updated_at', '-id')
+    scopes = ()
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(self.merge([list(page) for page in self.page_querysets(queryset, request)]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(self.merge([
+            [row async for row in page] for page in self.page_querysets(queryset, request)
+        ]))
+
+    def page_querysets(self, queryset, request):
+        """The queries for one page plus a probe row, one per scope, without evaluating them."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.get_ordering(self.reverse)
+        if self.position is not None:
+            queryset = queryset.filter(self.build_filter(ordering, self.position))
+        scoped = [queryset.filter(scope) for scope in self.scopes] if len(self.scopes) > 1 else [queryset]
+        return [page.order_by(*ordering)[:self.page_size + 1] for page in scoped]
+
+    def merge(self, pages):
+        if len(pages) == 1:
+            return pages[0]
+        descending = self.get_ordering(self.reverse)[0].startswith('-')
+        merged = heapq.merge(*pages, key=self.get_position, reverse=descending)
+        return list(islice(merged, self.page_size + 1))
+
+    def paginate_rows(self, rows):
+        position, reverse = self.position, self.reverse
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = None
+        self.previous_position = None
+        if rows:
+            if has_more and not reverse or reverse and position is not None:
+                self.next_position = self.get_position(rows[-1])
+            if has_more and reverse or not reverse and position is not None:
+                self.previous_position = self.get_position(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(field[1:] if field.startswith('-') else '-' + field for field in self.ordering)
+
+    def get_position(self, obj):
+        if isinstance(obj, dict):
+            return [obj[field.lstrip('-')] for field in self.ordering]
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def build_filter(self, ordering, position):
+        # Lexicographic "row comes after position": (a > x) OR (a = x AND b > y) ...
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            condition |= equal & Q(**{name + lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if len(payload['p']) != len(self.ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, payload['p'])
+            ]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+
+class CommentPagination(KeysetPagination):
+    """Oldest first, the order a ticket's thread is read in."""
+    ordering = ('created_at', 'id')
@@ -0,0 +1,50 @@
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from .models import Ticket, TicketComment
+from .visibility import thread_comments
+
+TICKET_RELATED_FIELDS = ('status', 'priority', 'category', 'created_by', 'assigned_to')
+TICKET_EXPANDABLE_FIELDS = TICKET_RELATED_FIELDS + ('comments',)
+COMMENT_EXPANDABLE_FIELDS = ('ticket', 'user')
+
+
+def get_expand(request, allowed):
+    """Parse `?expand=a,b` into a tuple of field names, rejecting unknown ones."""
+    value = request.query_params.get('expand', '')
+    expand = tuple(name.strip() for name in value.split(',') if name.strip())
+    unknown = [name for name in expand if name not in allowed]
+    if unknown:
+        raise ValidationError({'expand': [f"Unknown field '{name}'. Choose from: {', '.join(allowed)}." for name in unknown]})
+    return expand
+
+
+def ticket_queryset(queryset=None, expand=(), user=None):
+    """
+    Ticket queryset shaped for `TicketSerializer`.
+
+    Flat representations only need the foreign key columns, so joins and
+    prefetches are added just for the expanded fields. The number of queries
+    stays constant regardless of how many tickets are serialized. Expanded
+    comments are limited to those `user` may read.
+    """
+    if queryset is None:
+        queryset = Ticket.objects.all()
+    related = [name for name in TICKET_RELATED_FIELDS if name in expand]
+    if related:
+        queryset = queryset.select_related(*related)
+    if 'comments' in expand:
+        queryset = queryset.prefetch_related(
+            Prefetch('comments', queryset=(thread_comments(user) if user else TicketComment.objects).order_by('created_at', 'id'))
+        )
+    return queryset
+
+
+def comment_queryset(queryset=None, expand=()):
+    """TicketComment queryset shaped for `TicketCommentSerializer`."""
+    if queryset is None:
+        queryset = TicketComment.objects.all()
+    related = [name for name in COMMENT_EXPANDABLE_FIELDS if name in expand]
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset
@@ -0,0 +1,56 @@
+import copy
+import threading
+
+from itsmconfig.replicas import primary_reads
+
+from .conditional import model_version
+from .models import Category, Priority, Status
+
+
+class ReferenceRegistry:
+    """
+    Per-process copy of a small lookup table.
+
+    The rows are reloaded whenever the model's version token in the cache
+    changes, which every save or delete does (see `tickets.signals`), so all
+    workers sharing the cache see writes on their next lookup. Callers get
+    copies and may modify them freely.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self._token = None
+        self._rows = {}
+
+    def _current(self):
+        token, _ = model_version(self.model)
+        if token != self._token:
+            with self._lock:
+                if token != self._token:
+                    # Other requests trust these rows for the whole version, so never read a lagging replica.
+                    with primary_reads():
+                        self._rows = {row.pk: row for row in self.model.objects.order_by('pk')}
+                    self._token = token
+        return self._rows
+
+    def get(self, pk):
+        row = self._current().get(pk)
+        return copy.copy(row) if row is not None else None
+
+    def all(self):
+        return [copy.copy(row) for row in self._current().values()]
+
+    def ids(self, **filters):
+        """Primary keys of the rows whose attributes equal `filters`."""
+        return [
+            pk for pk, row in self._current().items()
+            if all(getattr(row, name) == value for name, value in filters.items())
+        ]
+
+
+REGISTRIES = {model: ReferenceRegistry(model) for model in (Status, Priority, Category)}
+
+
+def reference(model):
+    return REGISTRIES[model]
@@ -0,0 +1,241 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Ticket, TicketComment
+
+SEARCH_TABLE = 'tickets_search'
+TICKET, COMMENT = 'ticket', 'comment'
+# Backends delimit matches with private-use characters; `highlighted()`
+# turns them into <mark> tags once the text around them is escaped.
+HIGHLIGHT_START, HIGHLIGHT_END = '\ue000', '\ue001'
+
+
+def highlighted(text):
+    """HTML-escape `text` and mark the matches delimited by the backend."""
+    return escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query)
+
+
+def scope_sql(queryset):
+    """SQL and params selecting the ids of `queryset`, for use in an IN clause."""
+    return queryset.order_by().values('id').query.sql_with_params()
+
+
+class SQLiteSearchBackend:
+    """
+    FTS5 index. The rowid packs the object id and kind (even for tickets,
+    odd for comments) so updates and deletes are rowid lookups.
+    """
+
+    create_sql = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "title, body, kind UNINDEXED, object_id UNINDEXED, ticket_id UNINDEXED, "
+        "tokenize='porter unicode61')",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+    populate_sql = [
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, object_id, ticket_id) "
+        f"SELECT id * 2, title, description, '{TICKET}', id, id FROM tickets_ticket",
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, object_id, ticket_id) "
+        f"SELECT id * 2 + 1, '', content, '{COMMENT}', id, ticket_id FROM tickets_ticketcomment",
+    ]
+
+    def rowid(self, kind, object_id):
+        return object_id * 2 + (kind == COMMENT)
+
+    def index(self, entries):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                [(self.rowid(kind, object_id),) for kind, object_id, _, _, _ in entries],
+            )
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, object_id, ticket_id) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [(self.rowid(kind, object_id), title, body, kind, object_id, ticket_id)
+                 for kind, object_id, ticket_id, title, body in entries],
+            )
+
+    def remove(self, kind, object_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                [(self.rowid(kind, object_id),) for object_id in object_ids],
+            )
+
+    def search(self, query, tickets, comments, limit):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        match = ' '.join('"%s"' % term for term in terms)
+        tickets_sql, tickets_params = scope_sql(tickets)
+        comments_sql, comments_params = scope_sql(comments)
+        sql = (
+            f"SELECT kind, object_id, ticket_id, bm25({SEARCH_TABLE}, 10.0, 1.0) AS rank, "
+            f"highlight({SEARCH_TABLE}, 0, %s, %s), "
+            f"snippet({SEARCH_TABLE}, 1, %s, %s, '…', 24) "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"AND ((kind = '{TICKET}' AND ticket_id IN ({tickets_sql})) "
+            f"OR (kind = '{COMMENT}' AND object_id IN ({comments_sql}))) "
+            "ORDER BY rank LIMIT %s"
+        )
+        params = [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, match,
+                  *tickets_params, *comments_params, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25() is lower-is-better; flip it so every backend ranks higher-is-better.
+            return [(kind, object_id, ticket_id, -rank, title, snippet)
+                    for kind, object_id, ticket_id, rank, title, snippet in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector column with a GIN index."""
+
+    document_sql = "setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B')"
+    create_sql = [
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "kind varchar(10) NOT NULL, object_id bigint NOT NULL, ticket_id bigint NOT NULL, "
+        "title text NOT NULL, body text NOT NULL, document tsvector NOT NULL, "
+        "PRIMARY KEY (kind, object_id))",
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING gin (document)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+    populate_sql = [
+        f"INSERT INTO {SEARCH_TABLE} (kind, object_id, ticket_id, title, body, document) "
+        f"SELECT '{TICKET}', id, id, title, description, "
+        "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', description), 'B') "
+        "FROM tickets_ticket",
+        f"INSERT INTO {SEARCH_TABLE} (kind, object_id, ticket_id, title, body, document) "
+        f"SELECT '{COMMENT}', id, ticket_id, '', content, "
+        "setweight(to_tsvector('english', ''), 'A') || setweight(to_tsvector('english', content), 'B') "
+        "FROM tickets_ticketcomment",
+    ]
+
+    def index(self, entries):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (kind, object_id, ticket_id, title, body, document) "
+                f"VALUES (%s, %s, %s, %s, %s, {self.document_sql}) "
+                "ON CONFLICT (kind, object_id) DO UPDATE SET ticket_id = EXCLUDED.ticket_id, "
+                "title = EXCLUDED.title, body = EXCLUDED.body, document = EXCLUDED.document",
+                [(kind, object_id, ticket_id, title, body, title, body)
+                 for kind, object_id, ticket_id, title, body in entries],
+            )
+
+    def remove(self, kind, object_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE kind = %s AND object_id = ANY(%s)",
+                [kind, list(object_ids)],
+            )
+
+    def search(self, query, tickets, comments, limit):
+        if not search_terms(query):
+            return []
+        tickets_sql, tickets_params = scope_sql(tickets)
+        comments_sql, comments_params = scope_sql(comments)
+        options = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}'
+        # Rank and limit first so ts_headline only runs on the returned rows.
+        sql = (
+            "SELECT kind, object_id, ticket_id, rank, "
+            "ts_headline('english', title, query, %s), "
+            "ts_headline('english', body, query, %s) "
+            "FROM ("
+            f"SELECT s.*, ts_rank(s.document, query) AS rank, query FROM {SEARCH_TABLE} s, "
+            "websearch_to_tsquery('english', %s) query WHERE s.document @@ query "
+            f"AND ((s.kind = '{TICKET}' AND s.ticket_id IN ({tickets_sql})) "
+            f"OR (s.kind = '{COMMENT}' AND s.object_id IN ({comments_sql}))) "
+            "ORDER BY rank DESC LIMIT %s"
+            ") hits ORDER BY rank DESC"
+        )
+        params = [options + ', MaxFragments=0', options + ', MaxFragments=2', query,
+                  *tickets_params, *comments_params, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class FallbackSearchBackend:
+    """Unindexed LIKE search for databases without a full-text backend."""
+
+    create_sql = drop_sql = populate_sql = []
+
+    def index(self, entries):
+        pass
+
+    def remove(self, kind, object_ids):
+        pass
+
+    def search(self, query, tickets, comments, limit):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        for term in terms:
+            tickets = tickets.filter(Q(title__icontains=term) | Q(description__icontains=term))
+            comments = comments.filter(content__icontains=term)
+        hits = [(TICKET, pk, pk, 0.0, title, description[:200])
+                for pk, title, description in tickets.values_list('pk', 'title', 'description')[:limit]]
+        hits += [(COMMENT, pk, ticket_id, 0.0, '', content[:200])
+                 for pk, ticket_id, content in
+                 comments.values_list('pk', 'ticket_id', 'content')[:limit - len(hits)]]
+        return hits
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(vendor=None):
+    return BACKENDS.get(vendor or connection.vendor, FallbackSearchBackend)()
+
+
+def reindex(kind, ids, entries):
+    backend = get_backend()
+    if entries:
+        backend.index(entries)
+    missing = set(ids).difference(entry[1] for entry in entries)
+    if missing:
+        backend.remove(kind, missing)
+
+
+def reindex_tickets(ids):
+    """Bring the entries of tickets `ids` up to date, dropping those of deleted tickets."""
+    rows = Ticket.objects.filter(pk__in=ids).values_list('pk', 'title', 'description')
+    reindex(TICKET, ids, [(TICKET, pk, pk, title, description) for pk, title, description in rows])
+
+
+def reindex_comments(ids):
+    # Comment rows leave the title empty; results show the ticket's current title.
+    rows = TicketComment.objects.filter(pk__in=ids).values_list('pk', 'ticket_id', 'content')
+    reindex(COMMENT, ids, [(COMMENT, pk, ticket_id, '', content) for pk, ticket_id, content in rows])
+
+
+def rebuild_index():
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        for sql in backend.drop_sql + backend.create_sql + backend.populate_sql:
+            cursor.execute(sql)
+
+
+def search(query, tickets, comments, limit=20):
+    """
+    Ranked hits for `query` restricted to the given ticket and comment
+    querysets, as dicts with HTML-escaped title and body snippets whose
+    matches are wrapped in <mark> tags.
+    """
+    rows = get_backend().search(query, tickets, comments, limit)
+    comment_tickets = {row[2] for row in rows if row[0] == COMMENT}
+    titles = dict(Ticket.objects.filter(pk__in=comment_tickets).values_list('pk', 'title')) if comment_tickets else {}
+    return [
+        {'type': kind, 'id': object_id, 'ticket': ticket_id, 'rank': rank,
+         'title': highlighted(title if kind == TICKET else titles.get(ticket_id, '')), 'snippet': highlighted(snippet)}
+        for kind, object_id, ticket_id, rank, title, snippet in rows
+    ]
@@ -1,5 +1,8 @@
 from rest_framework import serializers
+from django.contrib.auth.models import User
+from users.principal import get_principal
 from .models import Status, Priority, Category, Ticket, TicketComment
+from .reference import REGISTRIES
 
 
 class StatusSerializer(serializers.ModelSerializer):
@@ -17,22 +20,132 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = '__all__'
 
+class TicketUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'first_name', 'last_name']
+
+
+class ReferenceRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that validates status, priority and category ids against the in-memory registry."""
+
+    def to_internal_value(self, data):
+        registry = REGISTRIES.get(self.get_queryset().model)
+        if registry is None:
+            return super().to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            instance = registry.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
 
 class TicketSerializer(serializers.ModelSerializer):
+      serializer_related_field = ReferenceRelatedField
+
       class Meta:
           model = Ticket
-          fields = '__all__'
-          read_only_fields = ['created_by', 'created_at', 'updated_at']
+          exclude = ['change_seq']
+          read_only_fields = [
+              'created_by', 'created_at', 'updated_at',
+              'responded_at', 'response_due_at', 'resolution_due_at', 'due_at', 'sla_breach',
+          ]
 
       def __init__(self, *args, **kwargs):
           super().__init__(*args, **kwargs)
+          expand = self.context.get('expand', ())
+          if 'status' in expand:
+              self.fields['status'] = StatusSerializer(read_only=True)
+          if 'priority' in expand:
+              self.fields['priority'] = PrioritySerializer(read_only=True)
+          if 'category' in expand:
+              self.fields['category'] = CategorySerializer(read_only=True)
+          if 'created_by' in expand:
+              self.fields['created_by'] = TicketUserSerializer(read_only=True)
+          if 'assigned_to' in expand:
+              self.fields['assigned_to'] = TicketUserSerializer(read_only=True)
+          if 'comments' in expand:
+              self.fields['comments'] = TicketCommentSerializer(many=True, read_only=True)
+
           request = self.context.get('request')
 
-          if request and request.user.usermodel.role == 'user':
+          if request and get_principal(request.user).role == 'user':
               self.fields.pop('assigned_to', None)
           
 
 class TicketCommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = TicketComment
-        fields = '__all__'
+        exclude = ['change_seq']
+        read_only_fields = ['ticket', 'user', 'created_at']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.context.get('expand', ())
+        if 'ticket' in expand:
+            self.fields['ticket'] = TicketSerializer(read_only=True)
+        if 'user' in expand:
+            self.fields['user'] = TicketUserSerializer(read_only=True)
+
+
+class TicketBulkOperationSerializer(serializers.Serializer):
+    OPERATIONS = ['create', 'update', 'transition']
+    REQUIRED_FIELDS = {
+        'create': ['title', 'description', 'status', 'priority', 'category'],
+        'update': ['id'],
+        'transition': ['id', 'status'],
+    }
+    TICKET_FIELDS = ['title', 'description', 'status', 'priority', 'category', 'assigned_to']
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+    title = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False)
+    status = serializers.IntegerField(required=False)
+    priority = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+
+        if request and get_principal(request.user).role == 'user':
+            self.fields.pop('assigned_to', None)
+
+    def validate(self, attrs):
+        op = attrs['op']
+        errors = {field: ['This field is required.'] for field in self.REQUIRED_FIELDS[op] if field not in attrs}
+        if op == 'create' and 'id' in attrs:
+            errors['id'] = ['Not allowed when creating a ticket.']
+        if op == 'transition':
+            errors.update({field: ['Only status can change in a transition.'] for field in self.TICKET_FIELDS if field in attrs and field != 'status'})
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class TicketSearchResultSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=['ticket', 'comment'])
+    id = serializers.IntegerField()
+    ticket = serializers.IntegerField()
+    rank = serializers.FloatField()
+    title = serializers.CharField()
+    snippet = serializers.CharField()
+
+
+class TicketDeletionsSerializer(serializers.Serializer):
+    tickets = serializers.ListField(child=serializers.IntegerField())
+    comments = serializers.ListField(child=serializers.IntegerField())
+
+
+class TicketChangesSerializer(serializers.Serializer):
+    tickets = TicketSerializer(many=True)
+    comments = TicketCommentSerializer(many=True)
+    deleted = TicketDeletionsSerializer()
+    since = serializers.CharField()
+    has_more = serializers.BooleanField()
@@ -0,0 +1,244 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from users.models import UserModel
+
+from . import events, sla, tasks
+from .assignment import load_index, record_moves, ticket_owner
+from .conditional import bump_model_version
+from .models import AgentSkill, Category, ChangeSequence, Priority, Status, Ticket, TicketComment, TicketTombstone
+from .serializers import TicketCommentSerializer, TicketSerializer
+
+# Deleting a ticket deletes its comments one post_delete at a time; they are
+# unindexed by one task per transaction. Ids left by a transaction that rolled
+# back go with the next one, which is harmless since reindexing reads current rows.
+deleted_comments = threading.local()
+
+# Sent after TicketBulkAPIView writes tickets with bulk_create/bulk_update,
+# which skip the per-instance model signals. Arguments: `tickets`.
+tickets_bulk_created = Signal()
+tickets_bulk_updated = Signal()
+
+
+@receiver(post_save, sender=Ticket)
+def index_ticket(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tasks.reindex_tickets.delay([instance.pk])
+
+
+@receiver(post_save, sender=TicketComment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tasks.reindex_comments.delay([instance.pk])
+
+
+@receiver(post_delete, sender=Ticket)
+def unindex_ticket(sender, instance, **kwargs):
+    tasks.reindex_tickets.delay([instance.pk])
+
+
+def unindex_deleted_comments():
+    ids, deleted_comments.ids = getattr(deleted_comments, 'ids', []), []
+    if ids:
+        tasks.reindex_comments.delay(ids)
+
+
+@receiver(post_delete, sender=TicketComment)
+def unindex_comment(sender, instance, **kwargs):
+    if not getattr(deleted_comments, 'ids', None):
+        deleted_comments.ids = []
+    deleted_comments.ids.append(instance.pk)
+    transaction.on_commit(unindex_deleted_comments)
+
+
+@receiver(tickets_bulk_created)
+@receiver(tickets_bulk_updated)
+def index_bulk_tickets(sender, tickets, **kwargs):
+    tasks.reindex_tickets.delay([ticket.pk for ticket in tickets])
+
+
+def publish_tickets(event_type, tickets):
+    # Serialize now, in one pass for the batch, and publish only once the change is committed.
+    data = TicketSerializer(tickets, many=True).data
+
+    def publish():
+        for ticket, item in zip(tickets, data):
+            events.publish(event_type, item, ticket.created_by_id, ticket.assigned_to_id)
+    transaction.on_commit(publish)
+
+
+@receiver(post_save, sender=Ticket)
+def publish_ticket_save(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        publish_tickets('ticket.created' if created else 'ticket.updated', [instance])
+
+
+@receiver(post_save, sender=TicketComment)
+def publish_comment_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    ticket = instance.ticket
+    data = TicketCommentSerializer(instance).data
+    event_type = 'comment.created' if created else 'comment.updated'
+    transaction.on_commit(lambda: events.publish(event_type, data, ticket.created_by_id, ticket.assigned_to_id))
+
+
+@receiver(tickets_bulk_created)
+def publish_bulk_created(sender, tickets, **kwargs):
+    publish_tickets('ticket.created', tickets)
+
+
+@receiver(tickets_bulk_updated)
+def publish_bulk_updated(sender, tickets, **kwargs):
+    publish_tickets('ticket.updated', tickets)
+
+
+@receiver(post_delete, sender=Ticket)
+def record_ticket_tombstone(sender, instance, **kwargs):
+    TicketTombstone.objects.create(
+        change_seq=ChangeSequence.allocate(), kind='ticket', object_id=instance.pk, ticket_id=instance.pk,
+        created_by_id=instance.created_by_id, assigned_to_id=instance.assigned_to_id,
+    )
+
+
+@receiver(post_delete, sender=TicketComment)
+def record_comment_tombstone(sender, instance, origin=None, **kwargs):
+    # Comments deleted along with their ticket are covered by the ticket's tombstone.
+    if isinstance(origin, Ticket) or getattr(origin, 'model', None) is Ticket:
+        return
+    owners = Ticket.objects.filter(pk=instance.ticket_id).values_list('created_by_id', 'assigned_to_id').first()
+    if owners is None:
+        return
+    TicketTombstone.objects.create(
+        change_seq=ChangeSequence.allocate(), kind='comment', object_id=instance.pk, ticket_id=instance.ticket_id,
+        created_by_id=owners[0], assigned_to_id=owners[1], is_public=instance.is_public,
+    )
+
+
+def sync_owners(ticket):
+    """The `(created_by id, assigned_to id)` that decide who may see a ticket."""
+    return ticket.__dict__.get('created_by_id'), ticket.__dict__.get('assigned_to_id')
+
+
+@receiver(post_init, sender=Ticket)
+def remember_sync_owners(sender, instance, **kwargs):
+    instance._sync_owners = sync_owners(instance) if instance.pk else None
+
+
+def record_scope_exits(tickets):
+    """
+    Tombstone tickets under their previous owners when their owners change,
+    so clients that could only see them that way drop their copies. Clients
+    that can still see a ticket are not sent the tombstone (see `changes_since`).
+    """
+    moved = [ticket for ticket in tickets if ticket._sync_owners not in (None, sync_owners(ticket))]
+    if moved:
+        last = ChangeSequence.allocate(len(moved))
+        TicketTombstone.objects.bulk_create(
+            TicketTombstone(
+                change_seq=change_seq, kind='ticket', object_id=ticket.pk, ticket_id=ticket.pk,
+                created_by_id=ticket._sync_owners[0], assigned_to_id=ticket._sync_owners[1],
+            )
+            for change_seq, ticket in enumerate(moved, last - len(moved) + 1)
+        )
+    for ticket in tickets:
+        ticket._sync_owners = sync_owners(ticket)
+
+
+@receiver(post_save, sender=Ticket)
+def record_ticket_scope_exit(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        record_scope_exits([instance])
+
+
+@receiver(tickets_bulk_updated)
+def record_bulk_scope_exits(sender, tickets, **kwargs):
+    record_scope_exits(tickets)
+
+
+@receiver(post_init, sender=TicketComment)
+def remember_comment_public(sender, instance, **kwargs):
+    instance._was_public = instance.__dict__.get('is_public') if instance.pk else None
+
+
+@receiver(post_save, sender=TicketComment)
+def record_comment_scope_exit(sender, instance, created=False, raw=False, **kwargs):
+    # A comment made private leaves the end user's thread.
+    if not raw and instance._was_public and not instance.is_public:
+        owners = Ticket.objects.filter(pk=instance.ticket_id).values_list('created_by_id', 'assigned_to_id').first()
+        TicketTombstone.objects.create(
+            change_seq=ChangeSequence.allocate(), kind='comment', object_id=instance.pk, ticket_id=instance.ticket_id,
+            created_by_id=owners[0], assigned_to_id=owners[1], is_public=True,
+        )
+    instance._was_public = instance.is_public
+
+
+@receiver(post_save, sender=Status)
+@receiver(post_save, sender=Priority)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Status)
+@receiver(post_delete, sender=Priority)
+@receiver(post_delete, sender=Category)
+def bump_lookup_version(sender, **kwargs):
+    # Bump after commit too, so a reader cannot cache pre-commit rows under the new version.
+    bump_model_version(sender)
+    transaction.on_commit(lambda: bump_model_version(sender))
+
+
+@receiver(post_init, sender=Ticket)
+def remember_ticket_owner(sender, instance, **kwargs):
+    instance._assignment_owner = ticket_owner(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Ticket)
+def move_agent_load(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    record_moves([(None if created else instance._assignment_owner, ticket_owner(instance))])
+    instance._assignment_owner = ticket_owner(instance)
+
+
+@receiver(post_delete, sender=Ticket)
+def release_agent_load(sender, instance, **kwargs):
+    record_moves([(instance._assignment_owner, None)])
+
+
+@receiver(tickets_bulk_created)
+@receiver(tickets_bulk_updated)
+def move_bulk_agent_loads(sender, tickets, signal, **kwargs):
+    created = signal is tickets_bulk_created
+    record_moves([(None if created else ticket._assignment_owner, ticket_owner(ticket)) for ticket in tickets])
+    for ticket in tickets:
+        ticket._assignment_owner = ticket_owner(ticket)
+
+
+@receiver(post_save, sender=Status)
+@receiver(post_delete, sender=Status)
+@receiver(post_save, sender=AgentSkill)
+@receiver(post_delete, sender=AgentSkill)
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def reset_agent_loads(sender, **kwargs):
+    # Closing statuses, roles and skills decide every agent's load and pool.
+    load_index.invalidate()
+    transaction.on_commit(load_index.invalidate)
+
+
+@receiver(post_init, sender=Ticket)
+def remember_sla_basis(sender, instance, **kwargs):
+    instance._sla_basis = sla.sla_basis(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=Ticket)
+def refresh_sla(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sla.refresh(instance)
+
+
+@receiver(post_save, sender=TicketComment)
+def record_first_response(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        sla.record_response(instance)
@@ -0,0 +1,90 @@
+"""
+Service level deadlines.
+
+Priorities and categories have optional response and resolution targets
+in minutes, and a ticket gets the stricter of the two. Its deadlines are
+fixed from `created_at` when it is created or changes priority or
+category. `due_at` is the earliest deadline still pending, and null once
+none is, so the `sla_scheduler` command finds every missed one with a
+range scan of its index instead of checking each open ticket.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Category, Priority, Status, Ticket
+from .reference import reference
+
+# Ticket fields `refresh` may change.
+SLA_FIELDS = ('response_due_at', 'resolution_due_at', 'due_at', 'sla_breach')
+
+
+def targets(priority_id, category_id):
+    """The `(response, resolution)` minutes for a ticket, each None if neither lookup sets it."""
+    rows = [row for row in (reference(Priority).get(priority_id), reference(Category).get(category_id)) if row]
+    return tuple(
+        min((getattr(row, field) for row in rows if getattr(row, field) is not None), default=None)
+        for field in ('response_minutes', 'resolution_minutes')
+    )
+
+
+def sla_basis(ticket):
+    return ticket.__dict__.get('priority_id'), ticket.__dict__.get('category_id')
+
+
+def schedule(ticket):
+    """Fix the deadlines of a new ticket, or of one whose priority or category changed."""
+    basis = sla_basis(ticket)
+    if basis == getattr(ticket, '_sla_basis', None):
+        return
+    created_at = ticket.created_at or timezone.now()
+    response, resolution = targets(*basis)
+    ticket.response_due_at = created_at + timedelta(minutes=response) if response is not None else None
+    ticket.resolution_due_at = created_at + timedelta(minutes=resolution) if resolution is not None else None
+    ticket._sla_basis = basis
+
+
+def next_due(ticket, closed):
+    if ticket.status_id in closed or ticket.sla_breach == 'resolution':
+        return None
+    pending = [ticket.resolution_due_at]
+    if ticket.responded_at is None and not ticket.sla_breach:
+        pending.append(ticket.response_due_at)
+    return min((due for due in pending if due is not None), default=None)
+
+
+def settle(ticket, now, closed):
+    """Record the pending deadlines `ticket` has missed by `now` and move `due_at` on."""
+    if ticket.due_at is not None and ticket.due_at <= now:
+        if ticket.resolution_due_at is not None and ticket.resolution_due_at <= now:
+            ticket.sla_breach = 'resolution'
+        elif (
+            not ticket.sla_breach and ticket.response_due_at is not None and ticket.response_due_at <= now
+            and (ticket.responded_at is None or ticket.responded_at > ticket.response_due_at)
+        ):
+            ticket.sla_breach = 'response'
+    ticket.due_at = next_due(ticket, closed)
+
+
+def refresh(ticket, now=None, closed=None):
+    """Bring the SLA fields of `ticket` up to date before it is saved."""
+    if closed is None:
+        closed = set(reference(Status).ids(is_closed=True))
+    schedule(ticket)
+    settle(ticket, now or timezone.now(), closed)
+
+
+def record_response(comment):
+    """Count the first comment by someone other than the requester as the response."""
+    if comment.user_id is None:
+        return
+    with transaction.atomic():
+        # Check the current row, not `comment.ticket`, which may be stale. The
+        # UPDATE also takes the write lock before the ticket is read back.
+        responded = Ticket.objects.filter(pk=comment.ticket_id, responded_at__isnull=True).exclude(
+            created_by_id=comment.user_id,
+        ).update(responded_at=comment.created_at)
+        if responded:
+            Ticket.objects.get(pk=comment.ticket_id).save(update_fields=['responded_at', 'updated_at', *SLA_FIELDS])
+
@@ -0,0 +1,13 @@
+from tasks.queue import task
+
+from . import search
+
+
+@task
+def reindex_tickets(ids):
+    search.reindex_tickets(ids)
+
+
+@task
+def reindex_comments(ids):
+    search.reindex_comments(ids)
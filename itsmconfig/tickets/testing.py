@@ -0,0 +1,58 @@
+import importlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import clear_url_caches
+
+from users.models import UserModel
+from users.serializers import PrincipalTokenObtainPairSerializer
+
+from .models import Category, Priority, Status
+
+
+def reload_urls():
+    for name in ('tickets.urls', 'dashboard.urls', settings.ROOT_URLCONF):
+        importlib.reload(importlib.import_module(name))
+    clear_url_caches()
+
+
+@contextmanager
+def async_api_views():
+    """Route the API to the async views for the duration, as with `ASYNC_API_VIEWS = True`."""
+    try:
+        with override_settings(ASYNC_API_VIEWS=True):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+def auth_headers(user):
+    """Bearer token `headers=` for `user`, for clients without `force_authenticate`."""
+    token = PrincipalTokenObtainPairSerializer.get_token(user).access_token
+    return {'Authorization': f'Bearer {token}'}
+
+
+class TicketFixturesMixin:
+    """Users with a role and the lookups a ticket needs, for TestCase subclasses."""
+
+    @classmethod
+    def create_user(cls, username, role='user', **fields):
+        user = User.objects.create_user(username, f'{username}@example.com', 'password', **fields)
+        UserModel.objects.create(user=user, role=role, department='IT', employee_id=username)
+        return user
+
+    @classmethod
+    def create_role_users(cls, **fields):
+        """One user per role in `cls.users`, named after the role."""
+        cls.users = {role: cls.create_user(role, role, **fields) for role in ('admin', 'agent', 'user')}
+
+    @classmethod
+    def create_lookups(cls, **priority_fields):
+        """`cls.status` (open), `cls.closed`, `cls.priority` and `cls.category`."""
+        cls.status = Status.objects.create(name='Open', description='', color='green')
+        cls.closed = Status.objects.create(name='Closed', description='', color='grey', is_closed=True)
+        cls.priority = Priority.objects.create(name='P1', description='', color='red', **priority_fields)
+        cls.category = Category.objects.create(name='Hardware', description='')
@@ -1,3 +1,1189 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import itertools
+import json
+import re
+import threading
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import DatabaseError, connection, connections, router
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from itsmconfig.replicas import pin_key
+from metrics.testing import QueryScalingTestMixin
+from tasks.models import Task
+
+from . import events, search
+from .async_views import AsyncTicketListAPIView
+from .assignment import load_index
+from .bulk import MAX_BATCH_SIZE, apply_operations, check_references
+from .changes import decode_watermark, encode_watermark
+from .conditional import model_version
+from .management.commands.sla_scheduler import Command as SlaScheduler
+from .filters import TICKET_ORDERINGS, TicketFilterSerializer
+from .models import AgentSkill, Category, ChangeSequence, Priority, Status, Ticket, TicketComment
+from .querysets import COMMENT_EXPANDABLE_FIELDS, TICKET_EXPANDABLE_FIELDS, TICKET_RELATED_FIELDS
+from .reference import reference
+from .sla import settle
+from .testing import TicketFixturesMixin, async_api_views, auth_headers
+from .visibility import ticket_scopes, visible_tickets
 
 # Create your tests here.
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "query plans are asserted in SQLite's EXPLAIN format")
+class TicketListQueryPlanTests(TicketFixturesMixin, TestCase):
+    """The ticket list's common filter combinations must never scan the ticket table."""
+
+    # A SCAN reads the table or one of its indexes from the start, whatever the filters; a SEARCH seeks to a range.
+    full_scan = re.compile(r'\bSCAN (tickets_ticket|T\d*)\b')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        Ticket.objects.create(
+            title='Printer', description='Jammed', status=cls.status, priority=cls.priority,
+            category=cls.category, created_by=cls.users['user'], assigned_to=cls.users['agent'],
+        )
+
+    def plans(self, role, **params):
+        """The plan of a page read from each scope, as the list view runs it."""
+        filters = TicketFilterSerializer(data={key: str(value) for key, value in params.items()})
+        filters.is_valid(raise_exception=True)
+        tickets = filters.filter_queryset(visible_tickets(self.users[role]))
+        return [
+            tickets.filter(scope).order_by(*filters.get_ordering())[:51].explain()
+            for scope in ticket_scopes(self.users[role])
+        ]
+
+    def assertNoFullScan(self, role, **params):
+        for plan in self.plans(role, **params):
+            self.assertIsNone(self.full_scan.search(plan), f"{role} {params} scans the ticket table:\n{plan}")
+            self.assertNotIn('USE TEMP B-TREE', plan, f"{role} {params} sorts the tickets:\n{plan}")
+
+    def test_role_scopes(self):
+        for role in ('agent', 'user'):
+            with self.subTest(role=role):
+                self.assertNoFullScan(role)
+        # Nothing narrows an admin's unfiltered list, so its page is the first rows of an ordered index walk.
+        for ordering in TICKET_ORDERINGS:
+            [plan] = self.plans('admin', ordering=ordering)
+            with self.subTest(ordering=ordering):
+                self.assertRegex(plan, r'^\d+ \d+ \d+ SCAN tickets_ticket( USING INDEX \w+)?$')
+
+    def test_single_filters(self):
+        for params in (
+            {'status': self.status.pk},
+            {'priority': self.priority.pk},
+            {'category': self.category.pk},
+            {'assigned_to': self.users['agent'].pk},
+            {'created_by': self.users['user'].pk},
+            {'unassigned': True},
+            {'is_closed': False},
+            {'created_after': '2025-01-01T00:00:00Z', 'ordering': '-created_at'},
+            {'updated_after': '2025-01-01T00:00:00Z'},
+        ):
+            with self.subTest(params=params):
+                self.assertNoFullScan('admin', **params)
+
+    def test_agent_scopes_read_in_index_order(self):
+        # Each half of the agent's scope is one index range: no temporary sort, whatever the ordering.
+        for ordering in ('-updated_at', 'created_at'):
+            filters = TicketFilterSerializer(data={'ordering': ordering})
+            filters.is_valid(raise_exception=True)
+            for scope in ticket_scopes(self.users['agent']):
+                tickets = visible_tickets(self.users['agent']).filter(scope)
+                plan = tickets.order_by(*filters.get_ordering())[:51].explain()
+                with self.subTest(ordering=ordering, scope=scope):
+                    self.assertNotIn('TEMP B-TREE', plan)
+                    self.assertIsNone(self.full_scan.search(plan), plan)
+
+    def test_my_open_tickets(self):
+        for role in ('agent', 'user'):
+            with self.subTest(role=role):
+                self.assertNoFullScan(role, is_closed=False, priority=self.priority.pk)
+                self.assertNoFullScan(role, status=self.status.pk, ordering='created_at')
+
+
+class TicketEndpointQueryScalingTests(TicketFixturesMixin, QueryScalingTestMixin, TestCase):
+    """List endpoints must not run a query per returned row (N+1)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        cls.ticket = cls.add_tickets(1)[0]
+
+    @classmethod
+    def add_tickets(cls, count):
+        # Fresh assignees per ticket, so a missing select_related shows up as extra queries.
+        tickets = []
+        for _ in range(count):
+            number = Ticket.objects.count()
+            agent = cls.create_user(f'agent{number}', 'agent')
+            ticket = Ticket.objects.create(
+                title=f'Printer {number}', description='Printer jammed', status=cls.status, priority=cls.priority,
+                category=cls.category, created_by=cls.users['user'], assigned_to=agent,
+            )
+            TicketComment.objects.create(ticket=ticket, user=agent, content='Looking', is_public=True)
+            tickets.append(ticket)
+        return tickets
+
+    def add_comments(self, count):
+        for _ in range(count):
+            number = User.objects.count()
+            author = User.objects.create_user(f'author{number}', f'author{number}@example.com', 'password')
+            TicketComment.objects.create(ticket=self.ticket, user=author, content='Same here', is_public=True)
+
+    def assertGetDoesNotScale(self, url, grow, role='admin'):
+        client = APIClient()
+        client.force_authenticate(self.users[role])
+        self.assertQueriesDoNotScale(lambda: client.get(url), grow, label=f'{role} GET {url}')
+
+    def test_ticket_lists(self):
+        expand = ','.join(TICKET_EXPANDABLE_FIELDS)
+        for role, url in (
+            ('admin', '/api/tickets/'),
+            ('admin', f'/api/tickets/?expand={expand}'),
+            ('user', f'/api/tickets/?expand={expand}'),
+            ('admin', '/api/tickets/search/?q=printer'),
+            ('admin', '/api/tickets/export/?format=csv'),
+            ('admin', '/api/tickets/changes/'),
+        ):
+            with self.subTest(role=role, url=url):
+                self.assertGetDoesNotScale(url, lambda: self.add_tickets(4), role)
+
+    def test_comment_threads(self):
+        for url in (
+            f'/api/tickets/{self.ticket.pk}/',
+            f'/api/tickets/{self.ticket.pk}/?expand=comments',
+            f'/api/tickets/{self.ticket.pk}/comments/',
+            f'/api/tickets/{self.ticket.pk}/comments/?expand=ticket,user',
+        ):
+            with self.subTest(url=url):
+                self.assertGetDoesNotScale(url, lambda: self.add_comments(4))
+
+
+class FastReadSerializerTests(TicketFixturesMixin, TestCase):
+    """The `.values()` read path must produce exactly the bytes of the serializers and JSONRenderer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users(first_name='Zoë')
+        cls.create_lookups()
+        common = {'status': cls.status, 'priority': cls.priority, 'category': cls.category}
+        cls.ticket = Ticket.objects.create(
+            title='Drucker \u2028 kaputt 🖨', description='"quoted"\n\ttab \x01', created_by=cls.users['user'],
+            assigned_to=cls.users['agent'], **common,
+        )
+        Ticket.objects.create(title='Unassigned', description='', created_by=cls.users['user'], **common)
+        Ticket.objects.create(title='Orphan', description='', created_by=None, **common)
+        TicketComment.objects.create(ticket=cls.ticket, user=cls.users['agent'], content='Public', is_public=True)
+        TicketComment.objects.create(ticket=cls.ticket, user=cls.users['agent'], content='Internal \u2029')
+        TicketComment.objects.create(ticket=cls.ticket, user=None, content='Author deleted', is_public=True)
+
+    def fetch(self, role, url):
+        client = APIClient()
+        client.force_authenticate(self.users[role])
+        fast = client.get(url)
+        with override_settings(FAST_READ_SERIALIZERS=False), mock.patch('tickets.renderers.orjson', None):
+            slow = client.get(url)
+        self.assertEqual(fast.status_code, 200, fast.content)
+        return fast.content, slow.content
+
+    def test_ticket_list(self):
+        for role in ('admin', 'agent', 'user'):
+            for size in range(len(TICKET_RELATED_FIELDS) + 1):
+                for expand in itertools.combinations(TICKET_RELATED_FIELDS, size):
+                    url = f"/api/tickets/?expand={','.join(expand)}&page_size=2"
+                    with self.subTest(role=role, url=url):
+                        fast, slow = self.fetch(role, url)
+                        self.assertEqual(fast, slow)
+
+    def test_comment_list(self):
+        for role in ('admin', 'agent', 'user'):
+            for size in range(len(COMMENT_EXPANDABLE_FIELDS) + 1):
+                for expand in itertools.combinations(COMMENT_EXPANDABLE_FIELDS, size):
+                    url = f"/api/tickets/{self.ticket.pk}/comments/?expand={','.join(expand)}"
+                    with self.subTest(role=role, url=url):
+                        fast, slow = self.fetch(role, url)
+                        self.assertEqual(fast, slow)
+
+    def test_cursor_pages(self):
+        fast, slow = self.fetch('admin', '/api/tickets/?page_size=1&ordering=created_at')
+        self.assertEqual(fast, slow)
+        next_url = json.loads(fast)['next']
+        self.assertEqual(*self.fetch('admin', next_url))
+
+
+class KeysetPaginationTests(TicketFixturesMixin, TestCase):
+    """Cursors walk the whole list in both directions and reject anything they did not encode."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        for number in range(5):
+            Ticket.objects.create(
+                title=f'Ticket {number}', description='', status=cls.status, priority=cls.priority,
+                category=cls.category, created_by=cls.users['user'],
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.users['admin'])
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            page = self.client.get(url).json()
+            pages.append([ticket['id'] for ticket in page['results']])
+            url = page[link]
+        return pages
+
+    def test_round_trip(self):
+        for ordering in TICKET_ORDERINGS:
+            expected = list(Ticket.objects.order_by(*TICKET_ORDERINGS[ordering]).values_list('id', flat=True))
+            with self.subTest(ordering=ordering):
+                forward = self.walk(f'/api/tickets/?ordering={ordering}&page_size=2', 'next')
+                self.assertEqual(forward, [expected[:2], expected[2:4], expected[4:]])
+                last = self.client.get(f'/api/tickets/?ordering={ordering}&page_size=2').json()['next']
+                last = self.client.get(last).json()['next']
+                self.assertEqual(self.walk(last, 'previous'), forward[::-1])
+
+    def test_invalid_cursors(self):
+        def cursor(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+        for value in ('not base64!', cursor([]), cursor({'p': [1]}), cursor({'p': ['yesterday', 1]}), cursor({'p': [None, 'x']})):
+            with self.subTest(cursor=value):
+                response = self.client.get('/api/tickets/', {'cursor': value})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+
+class ConditionalRequestTests(TicketFixturesMixin, TestCase):
+    """Reads answer a matching If-None-Match with 304 until the resource changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        cls.ticket = Ticket.objects.create(
+            title='Printer', description='Jammed', status=cls.status, priority=cls.priority,
+            category=cls.category, created_by=cls.users['user'],
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.users['admin'])
+
+    def assertRevalidates(self, url, change):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_lookups(self):
+        def create_status():
+            response = self.client.post('/api/statuses/', {'name': 'Waiting', 'description': 'On the requester', 'color': 'blue'}, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+
+        def rename_priority():
+            response = self.client.put(url, {'name': 'Urgent', 'description': 'Act now', 'color': 'red'}, format='json')
+            self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertRevalidates('/api/statuses/', create_status)
+        url = f'/api/priorities/{self.priority.pk}/'
+        self.assertRevalidates(url, rename_priority)
+
+    def test_ticket_detail(self):
+        def rename():
+            self.ticket.title = 'Scanner'
+            self.ticket.save()
+
+        def rename_keeping_updated_at():
+            self.ticket.title = 'Plotter'
+            self.ticket.save(update_fields=['title'])
+
+        url = f'/api/tickets/{self.ticket.pk}/'
+        self.assertRevalidates(url, rename)
+        self.assertRevalidates(url, rename_keeping_updated_at)
+        self.assertNotEqual(self.client.get(url + '?expand=status')['ETag'], self.client.get(url)['ETag'])
+
+
+class CommentThreadTests(TicketFixturesMixin, TestCase):
+    """Comment endpoints stay within their ticket, and end users only get public comments."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        common = {'status': cls.status, 'priority': cls.priority, 'category': cls.category, 'created_by': cls.users['user']}
+        cls.ticket = Ticket.objects.create(title='Printer', description='', **common)
+        cls.sibling = Ticket.objects.create(title='Scanner', description='', **common)
+        cls.public = TicketComment.objects.create(ticket=cls.ticket, user=cls.users['agent'], content='Public', is_public=True)
+        cls.private = TicketComment.objects.create(ticket=cls.ticket, user=cls.users['agent'], content='Internal')
+        cls.elsewhere = TicketComment.objects.create(ticket=cls.sibling, user=cls.users['agent'], content='Other', is_public=True)
+
+    def get(self, role, url):
+        client = APIClient()
+        client.force_authenticate(self.users[role])
+        return client.get(url)
+
+    def thread(self, role, ticket):
+        response = self.get(role, f'/api/tickets/{ticket.pk}/comments/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [comment['id'] for comment in response.json()['results']]
+
+    def test_threads(self):
+        self.assertEqual(self.thread('agent', self.ticket), [self.public.pk, self.private.pk])
+        self.assertEqual(self.thread('agent', self.sibling), [self.elsewhere.pk])
+        self.assertEqual(self.thread('user', self.ticket), [self.public.pk])
+
+    def test_details(self):
+        for role, ticket, comment, status_code in (
+            ('agent', self.ticket, self.private, 200),
+            ('agent', self.sibling, self.public, 404),
+            ('user', self.ticket, self.public, 200),
+            ('user', self.ticket, self.private, 404),
+        ):
+            with self.subTest(role=role, ticket=ticket.pk, comment=comment.pk):
+                response = self.get(role, f'/api/tickets/{ticket.pk}/comments/{comment.pk}/')
+                self.assertEqual(response.status_code, status_code)
+
+    def test_tickets_out_of_scope(self):
+        other = self.create_user('other')
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertEqual(client.get(f'/api/tickets/{self.ticket.pk}/comments/').status_code, 404)
+        self.assertEqual(client.get(f'/api/tickets/{self.ticket.pk}/comments/{self.public.pk}/').status_code, 404)
+        self.assertEqual(client.post(f'/api/tickets/{self.ticket.pk}/comments/', {'content': 'Hi'}, format='json').status_code, 404)
+
+    def test_end_user_comments_are_public(self):
+        client = APIClient()
+        client.force_authenticate(self.users['user'])
+        response = client.post(f'/api/tickets/{self.ticket.pk}/comments/', {'content': 'Any news?', 'is_public': False}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(TicketComment.objects.get(content='Any news?').is_public)
+
+    def test_end_users_only_change_their_own_comments(self):
+        own = TicketComment.objects.create(ticket=self.ticket, user=self.users['user'], content='Any news?', is_public=True)
+        client = APIClient()
+        client.force_authenticate(self.users['user'])
+        url = f'/api/tickets/{self.ticket.pk}/comments/'
+        hide = {'content': 'Nothing to see', 'is_public': False}
+        self.assertEqual(client.put(f'{url}{self.public.pk}/', hide, format='json').status_code, 403)
+        self.assertEqual(client.delete(f'{url}{self.public.pk}/').status_code, 403)
+        self.assertEqual(TicketComment.objects.get(pk=self.public.pk).content, 'Public')
+        self.assertTrue(TicketComment.objects.get(pk=self.public.pk).is_public)
+
+        response = client.put(f'{url}{own.pk}/', hide, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['content'], response.json()['is_public']), ('Nothing to see', True))
+        self.assertEqual(client.delete(f'{url}{own.pk}/').status_code, 204)
+
+        agent = APIClient()
+        agent.force_authenticate(self.users['agent'])
+        response = agent.put(f'{url}{self.public.pk}/', {'content': 'Internal now', 'is_public': False}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse(TicketComment.objects.get(pk=self.public.pk).is_public)
+
+
+class TicketBulkTests(TicketFixturesMixin, TestCase):
+    """A bulk batch is validated item by item and written all or nothing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        cls.other_agent = cls.create_user('other', 'agent')
+        cls.common = {'status': cls.status, 'priority': cls.priority, 'category': cls.category}
+        cls.own = Ticket.objects.create(title='Own', description='', created_by=cls.users['user'], assigned_to=cls.users['agent'], **cls.common)
+        cls.foreign = Ticket.objects.create(title='Foreign', description='', created_by=cls.users['admin'], assigned_to=cls.other_agent, **cls.common)
+
+    def post(self, role, items):
+        client = APIClient()
+        client.force_authenticate(self.users[role])
+        return client.post('/api/tickets/bulk/', items, format='json')
+
+    def create_item(self, **fields):
+        return {'op': 'create', 'title': 'New', 'description': 'Broken', 'status': self.status.pk,
+                'priority': self.priority.pk, 'category': self.category.pk, **fields}
+
+    def test_tickets_outside_the_scope_are_not_found(self):
+        for role in ('user', 'agent'):
+            with self.subTest(role=role):
+                response = self.post(role, [
+                    {'op': 'update', 'id': self.own.pk, 'title': 'Mine'},
+                    {'op': 'update', 'id': self.foreign.pk, 'title': 'Taken over'},
+                ])
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), [{}, {'id': ['Ticket not found.']}])
+        self.assertEqual(set(Ticket.objects.values_list('title', flat=True)), {'Own', 'Foreign'})
+        self.assertEqual(self.post('admin', [{'op': 'update', 'id': self.foreign.pk, 'title': 'Checked'}]).status_code, 200)
+
+    def test_errors_are_reported_per_item(self):
+        response = self.post('agent', [
+            self.create_item(),
+            {'op': 'create', 'id': self.own.pk, 'title': 'New'},
+            {'op': 'transition', 'id': self.own.pk, 'status': self.closed.pk, 'title': 'Renamed'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [
+            {},
+            {**dict.fromkeys(['description', 'status', 'priority', 'category'], ['This field is required.']),
+             'id': ['Not allowed when creating a ticket.']},
+            {'title': ['Only status can change in a transition.']},
+        ])
+
+        response = self.post('agent', [self.create_item(status=0), self.create_item(), self.create_item(assigned_to=0)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [
+            {'status': ['Invalid pk "0" - object does not exist.']},
+            {},
+            {'assigned_to': ['Invalid pk "0" - object does not exist.']},
+        ])
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_batch_size_is_limited(self):
+        response = self.post('admin', [self.create_item()] * (MAX_BATCH_SIZE + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': [f"A batch may contain at most {MAX_BATCH_SIZE} items."]})
+        self.assertEqual(self.post('admin', []).status_code, 400)
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_items_only_write_their_own_fields(self):
+        items = [{'op': 'update', 'id': self.own.pk, 'title': 'Renamed'},
+                 {'op': 'transition', 'id': self.foreign.pk, 'status': self.closed.pk}]
+        errors, tickets = check_references(items, self.users['admin'])
+        self.assertFalse(any(errors))
+        Ticket.objects.filter(pk=self.foreign.pk).update(title='Edited meanwhile')
+        with mock.patch.object(Ticket.objects, 'bulk_update', wraps=Ticket.objects.bulk_update) as bulk_update:
+            apply_operations(items, tickets, self.users['admin'])
+        self.assertEqual(len(bulk_update.call_args_list), 2)
+        foreign = Ticket.objects.get(pk=self.foreign.pk)
+        self.assertEqual((foreign.title, foreign.status), ('Edited meanwhile', self.closed))
+        self.assertEqual(Ticket.objects.get(pk=self.own.pk).title, 'Renamed')
+
+    def test_failed_write_rolls_back_the_batch(self):
+        items = [self.create_item(), {'op': 'transition', 'id': self.own.pk, 'status': self.closed.pk}]
+        errors, tickets = check_references(items, self.users['admin'])
+        self.assertFalse(any(errors))
+        last_seq = ChangeSequence.objects.get().value
+        with mock.patch.object(Ticket.objects, 'bulk_update', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            apply_operations(items, tickets, self.users['admin'])
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(Ticket.objects.get(pk=self.own.pk).status, self.status)
+        self.assertEqual(ChangeSequence.objects.get().value, last_seq)
+
+
+class TicketChangesTests(TicketFixturesMixin, TestCase):
+    """The changes feed resumes from a watermark and only reports what each role may see."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        common = {'status': cls.status, 'priority': cls.priority, 'category': cls.category}
+        cls.own = Ticket.objects.create(title='Own', description='', created_by=cls.users['user'], assigned_to=cls.users['agent'], **common)
+        cls.other = Ticket.objects.create(title='Other', description='', created_by=cls.users['admin'], **common)
+
+    def get(self, role, **params):
+        client = APIClient()
+        client.force_authenticate(self.users[role])
+        return client.get('/api/tickets/changes/', params)
+
+    def sync(self, role, since='', limit=None):
+        """Follow `has_more` to the end; returns the pages and the final watermark."""
+        pages = []
+        while True:
+            params = {'since': since, **({'limit': limit} if limit else {})}
+            page = self.get(role, **params).json()
+            pages.append(page)
+            since = page['since']
+            if not page['has_more']:
+                return pages, since
+
+    def test_watermarks(self):
+        self.assertEqual(decode_watermark(encode_watermark(42)), 42)
+        self.assertEqual(decode_watermark(''), 0)
+        for token in ('not base64!', encode_watermark(-1), encode_watermark('1'), 'W10=', 'e30='):
+            with self.subTest(token=token):
+                self.assertRaises(ValueError, decode_watermark, token)
+                self.assertEqual(self.get('admin', since=token).status_code, 400)
+        self.assertEqual(self.get('admin', since=encode_watermark(ChangeSequence.current()[0] + 1)).status_code, 410)
+
+    def test_deletions_per_role(self):
+        public = TicketComment.objects.create(ticket=self.own, user=self.users['agent'], content='Public', is_public=True)
+        private = TicketComment.objects.create(ticket=self.own, user=self.users['agent'], content='Internal')
+        _, since = self.sync('admin')
+        public_id, private_id, other_id = public.pk, private.pk, self.other.pk
+        public.delete()
+        private.delete()
+        self.other.delete()
+        for role, tickets, comments in (
+            ('admin', [other_id], [public_id, private_id]),
+            ('agent', [other_id], [public_id, private_id]),
+            ('user', [], [public_id]),
+        ):
+            with self.subTest(role=role):
+                self.assertEqual(self.get(role, since=since).json()['deleted'], {'tickets': tickets, 'comments': comments})
+
+    def test_scope_exits(self):
+        other_agent = self.create_user('other', 'agent')
+        comment = TicketComment.objects.create(ticket=self.own, user=self.users['agent'], content='Public', is_public=True)
+        since = {role: self.sync(role)[1] for role in ('admin', 'agent', 'user')}
+        ticket = Ticket.objects.get(pk=self.own.pk)
+        ticket.assigned_to = other_agent
+        ticket.save()
+        comment.is_public = False
+        comment.save()
+        for role, tickets, comments in (
+            ('admin', [], []),
+            ('agent', [self.own.pk], []),
+            ('user', [], [comment.pk]),
+        ):
+            with self.subTest(role=role):
+                self.assertEqual(self.get(role, since=since[role]).json()['deleted'], {'tickets': tickets, 'comments': comments})
+
+        # Back in the agent's scope: the ticket is sent again and its exit no longer is.
+        client = APIClient()
+        client.force_authenticate(self.users['admin'])
+        response = client.post('/api/tickets/bulk/', [{'op': 'update', 'id': self.own.pk, 'assigned_to': self.users['agent'].pk}], format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        page = self.get('agent', since=since['agent']).json()
+        self.assertEqual(([ticket['id'] for ticket in page['tickets']], page['deleted']['tickets']), ([self.own.pk], []))
+        client.post('/api/tickets/bulk/', [{'op': 'update', 'id': self.own.pk, 'assigned_to': other_agent.pk}], format='json')
+        self.assertEqual(self.get('agent', since=page['since']).json()['deleted']['tickets'], [self.own.pk])
+
+    def test_pruned_watermarks_expire(self):
+        _, since = self.sync('admin')
+        self.other.delete()
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=91)):
+            call_command('prune_ticket_tombstones', stdout=io.StringIO())
+        self.assertEqual(self.get('admin', since=since).status_code, 410)
+        pages, _ = self.sync('admin')
+        self.assertEqual([ticket['id'] for ticket in pages[0]['tickets']], [self.own.pk])
+
+    def test_pages_continue_until_caught_up(self):
+        for number in range(4):
+            TicketComment.objects.create(ticket=self.own, user=self.users['agent'], content=f'Comment {number}', is_public=True)
+        with mock.patch('tickets.views.MAX_CHANGES', 2):
+            pages, since = self.sync('admin')
+        self.assertEqual([len(page['tickets']) + len(page['comments']) for page in pages], [2, 2, 2])
+        self.assertCountEqual([ticket['id'] for page in pages for ticket in page['tickets']], [self.own.pk, self.other.pk])
+        self.assertEqual(decode_watermark(since), ChangeSequence.current()[0])
+        self.assertEqual(self.sync('admin', since, limit=5), ([{
+            'tickets': [], 'comments': [], 'deleted': {'tickets': [], 'comments': []}, 'since': since, 'has_more': False,
+        }], since))
+
+
+class ReferenceRegistryTests(TicketFixturesMixin, TestCase):
+    """Lookup registries reload on the first lookup after a save, a delete or a cache clear."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+
+    def setUp(self):
+        # A rolled back test leaves the registries holding its writes under the current version.
+        cache.clear()
+
+    def test_writes_bump_the_version(self):
+        for model, row in ((Status, self.status), (Priority, self.priority), (Category, self.category)):
+            with self.subTest(model=model.__name__):
+                registry = reference(model)
+                self.assertEqual(registry.get(row.pk).name, row.name)
+                with self.assertNumQueries(0):
+                    registry.get(row.pk)
+                token = model_version(model)[0]
+                model.objects.filter(pk=row.pk).update(name='Renamed')
+                self.assertEqual(registry.get(row.pk).name, row.name)
+
+                row.name = 'Saved'
+                row.save()
+                self.assertNotEqual(model_version(model)[0], token)
+                self.assertEqual(registry.get(row.pk).name, 'Saved')
+
+                token = model_version(model)[0]
+                model.objects.get(pk=row.pk).delete()
+                self.assertNotEqual(model_version(model)[0], token)
+                self.assertIsNone(registry.get(row.pk))
+                self.assertNotIn(row.pk, registry.ids())
+
+    def test_cache_clear_reloads(self):
+        registry = reference(Status)
+        self.assertFalse(registry.get(self.status.pk).is_closed)
+        Status.objects.filter(pk=self.status.pk).update(is_closed=True)
+        cache.clear()
+        self.assertTrue(registry.get(self.status.pk).is_closed)
+        self.assertIn(self.status.pk, registry.ids(is_closed=True))
+
+    def test_deleted_rows_fail_validation(self):
+        client = APIClient()
+        client.force_authenticate(self.users['admin'])
+        data = {'title': 'Down', 'description': 'Down', 'status': self.status.pk, 'priority': self.priority.pk, 'category': self.category.pk}
+        self.assertEqual(client.post('/api/tickets/', data, format='json').status_code, 201)
+        Status.objects.get(pk=self.status.pk).delete()
+        response = client.post('/api/tickets/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'status': [f'Invalid pk "{self.status.pk}" - object does not exist.']})
+
+
+class TicketExportTests(TicketFixturesMixin, TestCase):
+    """Exports hold what each role may read, in the serializers' columns and formats."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        cls.other_agent = cls.create_user('other', 'agent')
+        common = {'status': cls.status, 'priority': cls.priority, 'category': cls.category}
+        cls.own = Ticket.objects.create(title='=HYPERLINK("http://example.com")', description='-1+1', created_by=cls.users['user'], assigned_to=cls.users['agent'], **common)
+        cls.queued = Ticket.objects.create(title='Queued', description='', created_by=cls.users['admin'], **common)
+        cls.foreign = Ticket.objects.create(title='Foreign', description='', created_by=cls.users['admin'], assigned_to=cls.other_agent, **common)
+        cls.public = TicketComment.objects.create(ticket=cls.own, user=cls.users['agent'], content='@everyone', is_public=True)
+        cls.private = TicketComment.objects.create(ticket=cls.own, user=cls.users['agent'], content='Internal')
+        cls.elsewhere = TicketComment.objects.create(ticket=cls.foreign, user=cls.other_agent, content='Other', is_public=True)
+
+    def client_for(self, role):
+        client = APIClient()
+        client.force_authenticate(self.users[role])
+        return client
+
+    def export(self, role, resource, export_format):
+        response = self.client_for(role).get('/api/tickets/export/', {'resource': resource, 'format': export_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def detail(self, role, resource, obj):
+        url = f'/api/tickets/{obj.pk}/' if resource == 'tickets' else f'/api/tickets/{obj.ticket_id}/comments/{obj.pk}/'
+        return self.client_for(role).get(url).json()
+
+    def test_rows_match_the_serializers(self):
+        for role, resource, visible in (
+            ('admin', 'tickets', [self.own, self.queued, self.foreign]),
+            ('agent', 'tickets', [self.own, self.queued]),
+            ('user', 'tickets', [self.own]),
+            ('admin', 'comments', [self.public, self.private, self.elsewhere]),
+            ('agent', 'comments', [self.public, self.private]),
+            ('user', 'comments', [self.public]),
+        ):
+            with self.subTest(role=role, resource=resource):
+                expected = [self.detail(role, resource, obj) for obj in visible]
+                rows = [json.loads(line) for line in self.export(role, resource, 'ndjson').splitlines()]
+                self.assertEqual(rows, expected)
+                self.assertEqual([list(row) for row in rows], [list(item) for item in expected])
+
+                header, *lines = csv.reader(io.StringIO(self.export(role, resource, 'csv')))
+                self.assertEqual(header, list(expected[0]))
+                self.assertEqual(lines, [[self.csv_cell(value) for value in item.values()] for item in expected])
+
+    @staticmethod
+    def csv_cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+            return "'" + value
+        return str(value)
+
+    def test_csv_cells_are_not_formulas(self):
+        _, row = csv.reader(io.StringIO(self.export('user', 'tickets', 'csv')))
+        self.assertIn("'=HYPERLINK(\"http://example.com\")", row)
+        self.assertIn("'-1+1", row)
+        self.assertIn(str(self.own.pk), row)
+
+
+class TicketStreamTests(TicketFixturesMixin, TestCase):
+    """WSGI clients get the events already waiting instead of holding a worker for the whole stream."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+
+    def stream(self, role, since=None, **headers):
+        client = APIClient()
+        client.force_authenticate(self.users[role])
+        response = client.get('/api/tickets/stream/', {'since': since} if since else {}, **headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_wsgi_stream_returns_waiting_events(self):
+        since = events.get_backend().latest_id()
+        events.publish('ticket.updated', {'id': 1, 'assigned_to': self.users['agent'].pk}, self.users['user'].pk, None)
+        events.publish('ticket.updated', {'id': 2}, self.users['admin'].pk, None)
+        original_read = events.TicketEventStream.read
+        with mock.patch.object(events.TicketEventStream, 'max_duration', 0), \
+                mock.patch.object(events.TicketEventStream, 'read', autospec=True, side_effect=original_read) as read:
+            body = self.stream('user', since)
+        self.assertEqual([call.args[1] for call in read.call_args_list], [0])
+        self.assertTrue(body.startswith(f'retry: 3000\nid: {since}\n\n'))
+        self.assertEqual(re.findall(r'^data: (.*)$', body, re.M), ['{"id": 1}'])
+
+    def test_reconnect_without_position_resumes(self):
+        first = self.stream('user')
+        [position] = re.findall(r'^id: (.*)$', first, re.M)
+        self.assertEqual(position, events.get_backend().latest_id())
+        events.publish('ticket.created', {'id': 1}, self.users['user'].pk, None)
+        body = self.stream('user', HTTP_LAST_EVENT_ID=position)
+        self.assertEqual(re.findall(r'^event: (.*)$', body, re.M), ['ticket.created'])
+        self.assertEqual(re.findall(r'^id: (.*)$', body, re.M)[-1], events.get_backend().latest_id())
+
+    @override_settings(TICKET_EVENTS={**settings.TICKET_EVENTS, 'HOLD_WSGI_STREAMS': True})
+    def test_held_stream_runs_until_max_duration(self):
+        since = events.get_backend().latest_id()
+        with mock.patch.object(events.TicketEventStream, 'max_duration', 0):
+            self.assertEqual(self.stream('user', since), f'retry: 3000\nid: {since}\n\n')
+
+    async def test_async_stream_reads_off_the_event_loop(self):
+        since = await sync_to_async(events.get_backend().latest_id)()
+        events.publish('ticket.created', {'id': 1}, self.users['user'].pk, None)
+        stream = await sync_to_async(events.TicketEventStream)(self.users['user'], since)
+        loop_thread = threading.get_ident()
+        threads = []
+        original_read = events.TicketEventStream.read
+
+        def read(stream, timeout):
+            threads.append(threading.get_ident())
+            return original_read(stream, timeout)
+        with mock.patch.object(events.TicketEventStream, 'max_duration', 0.01), \
+                mock.patch.object(events.TicketEventStream, 'poll_interval', 0.01), \
+                mock.patch.object(events.TicketEventStream, 'read', read):
+            frames = [frame async for frame in stream.stream_async()]
+        self.assertIn('event: ticket.created', ''.join(frames))
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+
+class AsyncTicketViewTests(TicketFixturesMixin, TestCase):
+    """The async ticket views return what the sync ones do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_role_users()
+        cls.create_lookups()
+        common = {'description': '', 'status': cls.status, 'priority': cls.priority, 'category': cls.category}
+        cls.tickets = [
+            Ticket.objects.create(title='Own', created_by=cls.users['user'], assigned_to=cls.users['agent'], **common),
+            Ticket.objects.create(title='Queued', created_by=cls.users['user'], **common),
+            Ticket.objects.create(title='Elsewhere', created_by=cls.users['admin'], assigned_to=cls.users['admin'], **common),
+        ]
+        cls.headers = {role: auth_headers(user) for role, user in cls.users.items()}
+
+    def requests(self):
+        for role in ('admin', 'agent', 'user'):
+            for url, params in (
+                ('/api/tickets/', {'page_size': 2}),
+                ('/api/tickets/', {'expand': 'status,created_by', 'ordering': 'created_at'}),
+                (f'/api/tickets/{self.tickets[0].pk}/', {}),
+                (f'/api/tickets/{self.tickets[2].pk}/', {'expand': 'priority'}),
+            ):
+                yield role, url, params
+
+    async def assertSameResponses(self):
+        sync = {}
+        for role, url, params in self.requests():
+            response = await sync_to_async(self.client.get)(url, params, headers=self.headers[role])
+            sync[role, url, str(params)] = (response.status_code, response.content)
+        with async_api_views():
+            self.assertIs(resolve('/api/tickets/').func.view_class, AsyncTicketListAPIView)
+            for role, url, params in self.requests():
+                with self.subTest(role=role, url=url, params=params):
+                    response = await self.async_client.get(url, params, headers=self.headers[role])
+                    self.assertEqual((response.status_code, response.content), sync[role, url, str(params)])
+
+    async def test_list_and_detail(self):
+        await self.assertSameResponses()
+
+    @override_settings(FAST_READ_SERIALIZERS=False)
+    async def test_list_and_detail_with_serializers(self):
+        await self.assertSameResponses()
+
+
+class AgentScopePaginationTests(TicketFixturesMixin, TestCase):
+    """Paging an agent's own tickets and the unassigned queue separately must not change the pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = cls.create_user('agent', 'agent')
+        other = cls.create_user('other', 'agent')
+        cls.create_lookups()
+        common = {'status': cls.status, 'priority': cls.priority, 'category': cls.category}
+        for number, assignee in enumerate([cls.agent, None, other, None, cls.agent, other, None, cls.agent, None]):
+            Ticket.objects.create(title=f'Ticket {number}', description='', assigned_to=assignee, **common)
+
+    def pages(self, url):
+        client = APIClient()
+        client.force_authenticate(self.agent)
+        ids = []
+        while url:
+            page = client.get(url).json()
+            ids.extend(ticket['id'] for ticket in page['results'])
+            url = page['next']
+        return ids
+
+    def test_pages_match_single_scope_order(self):
+        for ordering in TICKET_ORDERINGS:
+            expected = list(visible_tickets(self.agent).order_by(*TICKET_ORDERINGS[ordering]).values_list('id', flat=True))
+            with self.subTest(ordering=ordering):
+                self.assertEqual(self.pages(f'/api/tickets/?ordering={ordering}&page_size=2'), expected)
+
+    def test_previous_pages(self):
+        client = APIClient()
+        client.force_authenticate(self.agent)
+        first = client.get('/api/tickets/?page_size=2').json()
+        second = client.get(first['next']).json()
+        self.assertEqual(client.get(second['previous']).json()['results'], first['results'])
+
+
+class TicketAssignmentTests(TicketFixturesMixin, TestCase):
+    """New tickets go to the least loaded agent with the category as a skill."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user('user')
+        cls.agents = [cls.create_user(name, 'agent') for name in ('first', 'second', 'network')]
+        cls.first, cls.second, cls.network_agent = cls.agents
+        cls.create_lookups()
+        cls.network = Category.objects.create(name='Network', description='')
+        cls.printing = Category.objects.create(name='Printing', description='')
+        AgentSkill.objects.create(agent=cls.first, category=cls.category)
+        AgentSkill.objects.create(agent=cls.second, category=cls.category)
+        AgentSkill.objects.create(agent=cls.network_agent, category=cls.network)
+        for assignee, status in ((cls.first, cls.status), (cls.first, cls.status), (cls.second, cls.closed)):
+            Ticket.objects.create(
+                title='Existing', description='', status=status, priority=cls.priority,
+                category=cls.category, created_by=cls.user, assigned_to=assignee,
+            )
+
+    def setUp(self):
+        # Committed moves from earlier tests were rolled back in the database.
+        load_index.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, category, status=None, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tickets/', {
+                'title': 'New', 'description': 'Broken', 'status': (status or self.status).pk,
+                'priority': self.priority.pk, 'category': category.pk, **fields,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return Ticket.objects.get(pk=response.json()['id']).assigned_to
+
+    def assertLoadsMatchDatabase(self):
+        loads = dict.fromkeys((agent.pk for agent in self.agents), 0)
+        loads.update(
+            Ticket.objects.filter(status__is_closed=False, assigned_to__isnull=False)
+            .values_list('assigned_to').annotate(Count('id'))
+        )
+        self.assertEqual(load_index.loads(), loads)
+
+    def test_least_loaded_skilled_agent(self):
+        self.assertEqual(
+            [self.create(self.category) for _ in range(4)],
+            [self.second, self.second, self.first, self.second],
+        )
+        self.assertEqual(self.create(self.network), self.network_agent)
+        self.assertLoadsMatchDatabase()
+
+    def test_category_without_skills_goes_to_any_agent(self):
+        self.assertEqual([self.create(self.printing) for _ in range(2)], [self.second, self.network_agent])
+
+    def test_explicit_null_and_closed_tickets_stay_unassigned(self):
+        self.client.force_authenticate(self.first)
+        self.assertIsNone(self.create(self.category, assigned_to=None))
+        self.assertIsNone(self.create(self.category, status=self.closed))
+
+    def test_bulk_create_spreads_over_agents(self):
+        items = [
+            {'op': 'create', 'title': 'New', 'description': 'Broken', 'status': self.status.pk,
+             'priority': self.priority.pk, 'category': self.category.pk}
+            for _ in range(4)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tickets/bulk/', items, format='json')
+        ids = [result['id'] for result in response.json()['results']]
+        assignees = Ticket.objects.in_bulk(ids)
+        self.assertEqual([assignees[pk].assigned_to for pk in ids], [self.second, self.second, self.first, self.second])
+        self.assertLoadsMatchDatabase()
+
+    def test_loads_follow_ticket_changes(self):
+        self.create(self.category)
+        reassigned, closed = Ticket.objects.filter(assigned_to=self.first).order_by('pk')
+        with self.captureOnCommitCallbacks(execute=True):
+            reassigned.assigned_to = self.network_agent
+            reassigned.save()
+            closed.status = self.closed
+            closed.save()
+        self.assertLoadsMatchDatabase()
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.filter(assigned_to=self.second).delete()
+        self.assertLoadsMatchDatabase()
+
+
+class SlaDeadlineTests(TicketFixturesMixin, TestCase):
+    """Deadlines come from the stricter target and `due_at` always holds the next pending one."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user('user')
+        cls.agent = cls.create_user('agent', 'agent')
+        cls.create_lookups(response_minutes=60, resolution_minutes=240)
+        cls.untracked = Priority.objects.create(name='P4', description='', color='grey')
+        cls.network = Category.objects.create(name='Network', description='', resolution_minutes=120)
+
+    def create(self, priority=None, category=None):
+        return Ticket.objects.create(
+            title='Down', description='', status=self.status, priority=priority or self.priority,
+            category=category or self.network, created_by=self.user, assigned_to=self.agent,
+        )
+
+    def later(self, minutes):
+        return mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=minutes))
+
+    def test_deadlines_use_the_stricter_target(self):
+        # created_at is stamped after the deadlines are computed, within the same save.
+        ticket = self.create()
+        self.assertAlmostEqual(ticket.response_due_at, ticket.created_at + timedelta(minutes=60), delta=timedelta(seconds=1))
+        self.assertAlmostEqual(ticket.resolution_due_at, ticket.created_at + timedelta(minutes=120), delta=timedelta(seconds=1))
+        self.assertEqual(ticket.due_at, ticket.response_due_at)
+
+        ticket.priority = self.untracked
+        ticket.save()
+        self.assertIsNone(ticket.response_due_at)
+        self.assertEqual(ticket.due_at, ticket.created_at + timedelta(minutes=120))
+        ticket.category = self.category
+        ticket.save()
+        self.assertIsNone(Ticket.objects.get(pk=ticket.pk).due_at)
+
+    def test_first_response_by_someone_else(self):
+        ticket = self.create()
+        TicketComment.objects.create(ticket=ticket, user=self.user, content='Any news?')
+        self.assertIsNone(Ticket.objects.get(pk=ticket.pk).responded_at)
+        TicketComment.objects.create(ticket=ticket, user=self.agent, content='Looking')
+        ticket.refresh_from_db()
+        self.assertIsNotNone(ticket.responded_at)
+        self.assertEqual((ticket.due_at, ticket.sla_breach), (ticket.resolution_due_at, ''))
+
+        with self.later(90):
+            late = self.create()
+        with self.later(180):
+            TicketComment.objects.create(ticket=late, user=self.agent, content='Sorry')
+        late.refresh_from_db()
+        self.assertEqual((late.due_at, late.sla_breach), (late.resolution_due_at, 'response'))
+
+    def test_first_response_reads_the_current_ticket(self):
+        ticket = self.create()
+        stale = Ticket.objects.get(pk=ticket.pk)
+        TicketComment.objects.create(ticket=ticket, user=self.agent, content='Looking')
+        responded_at = Ticket.objects.get(pk=ticket.pk).responded_at
+        with self.later(180):
+            TicketComment.objects.create(ticket=stale, user=self.agent, content='Still looking')
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.responded_at, ticket.sla_breach), (responded_at, ''))
+
+    def test_sla_writes_revalidate_the_ticket(self):
+        ticket, late = self.create(), self.create()
+        client = APIClient()
+        client.force_authenticate(self.agent)
+
+        def revalidate(ticket, change):
+            url = f'/api/tickets/{ticket.pk}/'
+            etag = client.get(url)['ETag']
+            change()
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            return response.json()
+
+        responded = revalidate(ticket, lambda: TicketComment.objects.create(ticket=ticket, user=self.agent, content='Looking'))
+        self.assertIsNotNone(responded['responded_at'])
+        with self.later(90):
+            breached = revalidate(late, lambda: SlaScheduler().settle_due(timezone.now(), 500))
+        self.assertEqual(breached['sla_breach'], 'response')
+        self.assertGreater(Ticket.objects.get(pk=late.pk).updated_at, late.updated_at)
+
+    def test_closing_clears_due_at_and_records_late_resolution(self):
+        on_time, late = self.create(), self.create()
+        on_time.status = self.closed
+        on_time.save()
+        with self.later(150):
+            late.status = self.closed
+            late.save()
+        self.assertEqual((on_time.due_at, on_time.sla_breach), (None, ''))
+        self.assertEqual((late.due_at, late.sla_breach), (None, 'resolution'))
+
+    def test_bulk_operations(self):
+        client = APIClient()
+        client.force_authenticate(self.agent)
+        created = client.post('/api/tickets/bulk/', [
+            {'op': 'create', 'title': 'Down', 'description': 'Down', 'status': self.status.pk,
+             'priority': self.priority.pk, 'category': self.category.pk},
+        ], format='json').json()['results'][0]['id']
+        ticket = Ticket.objects.get(pk=created)
+        self.assertAlmostEqual(ticket.due_at, ticket.created_at + timedelta(minutes=60), delta=timedelta(seconds=1))
+        client.post('/api/tickets/bulk/', [{'op': 'transition', 'id': created, 'status': self.closed.pk}], format='json')
+        self.assertIsNone(Ticket.objects.get(pk=created).due_at)
+
+    def test_scheduler_settles_passed_deadlines_in_batches(self):
+        tickets = [self.create() for _ in range(5)]
+        tickets[0].responded_at = timezone.now()
+        tickets[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            settled = SlaScheduler().settle_due(timezone.now() + timedelta(minutes=90), batch_size=2)
+        self.assertEqual(settled, 4)
+        states = Ticket.objects.in_bulk([ticket.pk for ticket in tickets])
+        self.assertEqual(states[tickets[0].pk].sla_breach, '')
+        for ticket in tickets[1:]:
+            self.assertEqual(states[ticket.pk].sla_breach, 'response')
+            self.assertEqual(states[ticket.pk].due_at, ticket.resolution_due_at)
+
+        with self.later(150):
+            call_command('sla_scheduler', '--once', stdout=io.StringIO())
+        self.assertEqual(set(Ticket.objects.values_list('sla_breach', 'due_at')), {('resolution', None)})
+
+    def test_scheduler_keeps_deadlines_changed_since_its_read(self):
+        moved, kept = self.create(), self.create()
+        later = timezone.now() + timedelta(days=1)
+        real_settle = settle
+
+        def settle_after_a_concurrent_save(ticket, now, closed):
+            # Another request moves the first ticket's deadline after the scheduler read it.
+            Ticket.objects.filter(pk=moved.pk).update(due_at=later)
+            real_settle(ticket, now, closed)
+
+        with mock.patch('tickets.management.commands.sla_scheduler.settle', settle_after_a_concurrent_save):
+            settled = SlaScheduler().settle_due(timezone.now() + timedelta(minutes=90), batch_size=10)
+        self.assertEqual(settled, 1)
+        states = Ticket.objects.in_bulk([moved.pk, kept.pk])
+        self.assertEqual((states[moved.pk].due_at, states[moved.pk].sla_breach), (later, ''))
+        self.assertEqual((states[kept.pk].due_at, states[kept.pk].sla_breach), (kept.resolution_due_at, 'response'))
+
+
+@override_settings(TASKS={**settings.TASKS, 'EAGER': False})
+class SearchIndexQueueTests(TicketFixturesMixin, TestCase):
+    """Search entries follow ticket and comment writes once a task worker runs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user('user')
+        cls.create_lookups()
+
+    def hits(self, query):
+        return sorted((hit['type'], hit['id']) for hit in search.search(query, Ticket.objects.all(), TicketComment.objects.all()))
+
+    def run_tasks(self):
+        call_command('run_tasks', '--once', '--concurrency', '1', stdout=io.StringIO())
+
+    def test_index_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(
+                title='Printer jammed', description='Paper stuck', status=self.status,
+                priority=self.priority, category=self.category, created_by=self.user,
+            )
+            comment = TicketComment.objects.create(ticket=ticket, user=self.user, content='Toner low too')
+        self.assertEqual(self.hits('printer'), [])
+        self.run_tasks()
+        self.assertEqual(self.hits('printer'), [('ticket', ticket.pk)])
+        self.assertEqual(self.hits('toner'), [('comment', comment.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.title = 'Scanner jammed'
+            ticket.save()
+            comment.delete()
+        self.run_tasks()
+        self.assertEqual(self.hits('printer'), [])
+        self.assertEqual(self.hits('scanner'), [('ticket', ticket.pk)])
+        self.assertEqual(self.hits('toner'), [])
+
+    def test_ticket_delete_queues_one_comment_task(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(
+                title='Printer jammed', description='', status=self.status,
+                priority=self.priority, category=self.category, created_by=self.user,
+            )
+            comments = [TicketComment.objects.create(ticket=ticket, user=self.user, content=f'Toner {n}') for n in range(3)]
+        self.run_tasks()
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        [task] = Task.objects.filter(name='tickets.tasks.reindex_comments')
+        self.assertCountEqual(task.args[0], [comment.pk for comment in comments])
+        self.run_tasks()
+        self.assertEqual(self.hits('toner'), [])
+
+    def test_hits_are_escaped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(
+                title='<b>Printer</b>', description='<img src=x onerror=alert(1)> printer', status=self.status,
+                priority=self.priority, category=self.category, created_by=self.user,
+            )
+        self.run_tasks()
+        [hit] = search.search('printer', Ticket.objects.all(), TicketComment.objects.all())
+        self.assertEqual(hit['title'], '&lt;b&gt;<mark>Printer</mark>&lt;/b&gt;')
+        self.assertEqual(hit['snippet'], '&lt;img src=x onerror=alert(1)&gt; <mark>printer</mark>')
+
+
+class ReplicaRoutingTests(TicketFixturesMixin, TransactionTestCase):
+    """Safe API reads use the replica unless the user wrote recently."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = self.create_user('user')
+        self.other = self.create_user('other')
+        self.create_lookups()
+
+    def aliases(self, user, method, path, data=None):
+        """The aliases that served the request's ticket queries, and the response."""
+        client = APIClient()
+        client.force_authenticate(user)
+        used = []
+
+        def record(execute, sql, params, many, context):
+            if 'tickets_ticket' in sql:
+                used.append(context['connection'].alias)
+            return execute(sql, params, many, context)
+
+        with connections['default'].execute_wrapper(record), connections['replica'].execute_wrapper(record):
+            response = getattr(client, method)(path, data, format='json')
+        self.assertLess(response.status_code, 400, response.content)
+        return set(used), response
+
+    def test_reads_follow_writes(self):
+        self.assertEqual(self.aliases(self.user, 'get', '/api/tickets/')[0], {'replica'})
+
+        used, response = self.aliases(self.user, 'post', '/api/tickets/', {
+            'title': 'Printer', 'description': 'Jammed', 'status': self.status.pk,
+            'priority': self.priority.pk, 'category': self.category.pk,
+        })
+        self.assertEqual(used, {'default'})
+        used, response = self.aliases(self.user, 'get', '/api/tickets/')
+        self.assertEqual(used, {'default'})
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(self.aliases(self.other, 'get', '/api/tickets/')[0], {'replica'})
+
+        cache.delete(pin_key(self.user.pk))
+        self.assertEqual(self.aliases(self.user, 'get', '/api/tickets/')[0], {'replica'})
+
+    def test_reads_outside_routed_requests_use_default(self):
+        self.assertEqual(router.db_for_read(Ticket), 'default')
+        with override_settings(DATABASE_REPLICAS={'ALIASES': [], 'APPS': ['tickets'], 'STICKY_SECONDS': 10}):
+            self.assertEqual(self.aliases(self.user, 'get', '/api/tickets/')[0], {'default'})
@@ -1,10 +1,16 @@
+from django.conf import settings
 from django.urls import path
 
 from .views import (CategoryDetailAPIView, CategoryListAPIView,
                      PriorityDetailAPIView, PriorityListAPIView, 
                      StatusDetailAPIView, StatusListAPIView, 
                      TicketCommentDetailAPIView, TicketCommentListAPIView, 
-                     TicketDetailAPIView, TicketListAPIView)
+                     TicketBulkAPIView, TicketChangesAPIView, TicketDetailAPIView, TicketExportAPIView, TicketListAPIView,
+                     TicketSearchAPIView, TicketStreamAPIView)
+
+if settings.ASYNC_API_VIEWS:
+    from .async_views import AsyncTicketDetailAPIView as TicketDetailAPIView
+    from .async_views import AsyncTicketListAPIView as TicketListAPIView
 
 
 
@@ -16,6 +22,11 @@ urlpatterns = [
     path('categories/', CategoryListAPIView.as_view(), name='category-list'),
     path('categories/<int:pk>/', CategoryDetailAPIView.as_view(), name='category-detail'),
     path('tickets/', TicketListAPIView.as_view(), name='ticket-list'),
+    path('tickets/bulk/', TicketBulkAPIView.as_view(), name='ticket-bulk'),
+    path('tickets/search/', TicketSearchAPIView.as_view(), name='ticket-search'),
+    path('tickets/export/', TicketExportAPIView.as_view(), name='ticket-export'),
+    path('tickets/stream/', TicketStreamAPIView.as_view(), name='ticket-stream'),
+    path('tickets/changes/', TicketChangesAPIView.as_view(), name='ticket-changes'),
     path('tickets/<int:pk>/', TicketDetailAPIView.as_view(), name='ticket-detail'),
     path('tickets/<int:pk>/comments/', TicketCommentListAPIView.as_view(), name='ticket-comment-list'),
     path('tickets/<int:pk>/comments/<int:comment_pk>/', TicketCommentDetailAPIView.as_view(), name='ticket-comment-detail'),
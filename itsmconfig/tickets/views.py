@@ -1,27 +1,58 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework.views import APIView
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, BasePermission
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from metrics.instrumentation import serialize
+from users.principal import get_principal
+
 from .models import Status, Priority, Category, Ticket, TicketComment
+from .assignment import assign
+from .bulk import MAX_BATCH_SIZE, apply_operations, check_references
+from .changes import MAX_CHANGES, WatermarkExpired, changes_since, decode_watermark, encode_watermark
+from .conditional import model_version, not_modified, set_validators, weak_etag
+from .events import TicketEventStream
+from .exports import csv_lines, export_rows, ndjson_lines
+from .filters import TicketFilterSerializer
+from .pagination import CommentPagination, KeysetPagination
+from .querysets import (
+    COMMENT_EXPANDABLE_FIELDS,
+    TICKET_EXPANDABLE_FIELDS,
+    comment_queryset,
+    get_expand,
+    ticket_queryset,
+)
+from .reference import reference
+from .rows import row_plan
+from .renderers import CSVRenderer, EventStreamRenderer, FastJSONRenderer, NDJSONRenderer
+from .search import search
 from .serializers import (
     StatusSerializer,
     PrioritySerializer,
     CategorySerializer,
     TicketSerializer,
-    TicketCommentSerializer
+    TicketCommentSerializer,
+    TicketBulkOperationSerializer,
+    TicketChangesSerializer,
+    TicketSearchResultSerializer
 )
+from .visibility import ticket_scopes, visible_comments, visible_tickets
 
 class IsAgentOrAdminForWrite(BasePermission):
     def has_permission(self, request, view):
         if request.method in ['GET', 'HEAD', 'OPTIONS']:
             return True
-        return request.user.usermodel.role in ['agent', 'admin']
+        return get_principal(request.user).role in ['agent', 'admin']
 
 
 class BaseListCreateAPIView(APIView):
@@ -29,18 +60,26 @@ class BaseListCreateAPIView(APIView):
     model = None
     serializer_class = None
 
-    @swagger_auto_schema(operation_description="Get all items", responses={200: serializer_class(many=True)})
+    def get_validators(self):
+        token, last_modified = model_version(self.model)
+        return weak_etag(self.model._meta.model_name, 'list', token), last_modified
+
+    @swagger_auto_schema(operation_description="Get all items")
     def get(self, request):
-        items = self.model.objects.all()
+        etag, last_modified = self.get_validators()
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        items = reference(self.model).all()
         serializer = self.serializer_class(items, many=True)
-        return Response(serializer.data)
+        return set_validators(Response(serialize(serializer)), etag, last_modified)
 
     @swagger_auto_schema(operation_description="Create a new item", request_body=serializer_class, responses={201: serializer_class})
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serialize(serializer), status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -50,18 +89,23 @@ class BaseDetailAPIView(APIView):
     serializer_class = None
 
     def get_object(self, pk):
-        try:
-            return self.model.objects.get(pk=pk)
-        except self.model.DoesNotExist:
-            return None
+        return reference(self.model).get(pk)
+
+    def get_validators(self, pk):
+        token, last_modified = model_version(self.model)
+        return weak_etag(self.model._meta.model_name, pk, token), last_modified
 
     @swagger_auto_schema(operation_description="Get an item by ID", responses={200: serializer_class})
     def get(self, request, pk):
+        etag, last_modified = self.get_validators(pk)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
         item = self.get_object(pk)
         if item is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
         serializer = self.serializer_class(item)
-        return Response(serializer.data)
+        return set_validators(Response(serialize(serializer)), etag, last_modified)
 
     @swagger_auto_schema(operation_description="Update an item", request_body=serializer_class, responses={200: serializer_class})
     def put(self, request, pk):
@@ -71,7 +115,7 @@ class BaseDetailAPIView(APIView):
         serializer = self.serializer_class(item, data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return Response(serialize(serializer))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(operation_description="Delete an item", responses={204: "No content"})
@@ -110,70 +154,279 @@ class CategoryDetailAPIView(BaseDetailAPIView):
 
 class TicketListAPIView(APIView):
     permission_classes = [IsAuthenticated]
-
-    @swagger_auto_schema(operation_description="Get tickets based on user role", responses={200: TicketSerializer(many=True)})
+    pagination_class = KeysetPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    @swagger_auto_schema(
+        operation_description="Get tickets based on user role, filtered and ordered (newest update first by default), paginated by cursor",
+        query_serializer=TicketFilterSerializer,
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor from `next`/`previous`", type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Number of tickets per page", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('expand', openapi.IN_QUERY, description="Comma-separated related fields to nest: " + ', '.join(TICKET_EXPANDABLE_FIELDS), type=openapi.TYPE_STRING),
+        ],
+        responses={200: TicketSerializer(many=True)}
+    )
     def get(self, request):
-        user_role = request.user.usermodel.role
-        if user_role == 'admin':
-            tickets = Ticket.objects.all()
-        elif user_role == 'agent':
-            tickets = Ticket.objects.filter(Q(assigned_to=request.user) | Q(assigned_to__isnull=True))
-        else:
-            tickets = Ticket.objects.filter(created_by=request.user)
-        serializer = TicketSerializer(tickets, many=True)
-        return Response(serializer.data)
-
-    @swagger_auto_schema(operation_description="Create a new ticket", request_body=TicketSerializer, responses={201: TicketSerializer})
+        expand = get_expand(request, TICKET_EXPANDABLE_FIELDS)
+        tickets, ordering = self.filter_tickets(request, expand)
+        paginator = self.pagination_class()
+        paginator.ordering = ordering
+        paginator.scopes = ticket_scopes(request.user)
+        plan = row_plan(TicketSerializer, request, expand)
+        if plan is not None:
+            page = paginator.paginate_queryset(plan.values(tickets, ordering), request, view=self)
+            return paginator.get_paginated_response(plan.represent(page))
+        page = paginator.paginate_queryset(tickets, request, view=self)
+        serializer = TicketSerializer(page, many=True, context={'request': request, 'expand': expand})
+        return paginator.get_paginated_response(serialize(serializer))
+
+    def filter_tickets(self, request, expand):
+        """The visible, filtered ticket queryset and the requested ordering."""
+        filters = TicketFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        tickets = filters.filter_queryset(visible_tickets(request.user))
+        return ticket_queryset(tickets, expand, request.user), filters.get_ordering()
+
+    @swagger_auto_schema(
+        operation_description="Create a new ticket. Open tickets created without `assigned_to` go to the "
+                              "least loaded agent with the category as a skill, or any agent if nobody has it.",
+        request_body=TicketSerializer,
+        responses={201: TicketSerializer}
+    )
+    @transaction.atomic
     def post(self, request):
-        serializer = TicketSerializer(data=request.data)
+        serializer = TicketSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(created_by=request.user, created_at=timezone.now(), updated_at=timezone.now())
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            serializer.save(
+                created_by=request.user, created_at=timezone.now(), updated_at=timezone.now(),
+                **self.assignment(serializer.validated_data),
+            )
+            return Response(serialize(serializer), status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def assignment(self, data):
+        # An explicit null keeps the ticket in the unassigned queue.
+        if 'assigned_to' in data:
+            return {}
+        agent_id, = assign([(data['category'].pk, data['status'].pk)])
+        return {'assigned_to_id': agent_id}
+
+
+class TicketBulkAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Create, update and transition many tickets in one transaction. "
+                              "Each item has an `op` of create, update or transition; "
+                              "the batch is rejected with per-item errors if any item is invalid.",
+        request_body=TicketBulkOperationSerializer(many=True),
+        responses={200: "One {op, id} result per item"}
+    )
+    def post(self, request):
+        if isinstance(request.data, list) and len(request.data) > MAX_BATCH_SIZE:
+            return Response({'non_field_errors': [f"A batch may contain at most {MAX_BATCH_SIZE} items."]}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = TicketBulkOperationSerializer(data=request.data, many=True, allow_empty=False, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        items = serializer.validated_data
+        with transaction.atomic():
+            errors, tickets = check_references(items, request.user)
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            results = apply_operations(items, tickets, request.user)
+        return Response({'results': results})
+
+
+class TicketSearchAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_limit = 100
+
+    @swagger_auto_schema(
+        operation_description="Full-text search over ticket titles, descriptions and comments visible to the user. "
+                              "Titles and snippets are HTML-escaped, with matches wrapped in <mark> tags.",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Search terms", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, description=f"Maximum number of hits (default 20, max {max_limit})", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: TicketSearchResultSerializer(many=True)}
+    )
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'q': ['This parameter is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'limit': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        hits = search(query, visible_tickets(request.user), visible_comments(request.user), limit)
+        serializer = TicketSearchResultSerializer(hits, many=True)
+        return Response({'results': serialize(serializer)})
+
+
+class TicketExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    @swagger_auto_schema(
+        operation_description="Stream every ticket (or comment) visible to the user as NDJSON or CSV",
+        manual_parameters=[
+            openapi.Parameter('format', openapi.IN_QUERY, description="ndjson (default) or csv", type=openapi.TYPE_STRING),
+            openapi.Parameter('resource', openapi.IN_QUERY, description="tickets (default) or comments", type=openapi.TYPE_STRING),
+        ],
+        responses={200: "Streamed export"}
+    )
+    def get(self, request):
+        resource = request.query_params.get('resource', 'tickets')
+        if resource == 'tickets':
+            queryset = visible_tickets(request.user)
+            fields = list(TicketSerializer(context={'request': request}).fields)
+        elif resource == 'comments':
+            queryset = visible_comments(request.user)
+            fields = list(TicketCommentSerializer().fields)
+        else:
+            return Response({'resource': ["Choose from: tickets, comments."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = export_rows(queryset, fields)
+        if request.accepted_renderer.format == 'csv':
+            response = StreamingHttpResponse(csv_lines(rows, fields), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(ndjson_lines(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{resource}.{request.accepted_renderer.format}"'
+        return response
+
+
+class TicketStreamAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [EventStreamRenderer, JSONRenderer]
+
+    @swagger_auto_schema(
+        operation_description="Server-Sent Events for tickets and comments visible to the user: "
+                              "ticket.created, ticket.updated, comment.created and comment.updated. "
+                              "Resume with `since` or the Last-Event-ID header; a `reset` event means "
+                              "the position is too old and the client should refetch. Unless served over ASGI, "
+                              "the response ends after the events already waiting and the client reconnects.",
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, description="Id of the last event received", type=openapi.TYPE_STRING),
+        ],
+        responses={200: "text/event-stream"}
+    )
+    def get(self, request):
+        since = request.query_params.get('since') or request.headers.get('Last-Event-ID')
+        stream = TicketEventStream(request.user, since)
+        if isinstance(request._request, ASGIRequest):
+            content = stream.stream_async()
+        elif settings.TICKET_EVENTS['HOLD_WSGI_STREAMS']:
+            content = iter(stream)
+        else:
+            content = stream.poll()
+        response = StreamingHttpResponse(content, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class TicketChangesAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Tickets and comments created, updated or deleted since a watermark, oldest first; `deleted` also lists those the user can no longer see. "
+                              "Omit `since` for a full sync; keep calling with the returned `since` while `has_more` is true. "
+                              "410 means the watermark is too old and the client must resync from scratch.",
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, description="Opaque watermark from a previous response", type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, description=f"Maximum number of changes (default and max {MAX_CHANGES})", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: TicketChangesSerializer, 410: "Watermark expired"}
+    )
+    def get(self, request):
+        try:
+            since = decode_watermark(request.query_params.get('since'))
+        except ValueError:
+            return Response({'since': ['Invalid watermark.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', MAX_CHANGES)), 1), MAX_CHANGES)
+        except ValueError:
+            return Response({'limit': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            changes, watermark, has_more = changes_since(request.user, since, limit)
+        except WatermarkExpired:
+            return Response({'detail': 'Watermark expired; resync from scratch.'}, status=status.HTTP_410_GONE)
+
+        rows = {'ticket': [], 'comment': [], 'tombstone': []}
+        for _, kind, row in changes:
+            rows[kind].append(row)
+        return Response({
+            'tickets': serialize(TicketSerializer(rows['ticket'], many=True, context={'request': request})),
+            'comments': serialize(TicketCommentSerializer(rows['comment'], many=True)),
+            'deleted': {
+                'tickets': [row.object_id for row in rows['tombstone'] if row.kind == 'ticket'],
+                'comments': [row.object_id for row in rows['tombstone'] if row.kind == 'comment'],
+            },
+            'since': encode_watermark(watermark),
+            'has_more': has_more,
+        })
+
 
 class TicketDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get_object(self, pk, user):
+    def get_object(self, pk, user, expand=(), lock=False):
+        # Writes lock the row before its signals snapshot the loaded state.
+        tickets = visible_tickets(user).select_for_update() if lock else visible_tickets(user)
         try:
-            ticket = Ticket.objects.get(pk=pk)
-            role = user.usermodel.role
-            if role == 'admin' or \
-               (role == 'agent' and (ticket.assigned_to == user or ticket.assigned_to is None)) or \
-               (role == 'user' and ticket.created_by == user):
-                return ticket
+            return ticket_queryset(tickets, expand, user).get(pk=pk)
         except Ticket.DoesNotExist:
             return None
 
-    def handle_response(self, serializer_class, obj, request_data=None):
+    def handle_response(self, serializer_class, obj, request_data=None, context=None):
         if request_data:
-            serializer = serializer_class(obj, data=request_data)
+            serializer = serializer_class(obj, data=request_data, context=context)
         else:
-            serializer = serializer_class(obj)
+            serializer = serializer_class(obj, context=context)
         if request_data and not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         if request_data:
             serializer.save()
-        return Response(serializer.data)
-
-    @swagger_auto_schema(operation_description="Get a ticket by ID", responses={200: TicketSerializer})
+        return Response(serialize(serializer))
+
+    @swagger_auto_schema(
+        operation_description="Get a ticket by ID",
+        manual_parameters=[
+            openapi.Parameter('expand', openapi.IN_QUERY, description="Comma-separated related fields to nest: " + ', '.join(TICKET_EXPANDABLE_FIELDS), type=openapi.TYPE_STRING),
+        ],
+        responses={200: TicketSerializer}
+    )
     def get(self, request, pk):
-        ticket = self.get_object(pk, request.user)
+        expand = get_expand(request, TICKET_EXPANDABLE_FIELDS)
+        return self.ticket_response(request, self.get_object(pk, request.user, expand), expand)
+
+    def ticket_response(self, request, ticket, expand):
         if ticket is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        return self.handle_response(TicketSerializer, ticket)
+        if 'comments' in expand:
+            # Comment changes do not touch updated_at, so the ticket's validators don't cover them.
+            return self.handle_response(TicketSerializer, ticket, context={'request': request, 'expand': expand})
+        # change_seq moves on every write, including those that leave updated_at alone.
+        etag = weak_etag('ticket', ticket.pk, ticket.change_seq, get_principal(request.user).role, *sorted(expand))
+        response = not_modified(request, etag, ticket.updated_at)
+        if response is not None:
+            return response
+        response = self.handle_response(TicketSerializer, ticket, context={'request': request, 'expand': expand})
+        return set_validators(response, etag, ticket.updated_at)
 
     @swagger_auto_schema(operation_description="Update a ticket", request_body=TicketSerializer, responses={200: TicketSerializer})
+    @transaction.atomic
     def put(self, request, pk):
-        ticket = self.get_object(pk, request.user)
+        ticket = self.get_object(pk, request.user, lock=True)
         if ticket is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        return self.handle_response(TicketSerializer, ticket, request.data)
+        return self.handle_response(TicketSerializer, ticket, request.data, context={'request': request})
 
     @swagger_auto_schema(operation_description="Delete a ticket", responses={204: "No content"})
+    @transaction.atomic
     def delete(self, request, pk):
-        ticket = self.get_object(pk, request.user)
+        ticket = self.get_object(pk, request.user, lock=True)
         if ticket is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
         ticket.delete()
@@ -182,73 +435,106 @@ class TicketDetailAPIView(APIView):
 
 class TicketCommentListAPIView(APIView):
     permission_classes = [IsAuthenticated]
-
-    def get_queryset(self, request):
-        role = request.user.usermodel.role
-        if role == 'admin':
-            return TicketComment.objects.all()
-        elif role == 'agent':
-            return TicketComment.objects.filter(Q(ticket__assigned_to=request.user) | Q(ticket__assigned_to__isnull=True))
-        return TicketComment.objects.filter(ticket__created_by=request.user)
-
-    @swagger_auto_schema(operation_description="Get all ticket comments", responses={200: TicketCommentSerializer(many=True)})
-    def get(self, request):
-        comments = self.get_queryset(request)
-        serializer = TicketCommentSerializer(comments, many=True)
-        return Response(serializer.data)
-
-    @swagger_auto_schema(operation_description="Create a new ticket comment", request_body=TicketCommentSerializer, responses={201: TicketCommentSerializer})
-    def post(self, request):
+    pagination_class = CommentPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    @swagger_auto_schema(
+        operation_description="Get a ticket's comments, oldest first, paginated by cursor. End users only see public comments.",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor from `next`/`previous`", type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Number of comments per page", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('expand', openapi.IN_QUERY, description="Comma-separated related fields to nest: " + ', '.join(COMMENT_EXPANDABLE_FIELDS), type=openapi.TYPE_STRING),
+        ],
+        responses={200: TicketCommentSerializer(many=True)}
+    )
+    def get(self, request, pk):
+        expand = get_expand(request, COMMENT_EXPANDABLE_FIELDS)
+        comments = comment_queryset(visible_comments(request.user).filter(ticket_id=pk), expand)
+        paginator = self.pagination_class()
+        plan = row_plan(TicketCommentSerializer, request, expand)
+        if plan is not None:
+            comments = plan.values(comments, paginator.ordering)
+        page = paginator.paginate_queryset(comments, request, view=self)
+        # An empty page needs a second look to tell it apart from a ticket the user can't see.
+        if not page and not visible_tickets(request.user).filter(pk=pk).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        if plan is not None:
+            return paginator.get_paginated_response(plan.represent(page))
+        serializer = TicketCommentSerializer(page, many=True, context={'request': request, 'expand': expand})
+        return paginator.get_paginated_response(serialize(serializer))
+
+    @swagger_auto_schema(operation_description="Add a comment to a ticket. Comments by end users are always public.", request_body=TicketCommentSerializer, responses={201: TicketCommentSerializer})
+    def post(self, request, pk):
+        ticket = visible_tickets(request.user).filter(pk=pk).first()
+        if ticket is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
         serializer = TicketCommentSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user, created_at=timezone.now())
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            extra = {'is_public': True} if get_principal(request.user).role == 'user' else {}
+            serializer.save(ticket=ticket, user=request.user, created_at=timezone.now(), **extra)
+            return Response(serialize(serializer), status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class TicketCommentDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get_object(self, request, pk):
-        role = request.user.usermodel.role
+    def get_object(self, request, pk, comment_pk, expand=()):
+        comments = comment_queryset(visible_comments(request.user).filter(ticket_id=pk), expand)
         try:
-            if role == 'admin':
-                return TicketComment.objects.get(pk=pk)
-            elif role == 'agent':
-                return TicketComment.objects.filter(Q(ticket__assigned_to=request.user) | Q(ticket__assigned_to__isnull=True)).get(pk=pk)
-            return TicketComment.objects.get(pk=pk, ticket__created_by=request.user)
+            return comments.get(pk=comment_pk)
         except TicketComment.DoesNotExist:
             return None
 
-    def handle_response(self, serializer_class, obj, request_data=None):
+    def end_user_denied(self, request, comment):
+        """End users may only change their own comments, which stay public."""
+        if get_principal(request.user).role == 'user' and comment.user_id != request.user.id:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        return None
+
+    def handle_response(self, serializer_class, obj, request_data=None, context=None, **save_fields):
         if request_data:
-            serializer = serializer_class(obj, data=request_data)
+            serializer = serializer_class(obj, data=request_data, context=context)
         else:
-            serializer = serializer_class(obj)
+            serializer = serializer_class(obj, context=context)
         if request_data and not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         if request_data:
-            serializer.save()
-        return Response(serializer.data)
-
-    @swagger_auto_schema(operation_description="Get a ticket comment by ID", responses={200: TicketCommentSerializer})
-    def get(self, request, pk):
-        comment = self.get_object(request, pk)
+            serializer.save(**save_fields)
+        return Response(serialize(serializer))
+
+    @swagger_auto_schema(
+        operation_description="Get a ticket comment by ID",
+        manual_parameters=[
+            openapi.Parameter('expand', openapi.IN_QUERY, description="Comma-separated related fields to nest: " + ', '.join(COMMENT_EXPANDABLE_FIELDS), type=openapi.TYPE_STRING),
+        ],
+        responses={200: TicketCommentSerializer}
+    )
+    def get(self, request, pk, comment_pk):
+        expand = get_expand(request, COMMENT_EXPANDABLE_FIELDS)
+        comment = self.get_object(request, pk, comment_pk, expand)
         if comment is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        return self.handle_response(TicketCommentSerializer, comment)
+        return self.handle_response(TicketCommentSerializer, comment, context={'request': request, 'expand': expand})
 
-    @swagger_auto_schema(operation_description="Update a ticket comment", request_body=TicketCommentSerializer, responses={200: TicketCommentSerializer})
-    def put(self, request, pk):
-        comment = self.get_object(request, pk)
+    @swagger_auto_schema(operation_description="Update a ticket comment. End users can only update their own comments, which stay public.", request_body=TicketCommentSerializer, responses={200: TicketCommentSerializer})
+    def put(self, request, pk, comment_pk):
+        comment = self.get_object(request, pk, comment_pk)
         if comment is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        return self.handle_response(TicketCommentSerializer, comment, request.data)
-
-    @swagger_auto_schema(operation_description="Delete a ticket comment", responses={204: "No content"})
-    def delete(self, request, pk):
-        comment = self.get_object(request, pk)
+        denied = self.end_user_denied(request, comment)
+        if denied is not None:
+            return denied
+        extra = {'is_public': True} if get_principal(request.user).role == 'user' else {}
+        return self.handle_response(TicketCommentSerializer, comment, request.data, context={'request': request}, **extra)
+
+    @swagger_auto_schema(operation_description="Delete a ticket comment. End users can only delete their own comments.", responses={204: "No content"})
+    def delete(self, request, pk, comment_pk):
+        comment = self.get_object(request, pk, comment_pk)
         if comment is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        denied = self.end_user_denied(request, comment)
+        if denied is not None:
+            return denied
         comment.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Which tickets, comments and deletions each role may see.
+
+An agent sees their own tickets plus the unassigned queue. As a single
+`assigned_to = x OR assigned_to IS NULL` filter, that scope makes the
+database collect and sort every match before it can return a page, so
+`ticket_scopes` also describes it as two conditions that are each one
+range of the assignee indexes. Keyset pagination reads a page from each
+and merges them.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from users.principal import get_principal
+
+from .models import Ticket, TicketComment, TicketTombstone
+
+
+def ticket_scopes(user):
+    """The tickets `user` may see as disjoint conditions, each matching one index."""
+    role = get_principal(user).role
+    if role == 'admin':
+        return [Q()]
+    elif role == 'agent':
+        return [Q(assigned_to=user), Q(assigned_to__isnull=True)]
+    return [Q(created_by=user)]
+
+
+def visible_tickets(user):
+    """Tickets `user` may see: everything for admins, own and unassigned for agents, created for users."""
+    return Ticket.objects.filter(reduce(or_, ticket_scopes(user)))
+
+
+def ticket_visible_to(user, created_by_id, assigned_to_id):
+    """In-memory counterpart of `visible_tickets` for a single ticket."""
+    role = get_principal(user).role
+    if role == 'admin':
+        return True
+    elif role == 'agent':
+        return assigned_to_id == user.id or assigned_to_id is None
+    return role == 'user' and created_by_id == user.id
+
+
+def thread_comments(user):
+    """The comments `user` may read on a ticket they can see: end users only get public ones."""
+    if get_principal(user).role == 'user':
+        return TicketComment.objects.filter(is_public=True)
+    return TicketComment.objects.all()
+
+
+def visible_comments(user):
+    """Comments on the tickets `user` may see."""
+    role = get_principal(user).role
+    if role == 'admin':
+        return thread_comments(user)
+    elif role == 'agent':
+        return thread_comments(user).filter(Q(ticket__assigned_to=user) | Q(ticket__assigned_to__isnull=True))
+    return thread_comments(user).filter(ticket__created_by=user)
+
+
+def visible_tombstones(user):
+    """Deletions of tickets and comments `user` could see when they were deleted, like `visible_comments`."""
+    role = get_principal(user).role
+    if role == 'admin':
+        return TicketTombstone.objects.all()
+    elif role == 'agent':
+        return TicketTombstone.objects.filter(Q(assigned_to_id=user.id) | Q(assigned_to_id__isnull=True))
+    return TicketTombstone.objects.filter(Q(kind='ticket') | Q(is_public=True), created_by_id=user.id)
@@ -0,0 +1,18 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .principal import load_principal, principal_from_token
+
+
+class PrincipalJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that attaches a `Principal` to the user, read from the
+    role/department claims of the access token when present.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None:
+            return None
+        user, token = result
+        user.principal = principal_from_token(user.id, token) or load_principal(user.id)
+        return user, token
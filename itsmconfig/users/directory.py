@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+from rest_framework.exceptions import ValidationError
+
+from .models import UserModel
+
+DIRECTORY_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'usermodel')
+
+
+def get_fields(request, allowed):
+    """Parse `?fields=a,b` into a tuple of field names, rejecting unknown ones."""
+    value = request.query_params.get('fields', '')
+    fields = tuple(name.strip() for name in value.split(',') if name.strip())
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValidationError({'fields': [f"Unknown field '{name}'. Choose from: {', '.join(allowed)}." for name in unknown]})
+    return fields
+
+
+def starting_with(queryset, field, prefix):
+    """
+    Rows whose lower-cased `field` starts with `prefix`, as a range so the
+    expression index on LOWER(field) serves it.
+    """
+    queryset = queryset.alias(search_key=Lower(field)).filter(search_key__gte=prefix)
+    if ord(prefix[-1]) < 0x10FFFF:
+        queryset = queryset.filter(search_key__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    return queryset
+
+
+def search_users(queryset, term):
+    """
+    Users whose username, email, department or employee id starts with
+    `term`, ignoring case. Each column is searched through its own index
+    and the matching ids are combined with UNION.
+    """
+    term = term.lower()
+    matches = starting_with(User.objects.all(), 'username', term).values('pk').union(
+        starting_with(User.objects.all(), 'email', term).values('pk'),
+        starting_with(UserModel.objects.all(), 'department', term).values('user_id'),
+        starting_with(UserModel.objects.all(), 'employee_id', term).values('user_id'),
+    )
+    return queryset.filter(pk__in=matches)
+
+
+def directory_queryset(fields=()):
+    """Users shaped for `UserSerializer` limited to `fields`; the profile is only joined when it is shown."""
+    if not fields or 'usermodel' in fields:
+        return User.objects.select_related('usermodel')
+    return User.objects.all()
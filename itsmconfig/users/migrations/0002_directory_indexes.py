@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:43
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+# auth.User belongs to Django, so its search indexes are created here.
+AUTH_USER_INDEXES = [
+    models.Index(django.db.models.functions.text.Lower('username'), name='auth_user_username_lower_idx'),
+    models.Index(django.db.models.functions.text.Lower('email'), name='auth_user_email_lower_idx'),
+]
+
+
+def add_auth_user_indexes(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in AUTH_USER_INDEXES:
+        schema_editor.add_index(User, index)
+
+
+def remove_auth_user_indexes(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in AUTH_USER_INDEXES:
+        schema_editor.remove_index(User, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usermodel',
+            index=models.Index(django.db.models.functions.text.Lower('department'), name='usermodel_department_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermodel',
+            index=models.Index(django.db.models.functions.text.Lower('employee_id'), name='usermodel_employee_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermodel',
+            index=models.Index(fields=['role'], name='usermodel_role_idx'),
+        ),
+        migrations.RunPython(add_auth_user_indexes, remove_auth_user_indexes),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 # Create your models here.
 
@@ -18,7 +19,14 @@ class UserModel(models.Model):
     department = models.CharField(max_length=255)
     role = models.CharField(max_length=255, choices=ROLE_CHOICES)
     employee_id = models.CharField(max_length=255)
-    
+
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix search in the user directory.
+            models.Index(Lower('department'), name='usermodel_department_lower_idx'),
+            models.Index(Lower('employee_id'), name='usermodel_employee_lower_idx'),
+            models.Index(fields=['role'], name='usermodel_role_idx'),
+        ]
 
     def __str__(self):
           return f"{self.user.username} - {self.get_role_display()}"
\ No newline at end of file
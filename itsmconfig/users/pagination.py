@@ -0,0 +1,6 @@
+from tickets.pagination import KeysetPagination
+
+
+class UserPagination(KeysetPagination):
+    """Alphabetical by username, the order a directory is browsed in."""
+    ordering = ('username', 'id')
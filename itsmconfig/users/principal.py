@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+
+from itsmconfig.replicas import primary_reads
+
+from .models import UserModel
+
+
+class Principal:
+    """Authorization facts about the requesting user, resolved once per request."""
+    __slots__ = ('user_id', 'role', 'department')
+
+    def __init__(self, user_id, role, department):
+        self.user_id = user_id
+        self.role = role
+        self.department = department
+
+    def __repr__(self):
+        return f"Principal(user_id={self.user_id!r}, role={self.role!r}, department={self.department!r})"
+
+
+class PrincipalCache:
+    """Thread-safe LRU of principals keyed by user id."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            principal = self._data.get(user_id)
+            if principal is not None:
+                self._data.move_to_end(user_id)
+            return principal
+
+    def set(self, user_id, principal):
+        with self._lock:
+            self._data[user_id] = principal
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def load_principal(user_id):
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = fetch_principal(user_id)
+    return principal
+
+
+def fetch_principal(user_id):
+    """
+    Read the principal from the primary, skipping the cache, and cache it.
+    Other workers' caches are not invalidated by a role change, so anything
+    that outlives the request, like token claims, must come from here.
+    """
+    with primary_reads():
+        row = UserModel.objects.filter(user_id=user_id).values('role', 'department').first() or {}
+    principal = Principal(user_id, row.get('role'), row.get('department'))
+    principal_cache.set(user_id, principal)
+    return principal
+
+
+def principal_from_token(user_id, token):
+    if token is None or 'role' not in token:
+        return None
+    return Principal(user_id, token['role'], token.get('department'))
+
+
+def get_principal(user):
+    """
+    Return the principal attached to `user` by authentication, falling back to
+    the process-local cache for users authenticated some other way.
+    """
+    principal = getattr(user, 'principal', None)
+    if principal is None:
+        principal = load_principal(user.id)
+        user.principal = principal
+    return principal
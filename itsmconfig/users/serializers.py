@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth.models import User
+from .directory import search_users
 from .models import UserModel
+from .principal import fetch_principal
 
 class UserModelSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,6 +21,27 @@ class UserSerializer(serializers.ModelSerializer):
 'usermodel']
         read_only_fields = ['id']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        only = self.context.get('fields')
+        if only:
+            for name in [name for name in self.fields if name not in only]:
+                self.fields.pop(name)
+
+
+class UserDirectoryFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the user directory."""
+    search = serializers.CharField(required=False, allow_blank=True, max_length=255, help_text="Prefix of the username, email, department or employee id (case-insensitive)")
+    role = serializers.ChoiceField(choices=UserModel.ROLE_CHOICES, required=False)
+
+    def filter_queryset(self, queryset):
+        params = self.validated_data
+        if params.get('search'):
+            queryset = search_users(queryset, params['search'])
+        if 'role' in params:
+            queryset = queryset.filter(usermodel__role=params['role'])
+        return queryset
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     usermodel = UserModelSerializer()
     password = serializers.CharField(write_only=True)
@@ -35,3 +61,26 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
         UserModel.objects.create(user=user, **usermodel_data)
         return user
+
+
+def add_principal_claims(token, user_id):
+    principal = fetch_principal(user_id)
+    token['role'] = principal.role
+    token['department'] = principal.department
+    return token
+
+
+class PrincipalTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_principal_claims(super().get_token(user), user.id)
+
+
+class PrincipalTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        # Re-stamp the claims so a role change applies from the next refresh.
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user_id = User._meta.pk.to_python(access[jwt_settings.USER_ID_CLAIM])
+        data['access'] = str(add_principal_claims(access, user_id))
+        return data
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import UserModel
+from .principal import principal_cache
+
+
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def invalidate_principal(sender, instance, **kwargs):
+    principal_cache.invalidate(instance.user_id)
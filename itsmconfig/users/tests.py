@@ -1,3 +1,98 @@
+import re
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from metrics.testing import QueryScalingTestMixin
+
+from .directory import directory_queryset, search_users
+from .models import UserModel
 
 # Create your tests here.
+
+
+class UserListQueryScalingTests(QueryScalingTestMixin, TestCase):
+    """The user list must not run a query per user (N+1)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.add_users(1, role='admin')[0]
+
+    @classmethod
+    def add_users(cls, count, role='user'):
+        users = []
+        for _ in range(count):
+            number = User.objects.count()
+            user = User.objects.create_user(f'user{number}', f'user{number}@example.com', 'password')
+            UserModel.objects.create(user=user, role=role, department='IT', employee_id=f'E{number}')
+            users.append(user)
+        return users
+
+    def test_user_list(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        self.assertQueriesDoNotScale(
+            lambda: client.get('/api/users/list/'), lambda: self.add_users(4), label='GET /api/users/list/',
+        )
+
+
+class UserDirectoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for username, role, department in (
+            ('alice', 'admin', 'Finance'), ('bob', 'agent', 'IT'), ('Carol', 'agent', 'it-ops'), ('dave', 'user', 'Sales'),
+        ):
+            user = User.objects.create_user(username, f'{username}@example.com', 'password')
+            UserModel.objects.create(user=user, role=role, department=department, employee_id=f'E-{username}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='bob'))
+
+    def usernames(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [user['username'] for user in response.json()['results']]
+
+    def test_search_and_role(self):
+        self.assertEqual(self.usernames('/api/users/list/?search=IT'), ['Carol', 'bob'])
+        self.assertEqual(self.usernames('/api/users/list/?search=e-D'), ['dave'])
+        self.assertEqual(self.usernames('/api/users/list/?search=carol@'), ['Carol'])
+        self.assertEqual(self.usernames('/api/users/list/?role=agent&search=i'), ['Carol', 'bob'])
+
+    def test_fields_and_pages(self):
+        response = self.client.get('/api/users/list/?fields=id,username&page_size=3')
+        self.assertEqual(list(response.json()['results'][0]), ['id', 'username'])
+        self.assertEqual(self.usernames(response.json()['next']), ['dave'])
+        self.assertEqual(self.client.get('/api/users/list/?fields=password').status_code, 400)
+
+    def test_end_users_are_refused(self):
+        self.client.force_authenticate(User.objects.get(username='dave'))
+        self.assertEqual(self.client.get('/api/users/list/').status_code, 403)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "query plans are asserted in SQLite's EXPLAIN format")
+    def test_search_uses_indexes(self):
+        plan = search_users(directory_queryset(), 'it').order_by('username', 'id')[:51].explain()
+        self.assertIsNone(re.search(r'\bSCAN (auth_user|users_usermodel|U0)\b', plan), plan)
+
+
+class PrincipalTokenTests(TestCase):
+    """Token claims follow role changes made by any worker."""
+
+    def test_refresh_after_demotion(self):
+        user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        UserModel.objects.create(user=user, role='admin', department='IT', employee_id='alice')
+        client = APIClient()
+        tokens = client.post('/api/token/', {'username': 'alice', 'password': 'password'}, format='json').json()
+        self.assertEqual(AccessToken(tokens['access'])['role'], 'admin')
+
+        # An update saved by another worker leaves this worker's principal cache alone.
+        UserModel.objects.filter(user=user).update(role='user', department='Sales')
+        refreshed = client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json').json()
+        access = AccessToken(refreshed['access'])
+        self.assertEqual((access['role'], access['department']), ('user', 'Sales'))
@@ -4,8 +4,12 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User
+from metrics.instrumentation import serialize
+from .directory import DIRECTORY_FIELDS, directory_queryset, get_fields
 from .models import UserModel
-from .serializers import UserRegistrationSerializer, UserSerializer
+from .pagination import UserPagination
+from .principal import get_principal
+from .serializers import UserDirectoryFilterSerializer, UserRegistrationSerializer, UserSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
@@ -37,7 +41,7 @@ class UserProfileAPIView(APIView):
     )
     def get(self, request):
         serializer = UserSerializer(request.user)
-        return Response(serializer.data)
+        return Response(serialize(serializer))
 
     @swagger_auto_schema(
         operation_description="Update user profile",
@@ -49,16 +53,23 @@ class UserProfileAPIView(APIView):
 partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return Response(serialize(serializer))
         return Response(serializer.errors,
 status=status.HTTP_400_BAD_REQUEST)
 
 
 class UserListAPIView(APIView):
-    permission_classes = [IsAuthenticated]    
+    permission_classes = [IsAuthenticated]
+    pagination_class = UserPagination
 
     @swagger_auto_schema(
-        operation_description="Get all users",
+        operation_description="Get the user directory, alphabetical by username, paginated by cursor",
+        query_serializer=UserDirectoryFilterSerializer,
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor from `next`/`previous`", type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Number of users per page", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('fields', openapi.IN_QUERY, description="Comma-separated fields to return, e.g. `id,username` for an assignee picker: " + ', '.join(DIRECTORY_FIELDS), type=openapi.TYPE_STRING),
+        ],
         responses={
             200: UserSerializer(many=True),
             403: openapi.Response(
@@ -74,9 +85,14 @@ class UserListAPIView(APIView):
     )
     def get(self, request):
         # Only agents and admins can see all users
-        if request.user.usermodel.role in ['agent', 'admin']:
-            users = User.objects.all()
-            serializer = UserSerializer(users, many=True)
-            return Response(serializer.data)
-        return Response({'error': 'Permission denied'},
-status=status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        if get_principal(request.user).role not in ['agent', 'admin']:
+            return Response({'error': 'Permission denied'},
+status=status.HTTP_403_FORBIDDEN)
+        fields = get_fields(request, DIRECTORY_FIELDS)
+        filters = UserDirectoryFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        users = filters.filter_queryset(directory_queryset(fields))
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(users, request, view=self)
+        serializer = UserSerializer(page, many=True, context={'fields': fields})
+        return paginator.get_paginated_response(serialize(serializer))